@@ -0,0 +1,140 @@
+"""asyncio extraction engine: bounded concurrency over pooled keep-alive connections"""
+import asyncio
+import threading
+from typing import Any, AsyncIterator, Dict, Iterable, Iterator, Optional, Tuple, Union
+from extraction_cache import ExtractionCache
+from ollama_pool import EndpointPool
+from row_chunker import RowChunk
+from valve_extraction import ResponseObserver, process_chunk_async, process_row_chunk_async
+from valve_pipeline import ChunkResult
+
+_EXHAUSTED = object()
+
+class _PoolClient:
+    """Adapts EndpointPool.achat to the chat() that process_chunk_async awaits"""
+    def __init__(self, pool: EndpointPool):
+        self.chat = pool.achat
+
+async def extract_chunks_async(chunks: Iterable[Union[str, RowChunk]], model: str, pool: EndpointPool,
+                               concurrency: int, cache: Optional[ExtractionCache] = None, model_digest: str = "",
+                               options: Optional[Dict[str, Any]] = None,
+                               on_response: Optional[ResponseObserver] = None,
+                               limiter: Optional[asyncio.Semaphore] = None,
+                               row_ids: bool = False) -> AsyncIterator[ChunkResult]:
+    """Yield (index, valves, error) for each chunk in chunk order, like extract_chunks.
+
+    A producer pulls chunks from the (possibly streaming) iterable in a
+    worker thread and feeds a bounded asyncio.Queue that concurrency worker
+    tasks drain. At most 2 * concurrency chunks are queued, in flight or
+    finished and waiting for an earlier chunk, so the producer blocks
+    instead of reading ahead and memory stays bounded. limiter caps the
+    requests in flight across several concurrent calls, e.g. the files
+    of a batch. row_ids selects process_row_chunk_async for tagged RowChunks.
+    """
+    extract = process_row_chunk_async if row_ids else process_chunk_async
+    queue: asyncio.Queue = asyncio.Queue(maxsize=concurrency)
+    window = asyncio.Semaphore(2 * concurrency)
+    limiter = limiter or asyncio.Semaphore(concurrency)
+    client = _PoolClient(pool)
+    results: Dict[int, Tuple[Any, Optional[str]]] = {}
+    changed = asyncio.Event()
+    chunk_iter = iter(chunks)
+    total: Optional[int] = None
+    input_error: Optional[Exception] = None
+
+    async def produce():
+        nonlocal total, input_error
+        index = 0
+        try:
+            while True:
+                await window.acquire()
+                # Pulling may read the workbook from disk; keep it off the event loop
+                chunk = await asyncio.to_thread(next, chunk_iter, _EXHAUSTED)
+                if chunk is _EXHAUSTED:
+                    break
+                await queue.put((index, chunk))
+                index += 1
+        except Exception as e:
+            input_error = e
+        total = index
+        for _ in range(concurrency):
+            await queue.put(None)
+        changed.set()
+
+    async def work():
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+            index, chunk = item
+            try:
+                async with limiter:
+                    valves = await extract(chunk, model, client, cache, model_digest, options, on_response)
+                results[index] = (valves, None)
+            except Exception as e:
+                results[index] = (None, str(e))
+            changed.set()
+
+    tasks = [asyncio.create_task(produce())]
+    tasks.extend(asyncio.create_task(work()) for _ in range(concurrency))
+    try:
+        next_index = 0
+        while True:
+            if next_index in results:
+                valves, error = results.pop(next_index)
+                window.release()
+                yield next_index, valves, error
+                next_index += 1
+            elif total is not None and next_index >= total:
+                break
+            else:
+                changed.clear()
+                await changed.wait()
+        if input_error is not None:
+            raise input_error
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+class AsyncExtractor:
+    """Runs extract_chunks_async on a background event loop for synchronous callers.
+
+    One loop, and so one pooled keep-alive connection set per host, serves
+    every caller, and requests in flight across all callers never exceed
+    concurrency. extract_chunks() stands in for valve_pipeline.extract_chunks
+    and may be called from several threads at once.
+    """
+    def __init__(self, pool: EndpointPool, concurrency: int):
+        self.pool = pool
+        self.concurrency = concurrency
+        self.loop = asyncio.new_event_loop()
+        self.limiter = asyncio.Semaphore(concurrency)
+        self._thread = threading.Thread(target=self.loop.run_forever, name='async-extractor', daemon=True)
+        self._thread.start()
+
+    def _run(self, coro) -> Any:
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result()
+
+    def extract_chunks(self, chunks: Iterable[Union[str, RowChunk]], model: str,
+                       cache: Optional[ExtractionCache] = None, model_digest: str = "",
+                       options: Optional[Dict[str, Any]] = None, on_response: Optional[ResponseObserver] = None,
+                       row_ids: bool = False) -> Iterator[ChunkResult]:
+        results = extract_chunks_async(chunks, model, self.pool, self.concurrency, cache, model_digest,
+                                       options, on_response, self.limiter, row_ids)
+        try:
+            while True:
+                try:
+                    item = self._run(results.__anext__())
+                except StopAsyncIteration:
+                    return
+                yield item
+        finally:
+            self._run(results.aclose())
+
+    def close(self):
+        """Close the pooled connections and stop the loop"""
+        self._run(self.pool.aclose())
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join()
+        self.loop.close()
@@ -0,0 +1,173 @@
+"""Per-model chunk sizing from the model's context window and measured token usage"""
+import os
+import json
+import math
+import threading
+from collections import deque
+from typing import Any, Dict, NamedTuple, Optional
+import requests
+from ollama_pool import DEFAULT_HOST
+from valve_extraction import ValveList, RowValvesList, SYSTEM_PROMPT, BATCH_SYSTEM_PROMPT
+
+DEFAULT_NUM_CTX = 2048  # Ollama's context size when the model reports none
+MAX_NUM_CTX = 8192  # Largest window requested; bigger windows cost VRAM and prompt latency
+OUTPUT_RESERVE_TOKENS = 1024  # Room left for the JSON reply
+SAFETY_MARGIN = 0.9  # Fraction of the remaining window actually filled
+MIN_CHUNK_TOKENS = 128
+DEFAULT_CHARS_PER_TOKEN = 4.0
+CALIBRATION_WINDOW = 20  # Recent prompt_eval_count observations used for calibration
+CALIBRATION_STEP = 0.25  # Ratio granularity, so chunk boundaries (and cache keys) stay stable
+MIN_CALIBRATION_SAMPLES = 5  # Observations needed before a measured ratio is frozen
+DEFAULT_RATIO_PATH = os.path.join(os.path.expanduser("~"), ".valve_extractor", "chars_per_token.json")
+
+def fetch_context_length(model: str, base_url: str = DEFAULT_HOST) -> Optional[int]:
+    """Maximum context length of a model from Ollama's /api/show, or None if unavailable"""
+    try:
+        response = requests.post(f'{base_url}/api/show', json={'model': model, 'name': model}, timeout=10)
+        response.raise_for_status()
+        model_info = response.json().get('model_info') or {}
+    except Exception:
+        return None
+    for key, value in model_info.items():
+        if key.endswith('.context_length') and isinstance(value, int):
+            return value
+    return None
+
+def load_ratios(path: str) -> Dict[str, float]:
+    """Frozen chars-per-token ratio per model, empty if none were stored yet"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return {model: float(ratio) for model, ratio in json.load(f).items()}
+    except (OSError, ValueError, AttributeError):
+        return {}
+
+def save_ratio(path: str, model: str, ratio: float):
+    ratios = load_ratios(path)
+    ratios[model] = ratio
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(ratios, f, indent=2)
+    os.replace(tmp_path, path)
+
+class ChunkPlan(NamedTuple):
+    """Chunk sizes frozen for one input, so its chunk boundaries never move while it is being chunked"""
+    chunk_tokens: int
+    chars_per_token: float
+
+    @property
+    def chunk_chars(self) -> int:
+        return int(self.chunk_tokens * self.chars_per_token)
+
+    def count_tokens(self, text: str) -> int:
+        """Token estimate, usable as the row chunker's token_counter"""
+        return math.ceil(len(text) / self.chars_per_token)
+
+def prompt_overhead_text() -> str:
+    """Everything sent with every chunk: the system prompt and the output schema.
+
+    The larger of the plain and batched (row ID) layouts, so one budget fits both.
+    """
+    return max(SYSTEM_PROMPT + json.dumps(ValveList.model_json_schema()),
+               BATCH_SYSTEM_PROMPT + json.dumps(RowValvesList.model_json_schema()), key=len)
+
+class ChunkBudget:
+    """Sizes chunks so each request fills the model's context as far as is safe.
+
+    The window is the model's context length (capped at max_num_ctx and
+    requested explicitly through num_ctx), minus the fixed prompt/schema
+    overhead and a reserve for the reply. Token counts are estimated from
+    characters; the characters-per-token ratio is measured from the
+    prompt_eval_count Ollama returns, keeping the most conservative recent
+    value. Measurements never change the ratio implicitly: calibrate()
+    adopts the measured ratio once, after a run, and freezes it for the
+    model (persisted by for_model's ratio_path), so later runs chunk the
+    same input the same way and cache keys stay reproducible. Inputs are
+    chunked from a plan() snapshot, which concurrent runs cannot move.
+    Safe to share between worker threads.
+    """
+    def __init__(self, context_length: Optional[int] = None,
+                 output_reserve: int = OUTPUT_RESERVE_TOKENS, max_num_ctx: int = MAX_NUM_CTX,
+                 chars_per_token: Optional[float] = None, model: str = ""):
+        self.context_length = context_length
+        self.num_ctx = min(context_length or DEFAULT_NUM_CTX, max_num_ctx)
+        self.output_reserve = output_reserve
+        self.model = model
+        self.chars_per_token = chars_per_token or DEFAULT_CHARS_PER_TOKEN
+        self.frozen = chars_per_token is not None  # The ratio was calibrated before and no longer changes
+        self.measured_chars_per_token: Optional[float] = None
+        self._overhead_chars = len(prompt_overhead_text())
+        self._ratios = deque(maxlen=CALIBRATION_WINDOW)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def for_model(cls, model: str, base_url: str = DEFAULT_HOST, ratio_path: Optional[str] = DEFAULT_RATIO_PATH,
+                  **kwargs) -> "ChunkBudget":
+        """Budget from the model's context length and its frozen ratio at ratio_path, if any (None ignores it)"""
+        ratio = load_ratios(ratio_path).get(model) if ratio_path else None
+        return cls(fetch_context_length(model, base_url), chars_per_token=ratio, model=model, **kwargs)
+
+    @property
+    def overhead_tokens(self) -> int:
+        return math.ceil(self._overhead_chars / self.chars_per_token)
+
+    @property
+    def chunk_tokens(self) -> int:
+        """Tokens of input text that fit in one request"""
+        available = self.num_ctx - self.overhead_tokens - self.output_reserve
+        return max(MIN_CHUNK_TOKENS, int(available * SAFETY_MARGIN))
+
+    @property
+    def chunk_chars(self) -> int:
+        """Characters of input text that fit in one request, for character splitters"""
+        return int(self.chunk_tokens * self.chars_per_token)
+
+    def count_tokens(self, text: str) -> int:
+        """Calibrated token estimate, usable as the row chunker's token_counter"""
+        return math.ceil(len(text) / self.chars_per_token)
+
+    def plan(self, chunk_tokens: Optional[int] = None) -> ChunkPlan:
+        """Current sizes, frozen for chunking one input; chunk_tokens overrides the budgeted size"""
+        with self._lock:
+            return ChunkPlan(chunk_tokens or self.chunk_tokens, self.chars_per_token)
+
+    def options(self) -> Dict[str, Any]:
+        """Request options that make Ollama allocate the budgeted window"""
+        return {'num_ctx': self.num_ctx}
+
+    def observe(self, prompt: str, response: Any):
+        """Tune chars-per-token from the prompt_eval_count of a completed request"""
+        prompt_tokens = getattr(response, 'prompt_eval_count', None)
+        if prompt_tokens is None and isinstance(response, dict):
+            prompt_tokens = response.get('prompt_eval_count')
+        if not prompt_tokens:
+            return
+        with self._lock:
+            if self.frozen:
+                return
+            self._ratios.append(len(prompt) / prompt_tokens)
+            # Cached prompt prefixes lower prompt_eval_count, so trust the smallest ratio
+            # and never assume more characters per token than the default
+            ratio = min(DEFAULT_CHARS_PER_TOKEN, min(self._ratios))
+            ratio = math.floor(ratio / CALIBRATION_STEP) * CALIBRATION_STEP
+            self.measured_chars_per_token = max(CALIBRATION_STEP, ratio)
+
+    def calibrate(self, ratio_path: Optional[str] = None) -> bool:
+        """Adopt and freeze the measured ratio, storing it at ratio_path; call after a run, not during one.
+
+        Returns True when a ratio was adopted. A frozen ratio, or one measured
+        from fewer than MIN_CALIBRATION_SAMPLES requests, is left alone.
+        """
+        with self._lock:
+            if self.frozen or self.measured_chars_per_token is None or len(self._ratios) < MIN_CALIBRATION_SAMPLES:
+                return False
+            self.chars_per_token = self.measured_chars_per_token
+            self.frozen = True
+        if ratio_path and self.model:
+            save_ratio(ratio_path, self.model, self.chars_per_token)
+        return True
+
+    def describe(self) -> str:
+        model_max = self.context_length if self.context_length else 'unknown'
+        return (f"Context window {self.num_ctx} tokens (model max {model_max}), "
+                f"chunks up to {self.chunk_tokens} tokens at {self.chars_per_token:.2f} chars/token")
@@ -0,0 +1,98 @@
+"""Virtualized Qt table model that reads straight from a DataFrame's column arrays"""
+from typing import Any, List, Optional
+import numpy as np
+import pandas as pd
+from PyQt6.QtCore import Qt, QAbstractTableModel, QModelIndex
+from PyQt6.QtGui import QFontMetrics
+
+WIDTH_SAMPLE_ROWS = 200  # Rows sampled when estimating column widths
+MAX_COLUMN_WIDTH = 400  # Pixels; long text is elided instead of widening the column
+COLUMN_PADDING = 16  # Pixels added around the widest sampled value
+
+def format_cell(value: Any) -> str:
+    """Format a single cell for display; missing values render empty"""
+    if value is None:
+        return ""
+    if isinstance(value, float) and np.isnan(value):
+        return ""
+    if value is pd.NaT:
+        return ""
+    return str(value)
+
+class DataFrameTableModel(QAbstractTableModel):
+    """Table model over a DataFrame that formats cells only when the view asks.
+
+    Each column is held as its underlying array, so no per-cell Python
+    objects or strings are created up front. Sorting computes a row
+    permutation on the column array and maps view rows through it, leaving
+    the DataFrame untouched.
+    """
+    def __init__(self, df: Optional[pd.DataFrame] = None, parent=None):
+        super().__init__(parent)
+        self._columns: List[str] = []
+        self._arrays: List[np.ndarray] = []
+        self._order: Optional[np.ndarray] = None
+        self._rows = 0
+        self.set_dataframe(df)
+
+    def set_dataframe(self, df: Optional[pd.DataFrame]):
+        """Replace the displayed data; pass None to clear"""
+        self.beginResetModel()
+        if df is None:
+            self._columns, self._arrays, self._rows = [], [], 0
+        else:
+            self._columns = [str(column) for column in df.columns]
+            self._arrays = [df.iloc[:, i].to_numpy() for i in range(df.shape[1])]
+            self._rows = len(df)
+        self._order = None
+        self.endResetModel()
+
+    def rowCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        return 0 if parent.isValid() else self._rows
+
+    def columnCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self._columns)
+
+    def source_row(self, row: int) -> int:
+        """Row position in the DataFrame for a row in the (possibly sorted) view"""
+        return int(self._order[row]) if self._order is not None else row
+
+    def data(self, index: QModelIndex, role: int = Qt.ItemDataRole.DisplayRole) -> Any:
+        if not index.isValid():
+            return None
+        if role in (Qt.ItemDataRole.DisplayRole, Qt.ItemDataRole.ToolTipRole):
+            return format_cell(self._arrays[index.column()][self.source_row(index.row())])
+        return None
+
+    def headerData(self, section: int, orientation: Qt.Orientation,
+                   role: int = Qt.ItemDataRole.DisplayRole) -> Any:
+        if role != Qt.ItemDataRole.DisplayRole:
+            return None
+        if orientation == Qt.Orientation.Horizontal:
+            return self._columns[section] if section < len(self._columns) else None
+        return str(self.source_row(section) + 1)
+
+    def sort(self, column: int, order: Qt.SortOrder = Qt.SortOrder.AscendingOrder):
+        """Sort by computing a stable permutation of the column array"""
+        if not 0 <= column < len(self._arrays):
+            return
+        self.layoutAboutToBeChanged.emit()
+        series = pd.Series(self._arrays[column])
+        ascending = order == Qt.SortOrder.AscendingOrder
+        try:
+            ordered = series.sort_values(ascending=ascending, kind="mergesort", na_position="last")
+        except TypeError:
+            # Mixed types in an object column; fall back to comparing their text
+            ordered = series.map(format_cell).sort_values(ascending=ascending, kind="mergesort")
+        self._order = ordered.index.to_numpy()
+        self.layoutChanged.emit()
+
+    def estimate_column_widths(self, metrics: QFontMetrics,
+                               sample_rows: int = WIDTH_SAMPLE_ROWS) -> List[int]:
+        """Estimate column widths in pixels from the header and a sample of rows"""
+        widths = []
+        for name, values in zip(self._columns, self._arrays):
+            sample = [format_cell(value) for value in values[:sample_rows]]
+            longest = max([name, *sample], key=len)
+            widths.append(min(metrics.horizontalAdvance(longest) + COLUMN_PADDING, MAX_COLUMN_WIDTH))
+        return widths
@@ -0,0 +1,69 @@
+"""Streaming Excel reader with bounded memory built on openpyxl read-only mode"""
+from itertools import islice
+from typing import Iterator, List, Optional, Tuple
+import pandas as pd
+from openpyxl import load_workbook
+from row_chunker import serialize_row
+from stage_timer import stage, timed
+
+DEFAULT_BATCH_ROWS = 1000  # Rows per batch handed to the pipeline
+PREVIEW_ROWS = 1000  # Rows loaded into the table preview
+
+class ExcelStream:
+    """Reads an .xlsx sheet row by row without loading the workbook into memory.
+
+    The header row supplies the column names; data rows are numbered from 0
+    in sheet order, matching DataFrame positions from pd.read_excel. Each
+    iteration reopens the workbook, so a stream can be consumed more than
+    once (e.g. preview first, then extraction).
+    """
+    def __init__(self, path: str, sheet_name: Optional[str] = None):
+        self.path = path
+        self.sheet_name = sheet_name
+
+        workbook = load_workbook(path, read_only=True, data_only=True)
+        try:
+            sheet = self._sheet(workbook)
+            # max_row comes from the sheet's recorded dimension and may be missing
+            self.total_rows: Optional[int] = sheet.max_row - 1 if sheet.max_row else None
+            header = next(sheet.iter_rows(max_row=1, values_only=True), ())
+        finally:
+            workbook.close()
+        self.columns: List[str] = [
+            str(name) if name is not None else f"Unnamed: {i}" for i, name in enumerate(header)
+        ]
+
+    def _sheet(self, workbook):
+        return workbook[self.sheet_name] if self.sheet_name else workbook.worksheets[0]
+
+    def iter_rows(self) -> Iterator[Tuple[int, tuple]]:
+        """Yield (row position, cell values) for every data row"""
+        workbook = load_workbook(self.path, read_only=True, data_only=True)
+        try:
+            sheet = self._sheet(workbook)
+            width = len(self.columns)
+            for position, values in enumerate(sheet.iter_rows(min_row=2, values_only=True)):
+                yield position, values[:width]
+        finally:
+            workbook.close()
+
+    def iter_batches(self, batch_size: int = DEFAULT_BATCH_ROWS) -> Iterator[List[Tuple[int, tuple]]]:
+        """Yield lists of at most batch_size (row position, cell values) pairs"""
+        rows = self.iter_rows()
+        while True:
+            batch = list(islice(rows, batch_size))
+            if not batch:
+                return
+            yield batch
+
+    def iter_serialized_rows(self, batch_size: int = DEFAULT_BATCH_ROWS) -> Iterator[Tuple[int, str]]:
+        """Yield (row position, compact row text) ready for the row chunker"""
+        for batch in timed('load', self.iter_batches(batch_size)):
+            with stage('serialize'):
+                rows = [(position, serialize_row(self.columns, values)) for position, values in batch]
+            yield from rows
+
+    def preview(self, rows: int = PREVIEW_ROWS) -> pd.DataFrame:
+        """First rows of the sheet as a DataFrame for display"""
+        data = [values for _, values in islice(self.iter_rows(), rows)]
+        return pd.DataFrame(data, columns=self.columns)
@@ -0,0 +1,169 @@
+"""Per-row fingerprint manifest for incremental re-extraction"""
+import os
+import re
+import json
+import hashlib
+import threading
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+from valve_extraction import ValveSpecification
+from valve_merge import ValveMerger, DEFAULT_POLICY
+
+MANIFEST_VERSION = 1
+MANIFEST_SUFFIX = '.manifest.json'
+
+def row_hash(text: str) -> str:
+    """Content hash of one serialized row"""
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=16).hexdigest()
+
+def _normalize(text: str) -> str:
+    return re.sub(r'[^0-9A-Z]', '', text.upper())
+
+class RowManifest:
+    """Records a content hash per source row and the valves extracted from it.
+
+    Rows are matched to the previous run by content, so appended, inserted
+    and reordered rows are all handled: rows whose hash was seen before
+    reuse their stored valves, new or changed rows are passed on for
+    extraction, and rows that no longer exist simply drop out of the new
+    manifest, as do sources the run did not process. The previous run is
+    ignored when its fingerprint (model, prompt, schema, options and the
+    pre-filter, rule and chunk size settings) differs from the current
+    one. A new row only counts as extracted once its chunk has finished
+    (record_chunk, record_rows, record_row) or, for rows that never
+    reached the model, once finish() is called for its source; rows still
+    pending when the run stops are not saved, so the next run extracts
+    them again. Safe to share between threads processing different sources.
+    """
+    def __init__(self, fingerprint: str, previous: Optional[Dict] = None):
+        self.fingerprint = fingerprint
+        files: Dict[str, List[Dict]] = {}
+        if previous and previous.get('version') == MANIFEST_VERSION and previous.get('fingerprint') == fingerprint:
+            files = previous.get('files', {})
+        self._previous: Dict[str, Dict[str, List[Dict]]] = {
+            source: {row['hash']: row['valves'] for row in rows}
+            for source, rows in files.items()
+        }
+        self._rows: Dict[str, Dict[int, Dict]] = {}  # Settled rows: reused, or extracted this run
+        self._pending: Dict[str, Dict[int, Dict]] = {}  # New rows whose extraction has not finished yet
+        self._texts: Dict[str, Dict[int, str]] = {}  # Text of rows extracted this run, for attribution
+        self._lock = threading.Lock()
+        self.reused = 0
+        self.extracted = 0
+
+    @classmethod
+    def load(cls, path: str, fingerprint: str) -> "RowManifest":
+        """Open the manifest at path, starting empty if it is missing or stale"""
+        previous = None
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                previous = json.load(f)
+        return cls(fingerprint, previous)
+
+    @staticmethod
+    def path_for(output_path: str) -> str:
+        """Manifest location next to an output file"""
+        return output_path + MANIFEST_SUFFIX
+
+    def filter_rows(self, source: str, rows: Iterable[Tuple[int, str]]) -> Iterator[Tuple[int, str]]:
+        """Record every row of source and yield only the new or changed ones"""
+        previous = self._previous.get(source, {})
+        with self._lock:
+            current = self._rows.setdefault(source, {})
+            pending = self._pending.setdefault(source, {})
+            texts = self._texts.setdefault(source, {})
+        for index, text in rows:
+            digest = row_hash(text)
+            if digest in previous:
+                current[index] = {'hash': digest, 'valves': previous[digest]}
+                with self._lock:
+                    self.reused += 1
+                continue
+            pending[index] = {'hash': digest, 'valves': []}
+            texts[index] = text
+            with self._lock:
+                self.extracted += 1
+            yield index, text
+
+    def _settle(self, source: str, index: int) -> Dict:
+        row = self._pending[source].pop(index, None)
+        if row is not None:
+            self._rows[source][index] = row
+        return self._rows[source][index]
+
+    def record_row(self, source: str, index: int, valves: Sequence[ValveSpecification]):
+        """Attach valves extracted from a single known row (e.g. by the rules)"""
+        self._settle(source, index)['valves'].extend(valve.model_dump() for valve in valves)
+
+    def record_rows(self, source: str, row_indices: Sequence[int],
+                    valves: Dict[int, Sequence[ValveSpecification]]):
+        """Settle every row of a finished batched chunk with the valves returned for it"""
+        for index in row_indices:
+            self.record_row(source, index, valves.get(index, []))
+
+    def record_chunk(self, source: str, row_indices: Sequence[int], valves: Sequence[ValveSpecification]):
+        """Attribute a chunk's valves to the rows that mention their serial IDs.
+
+        Valves whose serial cannot be found in any row of the chunk are
+        attributed to the chunk's first row.
+        """
+        texts = self._texts.get(source, {})
+        normalized = {index: _normalize(texts.get(index, '')) for index in row_indices}
+        for valve in valves:
+            serial = _normalize(valve.serial_id)
+            owners = [index for index in row_indices if serial and serial in normalized[index]]
+            for index in owners or list(row_indices[:1]):
+                self._settle(source, index)['valves'].append(valve.model_dump())
+        for index in row_indices:
+            self._settle(source, index)
+
+    def discard_rows(self, source: str, row_indices: Sequence[int]):
+        """Forget rows whose extraction failed so the next run retries them"""
+        for index in row_indices:
+            self._pending[source].pop(index, None)
+            self._rows[source].pop(index, None)
+
+    def finish(self, source: str):
+        """Settle the rows of source that never reached the model, e.g. dropped by the pre-filter.
+
+        Call once every chunk of source has finished or been discarded.
+        """
+        with self._lock:
+            pending = self._pending.pop(source, {})
+        self._rows[source].update(pending)
+
+    def deleted(self, source: str) -> int:
+        """Rows present in the previous run but not in this one"""
+        current = {row['hash'] for row in self._rows.get(source, {}).values()}
+        return len(set(self._previous.get(source, {})) - current)
+
+    def merge_into(self, source: str, merger: ValveMerger):
+        """Feed the valves of reused and new rows of source to a merger in row order"""
+        rows = self._rows.get(source, {})
+        for index in sorted(rows):
+            merger.add([ValveSpecification.model_validate(valve) for valve in rows[index]['valves']], index)
+
+    def valves(self, source: str, policy: str = DEFAULT_POLICY) -> List[ValveSpecification]:
+        """Merged valves of source from reused and new rows"""
+        merger = ValveMerger(policy)
+        self.merge_into(source, merger)
+        return list(merger.valves())
+
+    def save(self, path: str):
+        """Write the manifest atomically so an interrupted save never corrupts it.
+
+        Only the sources processed in this run are kept.
+        """
+        with self._lock:
+            files = {
+                source: [{'row': index, **rows[index]} for index in sorted(rows)]
+                for source, rows in self._rows.items()
+            }
+            data = {
+                'version': MANIFEST_VERSION,
+                'fingerprint': self.fingerprint,
+                'files': files,
+            }
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
@@ -0,0 +1,265 @@
+"""Per-request inference telemetry from Ollama response metadata, aggregated into run metrics"""
+import os
+import json
+import time
+import threading
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, NamedTuple, Optional
+
+DEFAULT_TELEMETRY_DIR = os.path.join(os.path.expanduser("~"), ".valve_extractor", "telemetry")
+METRIC_PREFIX = 'valve_extractor'
+# Upper bounds, in seconds, of the request duration histogram buckets
+DURATION_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+PHASES = ('overhead', 'load', 'prompt_eval', 'eval')
+# Ollama reports a few milliseconds of load_duration even when the model is already resident,
+# so only a longer load counts as the model actually being (re)loaded
+MODEL_LOAD_THRESHOLD = 0.5  # seconds
+
+def response_metadata(response: Any, name: str) -> int:
+    """A timing or count field of an Ollama response object or dict, 0 when absent"""
+    value = getattr(response, name, None)
+    if value is None and isinstance(response, dict):
+        value = response.get(name)
+    return int(value or 0)
+
+class RequestMetrics(NamedTuple):
+    """Metadata of one model response; durations are in nanoseconds, as Ollama reports them"""
+    sequence: int
+    model: str
+    prompt_chars: int
+    total_duration: int
+    load_duration: int
+    prompt_eval_count: int
+    prompt_eval_duration: int
+    eval_count: int
+    eval_duration: int
+
+    @classmethod
+    def from_response(cls, sequence: int, prompt: str, response: Any) -> "RequestMetrics":
+        model = getattr(response, 'model', None)
+        if model is None and isinstance(response, dict):
+            model = response.get('model')
+        return cls(sequence, model or '', len(prompt),
+                   *(response_metadata(response, name) for name in cls._fields[3:]))
+
+    @property
+    def overhead_duration(self) -> int:
+        """Server time not spent loading or evaluating: waiting for a slot, scheduling, sampling setup.
+
+        Only what the server counted in total_duration; time the request spent
+        in client-side queues or on the wire is not part of it.
+        """
+        return max(0, self.total_duration - self.load_duration - self.prompt_eval_duration - self.eval_duration)
+
+    def phases(self) -> Dict[str, int]:
+        return {'overhead': self.overhead_duration, 'load': self.load_duration,
+                'prompt_eval': self.prompt_eval_duration, 'eval': self.eval_duration}
+
+class _ModelTotals:
+    """Running sums of one model's requests"""
+    def __init__(self):
+        self.requests = 0
+        self.prompt_tokens = 0
+        self.eval_tokens = 0
+        self.total_duration = 0
+        self.phases = {phase: 0 for phase in PHASES}
+        self.buckets = [0] * len(DURATION_BUCKETS)
+        self.loads = 0
+
+    def add(self, request: RequestMetrics):
+        self.requests += 1
+        self.prompt_tokens += request.prompt_eval_count
+        self.eval_tokens += request.eval_count
+        self.total_duration += request.total_duration
+        for phase, duration in request.phases().items():
+            self.phases[phase] += duration
+        if request.load_duration >= MODEL_LOAD_THRESHOLD * 1e9:
+            self.loads += 1
+        seconds = request.total_duration / 1e9
+        for index, bound in enumerate(DURATION_BUCKETS):
+            if seconds <= bound:
+                self.buckets[index] += 1
+
+    def rates(self) -> Dict[str, Optional[float]]:
+        prompt_seconds = self.phases['prompt_eval'] / 1e9
+        eval_seconds = self.phases['eval'] / 1e9
+        return {
+            'prompt_tokens_per_sec': self.prompt_tokens / prompt_seconds if prompt_seconds else None,
+            'generation_tokens_per_sec': self.eval_tokens / eval_seconds if eval_seconds else None,
+        }
+
+    def report(self) -> Dict[str, Any]:
+        total = self.total_duration / 1e9
+        return {
+            'requests': self.requests,
+            'model_loads': self.loads,
+            'tokens': {'prompt': self.prompt_tokens, 'generated': self.eval_tokens},
+            'seconds': {'total': total, **{phase: duration / 1e9 for phase, duration in self.phases.items()}},
+            'share': {phase: (duration / 1e9) / total if total else None for phase, duration in self.phases.items()},
+            **self.rates(),
+        }
+
+class InferenceTelemetry:
+    """Collects Ollama's timing metadata for every model response of a run.
+
+    observe() has the ResponseObserver signature, so it can be passed as
+    on_response wherever chunks are extracted. Each response's
+    total_duration is split into server overhead, load, prompt evaluation
+    and generation time, and summed per model along with prompt and
+    generated tokens. report() gives the run as JSON-ready data and
+    prometheus() the same totals in the Prometheus text format. Cached
+    chunks never reach the model and are not counted. Safe to share
+    between worker threads.
+    """
+    def __init__(self, keep_requests: bool = True):
+        self.keep_requests = keep_requests
+        self.requests: List[RequestMetrics] = []
+        self.models: Dict[str, _ModelTotals] = {}
+        self.started = time.time()
+        self.finished: Optional[float] = None
+        self._sequence = 0
+        self._lock = threading.Lock()
+
+    def observe(self, prompt: str, response: Any):
+        with self._lock:
+            request = RequestMetrics.from_response(self._sequence, prompt, response)
+            self._sequence += 1
+            self.models.setdefault(request.model, _ModelTotals()).add(request)
+            if self.keep_requests:
+                self.requests.append(request)
+
+    def finish(self):
+        """Mark the end of the run, for the wall time and overall throughput"""
+        self.finished = time.time()
+
+    @property
+    def wall_seconds(self) -> float:
+        return (self.finished or time.time()) - self.started
+
+    def totals(self) -> _ModelTotals:
+        """All models' sums together"""
+        combined = _ModelTotals()
+        with self._lock:
+            for totals in self.models.values():
+                combined.requests += totals.requests
+                combined.prompt_tokens += totals.prompt_tokens
+                combined.eval_tokens += totals.eval_tokens
+                combined.total_duration += totals.total_duration
+                combined.loads += totals.loads
+                for phase in PHASES:
+                    combined.phases[phase] += totals.phases[phase]
+                combined.buckets = [a + b for a, b in zip(combined.buckets, totals.buckets)]
+        return combined
+
+    def report(self, include_requests: bool = True) -> Dict[str, Any]:
+        totals = self.totals()
+        wall = self.wall_seconds
+        report = {
+            'started': datetime.fromtimestamp(self.started).isoformat(timespec='seconds'),
+            'finished': datetime.fromtimestamp(self.finished).isoformat(timespec='seconds') if self.finished else None,
+            'wall_seconds': wall,
+            **totals.report(),
+            'generated_tokens_per_wall_sec': totals.eval_tokens / wall if wall else None,
+        }
+        with self._lock:
+            report['models'] = {model: model_totals.report() for model, model_totals in self.models.items()}
+            if include_requests and self.keep_requests:
+                report['per_request'] = [{**request._asdict(), 'overhead_duration': request.overhead_duration}
+                                         for request in self.requests]
+        return report
+
+    def summary(self) -> str:
+        """One line for logs: where the model time went"""
+        totals = self.totals()
+        if not totals.requests:
+            return "Inference: no model requests"
+        report = totals.report()
+        shares = ", ".join(f"{phase} {share * 100:.0f}%" for phase, share in report['share'].items()
+                           if share is not None)
+        rate = report['generation_tokens_per_sec']
+        return (f"Inference: {totals.requests} requests, {totals.prompt_tokens} prompt / {totals.eval_tokens} "
+                f"generated tokens, {report['seconds']['total']:.1f}s model time ({shares})"
+                + (f", {rate:.1f} tokens/sec" if rate else ""))
+
+    def prometheus(self) -> str:
+        """Run totals in the Prometheus text exposition format"""
+        lines = []
+        def metric(name: str, kind: str, help_text: str):
+            lines.append(f"# HELP {METRIC_PREFIX}_{name} {help_text}")
+            lines.append(f"# TYPE {METRIC_PREFIX}_{name} {kind}")
+
+        with self._lock:
+            models = {model: totals for model, totals in self.models.items()}
+        def label(model: str, **extra: str) -> str:
+            values = {'model': model, **extra}
+            return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in values.items()) + "}"
+
+        metric('requests_total', 'counter', "Model requests completed")
+        lines += [f"{METRIC_PREFIX}_requests_total{label(m)} {t.requests}" for m, t in models.items()]
+        metric('model_loads_total', 'counter', "Requests that had to load the model first")
+        lines += [f"{METRIC_PREFIX}_model_loads_total{label(m)} {t.loads}" for m, t in models.items()]
+        metric('prompt_tokens_total', 'counter', "Prompt tokens evaluated")
+        lines += [f"{METRIC_PREFIX}_prompt_tokens_total{label(m)} {t.prompt_tokens}" for m, t in models.items()]
+        metric('generated_tokens_total', 'counter', "Tokens generated")
+        lines += [f"{METRIC_PREFIX}_generated_tokens_total{label(m)} {t.eval_tokens}" for m, t in models.items()]
+        metric('phase_seconds_total', 'counter', "Server time per request phase (overhead, load, prompt_eval, eval)")
+        lines += [f"{METRIC_PREFIX}_phase_seconds_total{label(m, phase=phase)} {t.phases[phase] / 1e9:.6f}"
+                  for m, t in models.items() for phase in PHASES]
+        metric('request_duration_seconds', 'histogram', "Total server duration of each request")
+        for m, t in models.items():
+            for bound, count in zip(DURATION_BUCKETS, t.buckets):
+                lines.append(f"{METRIC_PREFIX}_request_duration_seconds_bucket{label(m, le=f'{bound:g}')} {count}")
+            lines.append(f"{METRIC_PREFIX}_request_duration_seconds_bucket{label(m, le='+Inf')} {t.requests}")
+            lines.append(f"{METRIC_PREFIX}_request_duration_seconds_sum{label(m)} {t.total_duration / 1e9:.6f}")
+            lines.append(f"{METRIC_PREFIX}_request_duration_seconds_count{label(m)} {t.requests}")
+        for name, key, help_text in (('prompt_tokens_per_second', 'prompt_tokens_per_sec', "Prompt evaluation speed"),
+                                     ('generation_tokens_per_second', 'generation_tokens_per_sec', "Generation speed")):
+            metric(name, 'gauge', help_text)
+            for m, t in models.items():
+                rate = t.rates()[key]
+                if rate is not None:
+                    lines.append(f"{METRIC_PREFIX}_{name}{label(m)} {rate:.3f}")
+        return "\n".join(lines) + "\n"
+
+    def write_json(self, path: str, include_requests: bool = True):
+        _write_atomic(path, json.dumps(self.report(include_requests), indent=2) + "\n")
+
+    def write_prometheus(self, path: str):
+        """Write prometheus() to path, e.g. for node_exporter's textfile collector"""
+        _write_atomic(path, self.prometheus())
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _write_atomic(path: str, text: str):
+    """Replace path in one step, so scrapers never read a half-written file"""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    temp_path = f"{path}.tmp{os.getpid()}"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(temp_path, path)
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+        data = self.server.telemetry.prometheus().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format: str, *args):
+        pass
+
+def start_metrics_server(telemetry: InferenceTelemetry, port: int, host: str = '127.0.0.1') -> ThreadingHTTPServer:
+    """Serve telemetry.prometheus() on http://host:port/metrics in a background thread"""
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    server.daemon_threads = True
+    server.telemetry = telemetry
+    threading.Thread(target=server.serve_forever, name='metrics-server', daemon=True).start()
+    return server
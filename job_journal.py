@@ -0,0 +1,171 @@
+"""Append-only journal of finished chunks, so an interrupted extraction job can resume where it stopped"""
+import os
+import json
+import time
+import random
+import hashlib
+import threading
+from datetime import datetime
+from typing import Any, Dict, IO, List, Optional, Union
+from row_chunker import RowChunk
+from valve_extraction import ValveSpecification, RowResults
+
+JOURNAL_VERSION = 1
+JOURNAL_SUFFIX = '.journal.jsonl'
+DEFAULT_JOB_DIR = os.path.join(os.path.expanduser("~"), ".valve_extractor", "jobs")
+SYNC_INTERVAL = 5.0  # Seconds between fsyncs; every record is flushed to the OS as it is written
+MAX_RETRIES = 3  # Extra attempts for a failed chunk
+RETRY_BASE_DELAY = 2.0  # Seconds before the first retry; doubles with each attempt
+RETRY_MAX_DELAY = 60.0
+
+ChunkValves = Union[List[ValveSpecification], RowResults]
+
+def chunk_key(chunk: Union[str, RowChunk]) -> str:
+    """Content hash identifying a chunk across runs"""
+    text = chunk.text if isinstance(chunk, RowChunk) else chunk
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=16).hexdigest()
+
+def _dump(valves: ChunkValves) -> Dict[str, Any]:
+    if isinstance(valves, dict):
+        return {'rows': {str(row): [valve.model_dump() for valve in row_valves]
+                         for row, row_valves in valves.items()}}
+    return {'valves': [valve.model_dump() for valve in valves]}
+
+def _load(record: Dict[str, Any]) -> ChunkValves:
+    if 'rows' in record:
+        return {int(row): [ValveSpecification.model_validate(valve) for valve in row_valves]
+                for row, row_valves in record['rows'].items()}
+    return [ValveSpecification.model_validate(valve) for valve in record['valves']]
+
+class RetryPolicy:
+    """Exponential backoff with jitter for chunks that failed, e.g. while Ollama restarts"""
+    def __init__(self, retries: int = MAX_RETRIES, base_delay: float = RETRY_BASE_DELAY,
+                 max_delay: float = RETRY_MAX_DELAY, jitter: float = 0.2):
+        self.retries = max(0, retries)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.jitter = jitter
+
+    def delay(self, attempt: int) -> float:
+        """Seconds to wait before retry number attempt (0 for the first)"""
+        delay = min(self.max_delay, self.base_delay * 2 ** attempt)
+        return delay * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+class JobJournal:
+    """Checkpoints the result of every finished chunk of a job.
+
+    Each chunk is appended as one JSON line and flushed right away, so a
+    crash loses at most the chunks that were in flight; fsync runs at most
+    every SYNC_INTERVAL seconds to keep the cost per chunk low. A torn last
+    line from a crash is skipped when the journal is read back. Chunks are
+    identified by a hash of their text, and the chunking settings of each
+    source are kept so a resumed job produces the same chunks. A journal
+    written with a different fingerprint (model, prompt, schema, options)
+    is discarded rather than resumed. Safe to share between threads.
+    """
+    def __init__(self, path: str, fingerprint: str, previous: Optional[List[Dict]] = None):
+        self.path = path
+        self.fingerprint = fingerprint
+        self._done: Dict[str, Dict[str, Dict]] = {}  # Source -> chunk key -> stored result
+        self._offsets: Dict[str, set] = {}  # Source -> indices of checkpointed chunks
+        self._settings: Dict[str, Dict[str, Any]] = {}
+        self.resumed = False
+        self.reused = 0
+        self.recorded = 0
+        if previous and previous[0].get('version') == JOURNAL_VERSION and previous[0].get('fingerprint') == fingerprint:
+            self.resumed = True
+            for record in previous[1:]:
+                source = record.get('source', '')
+                if 'settings' in record:
+                    self._settings[source] = record['settings']
+                elif 'key' in record:
+                    self._done.setdefault(source, {})[record['key']] = record
+                    self._offsets.setdefault(source, set()).add(record['chunk'])
+        self._lock = threading.Lock()
+        self._synced = time.monotonic()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._file: Optional[IO[str]] = open(path, 'a' if self.resumed else 'w', encoding='utf-8')
+        if not self.resumed:
+            self._append({'version': JOURNAL_VERSION, 'fingerprint': fingerprint,
+                          'created': datetime.now().isoformat(timespec='seconds')})
+
+    @classmethod
+    def open(cls, path: str, fingerprint: str) -> "JobJournal":
+        """Resume the journal at path, or start a new one if it is missing or stale"""
+        previous = []
+        if os.path.exists(path):
+            with open(path, 'r+b') as f:
+                intact = 0
+                for line in f:
+                    try:
+                        if not line.endswith(b"\n"):
+                            raise ValueError("unterminated line")
+                        previous.append(json.loads(line))
+                    except ValueError:
+                        break  # Torn write from an interrupted run; nothing after it was flushed
+                    intact += len(line)
+                # Cut the torn tail so records appended on resume start on a line of their own
+                f.truncate(intact)
+        return cls(path, fingerprint, previous)
+
+    @staticmethod
+    def path_for(output_path: str) -> str:
+        """Journal location next to an output file"""
+        return output_path + JOURNAL_SUFFIX
+
+    def _append(self, record: Dict[str, Any]):
+        self._file.write(json.dumps(record) + "\n")
+        self._file.flush()
+        now = time.monotonic()
+        if now - self._synced >= SYNC_INTERVAL:
+            os.fsync(self._file.fileno())
+            self._synced = now
+
+    def settings(self, source: str, defaults: Dict[str, Any]) -> Dict[str, Any]:
+        """Chunking settings of source: the interrupted run's when resuming, so chunks line up, else defaults"""
+        with self._lock:
+            settings = self._settings.get(source)
+            if settings is None:
+                settings = self._settings[source] = dict(defaults)
+                self._append({'source': source, 'settings': settings})
+            return settings
+
+    def lookup(self, source: str, chunk: Union[str, RowChunk]) -> Optional[ChunkValves]:
+        """Checkpointed result of chunk, or None if it has to be extracted"""
+        record = self._done.get(source, {}).get(chunk_key(chunk))
+        if record is None:
+            return None
+        with self._lock:
+            self.reused += 1
+        return _load(record)
+
+    def record(self, source: str, index: int, chunk: Union[str, RowChunk], valves: ChunkValves):
+        """Checkpoint a finished chunk"""
+        line = {'source': source, 'chunk': index, 'key': chunk_key(chunk), **_dump(valves)}
+        with self._lock:
+            if self._file is not None:
+                self._append(line)
+                self.recorded += 1
+
+    def checkpointed(self, source: Optional[str] = None) -> int:
+        """Chunks finished before this run, of source or of every source"""
+        sources = [source] if source is not None else list(self._offsets)
+        return sum(len(self._offsets.get(name, ())) for name in sources)
+
+    def summary(self) -> str:
+        return f"Job journal: {self.reused} chunks resumed, {self.recorded} checkpointed ({self.path})"
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.flush()
+                os.fsync(self._file.fileno())
+                self._file.close()
+                self._file = None
+
+    def remove(self):
+        """Close and delete the journal once the job's results are safely written"""
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
@@ -0,0 +1,550 @@
+"""Local stand-in for an Ollama server, for deterministic performance testing without a GPU.
+
+Serves /api/tags, /api/show, /api/chat (with format schemas) and
+/api/generate, answering extraction requests from the ground truth written
+by valve_data_sample.py. Latency, tokens/sec, parallel slots and error
+injection are configurable, e.g.:
+
+    python valve_data_sample.py -n 100000 -o corpus.xlsx
+    python mock_ollama.py --truth corpus.xlsx.truth.jsonl --model llama3.1:40 --model qwen2.5:120:0.9 \\
+        --latency lognormal:-3,0.5 --parallel 4 --error-rate 0.01
+    OLLAMA_HOSTS=http://127.0.0.1:11434 python valve_batch.py corpus.xlsx --model llama3.1
+"""
+import re
+import sys
+import json
+import math
+import time
+import random
+import hashlib
+import argparse
+import threading
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+from valve_extraction import ValveSpecification
+from valve_prefilter import SERIAL_PATTERN
+from valve_rules import parse_valve
+
+DEFAULT_PORT = 11434
+DEFAULT_MODEL = 'mock'
+DEFAULT_TOKENS_PER_SEC = 50.0  # Generation speed
+DEFAULT_PROMPT_TOKENS_PER_SEC = 1000.0  # Prompt evaluation speed
+DEFAULT_LOAD_SECONDS = 2.0  # Time to load a model that is not in memory
+DEFAULT_KEEP_ALIVE = 300.0  # Ollama's default 5m
+DEFAULT_CONTEXT_LENGTH = 8192
+DEFAULT_PARALLEL = 4  # Requests served at once, like OLLAMA_NUM_PARALLEL
+DEFAULT_MAX_QUEUE = 512  # Requests waiting for a slot before 503, like OLLAMA_MAX_QUEUE
+CHARS_PER_TOKEN = 4  # Token counts are estimated from characters
+ROW_ID_PATTERN = re.compile(r"^\[(\d+)\]\s?")
+VALVE_FIELDS = list(ValveSpecification.model_fields)
+REQUIRED_FIELDS = [name for name, field in ValveSpecification.model_fields.items() if field.is_required()]
+DURATION_UNITS = {'ms': 0.001, 's': 1.0, 'm': 60.0, 'h': 3600.0}
+
+class LatencyModel:
+    """Per-request overhead in seconds drawn from a named distribution.
+
+    Specs are 'fixed:S', 'uniform:LOW,HIGH', 'normal:MEAN,STD',
+    'lognormal:MU,SIGMA' (of the underlying normal) or 'exp:MEAN';
+    negative draws are clamped to 0.
+    """
+    PARAMETERS = {'fixed': 1, 'uniform': 2, 'normal': 2, 'lognormal': 2, 'exp': 1}
+
+    def __init__(self, spec: str = 'fixed:0'):
+        name, _, values = spec.partition(':')
+        if name not in self.PARAMETERS:
+            raise ValueError(f"Unknown latency distribution '{name}' ({', '.join(self.PARAMETERS)})")
+        try:
+            self.params = [float(value) for value in values.split(',')] if values else []
+        except ValueError:
+            raise ValueError(f"Latency parameters must be numbers: {spec!r}")
+        if len(self.params) != self.PARAMETERS[name]:
+            raise ValueError(f"'{name}' latency takes {self.PARAMETERS[name]} parameter(s): {spec!r}")
+        self.name = name
+        self.spec = spec
+
+    def sample(self, rng: random.Random) -> float:
+        if self.name == 'fixed':
+            value = self.params[0]
+        elif self.name == 'uniform':
+            value = rng.uniform(*self.params)
+        elif self.name == 'normal':
+            value = rng.gauss(*self.params)
+        elif self.name == 'lognormal':
+            value = rng.lognormvariate(*self.params)
+        else:
+            value = rng.expovariate(1 / self.params[0]) if self.params[0] > 0 else 0.0
+        return max(0.0, value)
+
+class ModelProfile(NamedTuple):
+    """A served model: its speed and how often it reports each field it could have found"""
+    name: str
+    tokens_per_sec: float = DEFAULT_TOKENS_PER_SEC
+    field_recall: float = 1.0
+
+    @property
+    def digest(self) -> str:
+        return hashlib.sha256(self.name.encode('utf-8')).hexdigest()
+
+def model_profile(value: str) -> ModelProfile:
+    """argparse type for NAME[:TOKENS_PER_SEC[:FIELD_RECALL]]; the name may contain one tag colon"""
+    parts = value.split(':')
+    numbers: List[float] = []
+    while len(parts) > 1 and len(numbers) < 2:
+        try:
+            numbers.insert(0, float(parts[-1]))
+        except ValueError:
+            break
+        parts.pop()
+    name = ':'.join(parts)
+    if not name:
+        raise argparse.ArgumentTypeError(f"model needs a name: {value!r}")
+    return ModelProfile(name, *numbers)
+
+def keep_alive_seconds(value: Any, default: float = DEFAULT_KEEP_ALIVE) -> float:
+    """Ollama's keep_alive (seconds, or a duration like '30m') as seconds; negative is forever"""
+    if value is None:
+        return default
+    if isinstance(value, (int, float)):
+        return float(value)
+    match = re.fullmatch(r"\s*(-?\d+(?:\.\d+)?)\s*(ms|s|m|h)?\s*", str(value))
+    if not match:
+        return default
+    return float(match.group(1)) * DURATION_UNITS[match.group(2) or 's']
+
+class GroundTruth:
+    """Valves by serial ID from one or more ground truth JSONL files.
+
+    Repeated mentions of a serial are merged field by field, first value
+    wins. answer() only reports the fields whose value the text actually
+    contains, so a reply never knows more than the chunk it answers; serials
+    without ground truth fall back to the rule-based parser.
+    """
+    def __init__(self, paths: Sequence[str] = ()):
+        self.valves: Dict[str, Dict[str, Any]] = {}
+        for path in paths:
+            self.load(path)
+
+    def load(self, path: str):
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                serial_id = record.get('serial_id')
+                if not serial_id:
+                    continue
+                valve = self.valves.setdefault(serial_id, {field: None for field in VALVE_FIELDS})
+                for field in VALVE_FIELDS:
+                    if valve[field] is None and record.get(field) is not None:
+                        valve[field] = record[field]
+
+    def __len__(self) -> int:
+        return len(self.valves)
+
+    @staticmethod
+    def _mentioned(value: Any, text: str) -> bool:
+        if isinstance(value, float):
+            return f"{value:.1f}" in text or f"{value:g}" in text
+        return str(value) in text
+
+    def answer(self, text: str) -> List[Dict[str, Any]]:
+        """The valves text mentions, in order of first mention"""
+        valves = []
+        for serial_id in dict.fromkeys(SERIAL_PATTERN.findall(text)):
+            truth = self.valves.get(serial_id)
+            if truth is not None:
+                valve = {field: value if value is not None and self._mentioned(value, text) else None
+                         for field, value in truth.items()}
+                # The schema requires these, so a model always says something
+                valve.update({field: valve[field] or truth[field] or '' for field in REQUIRED_FIELDS})
+                valves.append(valve)
+                continue
+            match = parse_valve(text) if len(set(SERIAL_PATTERN.findall(text))) == 1 else None
+            if match is not None:
+                valves.append(match.valve.model_dump())
+        return valves
+
+def _drop_fields(valves: List[Dict[str, Any]], recall: float, rng: random.Random) -> List[Dict[str, Any]]:
+    """Forget each optional field with probability 1 - recall, to model a less accurate model"""
+    if recall >= 1:
+        return valves
+    return [{field: (value if field in REQUIRED_FIELDS or rng.random() < recall else None)
+             for field, value in valve.items()} for valve in valves]
+
+class MockOllama:
+    """Request handling and simulated timing, independent of the HTTP layer.
+
+    Every request waits for one of parallel slots (503 once max_queue are
+    waiting), pays the model load time if the model is not loaded (a
+    model stays loaded for its keep_alive), then sleeps for the sampled
+    latency plus prompt and generation time at the configured token
+    rates. The reported durations are the simulated ones, before
+    time_scale; total_duration adds them up with the time spent waiting
+    for a slot, so clients see consistent Ollama-shaped timing metadata.
+    Randomness is seeded by the request content, so the same request
+    always gets the same latency, errors and answer regardless of arrival
+    order.
+    """
+    def __init__(self, models: Sequence[ModelProfile] = (ModelProfile(DEFAULT_MODEL),),
+                 truth: Optional[GroundTruth] = None, latency: Optional[LatencyModel] = None,
+                 prompt_tokens_per_sec: float = DEFAULT_PROMPT_TOKENS_PER_SEC,
+                 load_seconds: float = DEFAULT_LOAD_SECONDS, context_length: int = DEFAULT_CONTEXT_LENGTH,
+                 parallel: int = DEFAULT_PARALLEL, max_queue: int = DEFAULT_MAX_QUEUE,
+                 error_rate: float = 0.0, malformed_rate: float = 0.0, seed: int = 0,
+                 time_scale: float = 1.0):
+        if not 0 <= error_rate <= 1 or not 0 <= malformed_rate <= 1:
+            raise ValueError("error_rate and malformed_rate must be between 0 and 1")
+        self.models = {model.name: model for model in models}
+        self.truth = truth or GroundTruth()
+        self.latency = latency or LatencyModel()
+        self.prompt_tokens_per_sec = prompt_tokens_per_sec
+        self.load_seconds = load_seconds
+        self.context_length = context_length
+        self.parallel = max(1, parallel)
+        self.max_queue = max_queue
+        self.error_rate = error_rate
+        self.malformed_rate = malformed_rate
+        self.seed = seed
+        self.time_scale = time_scale  # Multiplies every sleep; 0 reports durations without waiting
+        self._slots = threading.BoundedSemaphore(self.parallel)
+        self._lock = threading.Lock()
+        self._loaded_until: Dict[str, float] = {}  # Model -> monotonic expiry (inf while pinned)
+        self.waiting = 0
+        self.active = 0
+        self.stats = {'requests': 0, 'errors': 0, 'malformed': 0, 'rejected': 0, 'loads': 0,
+                      'prompt_tokens': 0, 'eval_tokens': 0, 'peak_active': 0}
+
+    def _rng(self, model: str, body: Dict[str, Any]) -> random.Random:
+        digest = hashlib.sha256(json.dumps([self.seed, model, body.get('messages'), body.get('prompt')],
+                                           sort_keys=True, default=str).encode('utf-8')).digest()
+        return random.Random(int.from_bytes(digest[:8], 'big'))
+
+    def _sleep(self, seconds: float):
+        if seconds > 0 and self.time_scale > 0:
+            time.sleep(seconds * self.time_scale)
+
+    def _simulated(self, seconds: float) -> float:
+        """Simulated duration of a real wait, on the same time base as the reported phases"""
+        return seconds / self.time_scale if self.time_scale > 0 else 0.0
+
+    def _load(self, model: str, keep_alive: float) -> float:
+        """Make sure model is loaded; returns the load time paid, in seconds"""
+        with self._lock:
+            now = time.monotonic()
+            loaded = self._loaded_until.get(model, 0) > now
+            if not loaded:
+                self.stats['loads'] += 1
+        load = 0.0 if loaded else self.load_seconds
+        self._sleep(load)
+        with self._lock:
+            self._loaded_until[model] = math.inf if keep_alive < 0 else time.monotonic() + keep_alive
+        return load
+
+    def loaded(self) -> List[str]:
+        now = time.monotonic()
+        with self._lock:
+            return [model for model, until in self._loaded_until.items() if until > now]
+
+    def tags(self) -> Dict[str, Any]:
+        return {'models': [{'name': model.name, 'model': model.name, 'digest': model.digest, 'size': 0,
+                            'modified_at': _timestamp(), 'details': {'family': 'mock', 'format': 'gguf'}}
+                           for model in self.models.values()]}
+
+    def show(self, body: Dict[str, Any]) -> Tuple[int, Dict[str, Any]]:
+        name = body.get('model') or body.get('name') or ''
+        if name not in self.models:
+            return 404, {'error': f"model '{name}' not found"}
+        return 200, {'modelfile': '', 'parameters': '', 'template': '{{ .Prompt }}',
+                     'details': {'family': 'mock', 'format': 'gguf'},
+                     'model_info': {'general.architecture': 'mock', 'mock.context_length': self.context_length}}
+
+    def _content(self, text: str, schema: Any, profile: ModelProfile, rng: random.Random) -> str:
+        """Reply text: the ground truth shaped like the requested schema"""
+        properties = schema.get('properties', {}) if isinstance(schema, dict) else {}
+        if 'rows' in properties:
+            rows = []
+            for line in text.splitlines():
+                match = ROW_ID_PATTERN.match(line)
+                if match is None:
+                    continue
+                valves = _drop_fields(self.truth.answer(line[match.end():]), profile.field_recall, rng)
+                if valves:
+                    rows.append({'row_id': int(match.group(1)), 'valves': valves})
+            return json.dumps({'rows': rows})
+        if 'valves' in properties or schema == 'json':
+            valves = []
+            for line in text.splitlines():
+                valves.extend(_drop_fields(self.truth.answer(line), profile.field_recall, rng))
+            return json.dumps({'valves': valves})
+        return f"Mock reply from {profile.name} to {len(text)} characters of input."
+
+    def complete(self, kind: str, body: Dict[str, Any]) -> Tuple[int, Dict[str, Any]]:
+        """Handle a chat or generate request; returns (status, final response body)"""
+        model = body.get('model', '')
+        profile = self.models.get(model)
+        if profile is None:
+            return 404, {'error': f"model '{model}' not found, try pulling it first"}
+        with self._lock:
+            if self.waiting >= self.max_queue:
+                self.stats['rejected'] += 1
+                return 503, {'error': 'server busy, please try again.  maximum pending requests exceeded'}
+            self.waiting += 1
+        queued_at = time.perf_counter()
+        with self._slots:
+            with self._lock:
+                self.waiting -= 1
+                self.active += 1
+                self.stats['peak_active'] = max(self.stats['peak_active'], self.active)
+            try:
+                return self._serve(kind, body, profile, queued_at)
+            finally:
+                with self._lock:
+                    self.active -= 1
+
+    def _serve(self, kind: str, body: Dict[str, Any], profile: ModelProfile,
+               queued_at: float) -> Tuple[int, Dict[str, Any]]:
+        waited = self._simulated(time.perf_counter() - queued_at)
+        rng = self._rng(profile.name, body)
+        keep_alive = keep_alive_seconds(body.get('keep_alive'))
+        load = self._load(profile.name, keep_alive)
+        if kind == 'chat':
+            messages = body.get('messages') or []
+            prompt = "\n".join(str(message.get('content', '')) for message in messages)
+            # Only the user's text carries valves; the system prompt is instructions
+            text = "\n".join(str(message.get('content', '')) for message in messages if message.get('role') == 'user')
+        else:
+            prompt = text = str(body.get('prompt') or '')
+
+        with self._lock:
+            self.stats['requests'] += 1
+        if kind == 'generate' and not prompt:
+            # An empty generate only loads (or with keep_alive 0, unloads) the model
+            if keep_alive == 0:
+                with self._lock:
+                    self._loaded_until.pop(profile.name, None)
+            return 200, {'model': profile.name, 'created_at': _timestamp(), 'response': '', 'done': True,
+                         'done_reason': 'unload' if keep_alive == 0 else 'load',
+                         'total_duration': _ns(waited + load), 'load_duration': _ns(load)}
+        if rng.random() < self.error_rate:
+            self._sleep(self.latency.sample(rng))
+            with self._lock:
+                self.stats['errors'] += 1
+            return 500, {'error': 'mock: injected server error'}
+
+        content = self._content(text, body.get('format'), profile, rng)
+        if rng.random() < self.malformed_rate:
+            content = content[:max(1, len(content) // 2)]  # Cut off mid-JSON, like an exhausted num_predict
+            with self._lock:
+                self.stats['malformed'] += 1
+        prompt_tokens = max(1, math.ceil(len(prompt) / CHARS_PER_TOKEN))
+        eval_tokens = max(1, math.ceil(len(content) / CHARS_PER_TOKEN))
+        prompt_seconds = prompt_tokens / self.prompt_tokens_per_sec
+        eval_seconds = eval_tokens / profile.tokens_per_sec
+        latency = self.latency.sample(rng)
+        self._sleep(latency + prompt_seconds + eval_seconds)
+        with self._lock:
+            self.stats['prompt_tokens'] += prompt_tokens
+            self.stats['eval_tokens'] += eval_tokens
+
+        response: Dict[str, Any] = {'model': profile.name, 'created_at': _timestamp()}
+        if kind == 'chat':
+            response['message'] = {'role': 'assistant', 'content': content}
+        else:
+            response['response'] = content
+        response.update({
+            'done': True,
+            'done_reason': 'stop',
+            'total_duration': _ns(waited + load + latency + prompt_seconds + eval_seconds),
+            'load_duration': _ns(load),
+            'prompt_eval_count': prompt_tokens,
+            'prompt_eval_duration': _ns(prompt_seconds),
+            'eval_count': eval_tokens,
+            'eval_duration': _ns(eval_seconds),
+        })
+        return 200, response
+
+    def ps(self) -> Dict[str, Any]:
+        return {'models': [{'name': name, 'model': name, 'digest': self.models[name].digest}
+                           for name in self.loaded() if name in self.models]}
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self.stats, 'active': self.active, 'waiting': self.waiting}
+
+def _ns(seconds: float) -> int:
+    return int(seconds * 1e9)
+
+def _timestamp() -> str:
+    return datetime.now(timezone.utc).isoformat().replace('+00:00', 'Z')
+
+def _stream_parts(kind: str, response: Dict[str, Any]) -> Iterable[Dict[str, Any]]:
+    """The final response as a content message followed by the done message, for stream=True"""
+    content = response['message']['content'] if kind == 'chat' else response['response']
+    if content:
+        part = {'model': response['model'], 'created_at': response['created_at'], 'done': False}
+        if kind == 'chat':
+            part['message'] = {'role': 'assistant', 'content': content}
+        else:
+            part['response'] = content
+        yield part
+    final = dict(response)
+    if kind == 'chat':
+        final['message'] = {'role': 'assistant', 'content': ''}
+    else:
+        final['response'] = ''
+    yield final
+
+class MockOllamaHandler(BaseHTTPRequestHandler):
+    server_version = 'MockOllama/1.0'
+    protocol_version = 'HTTP/1.1'  # Keep-alive, as pooled clients expect
+
+    @property
+    def mock(self) -> MockOllama:
+        return self.server.mock
+
+    def log_message(self, format: str, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _send_json(self, status: int, body: Any):
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _read_json(self) -> Optional[Dict[str, Any]]:
+        length = int(self.headers.get('Content-Length') or 0)
+        try:
+            body = json.loads(self.rfile.read(length) or b'{}')
+        except ValueError:
+            return None
+        return body if isinstance(body, dict) else None
+
+    def do_HEAD(self):
+        self.send_response(200)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def do_GET(self):
+        if self.path == '/':
+            data = b'Ollama is running'
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; charset=utf-8')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+        elif self.path == '/api/tags':
+            self._send_json(200, self.mock.tags())
+        elif self.path == '/api/ps':
+            self._send_json(200, self.mock.ps())
+        elif self.path == '/api/version':
+            self._send_json(200, {'version': '0.0.0-mock'})
+        elif self.path == '/mock/stats':
+            self._send_json(200, self.mock.summary())
+        else:
+            self._send_json(404, {'error': 'not found'})
+
+    def do_POST(self):
+        body = self._read_json()
+        if body is None:
+            self._send_json(400, {'error': 'invalid JSON request body'})
+            return
+        if self.path == '/api/show':
+            self._send_json(*self.mock.show(body))
+            return
+        kind = {'/api/chat': 'chat', '/api/generate': 'generate'}.get(self.path)
+        if kind is None:
+            self._send_json(404, {'error': 'not found'})
+            return
+        status, response = self.mock.complete(kind, body)
+        if status != 200 or body.get('stream') is False:
+            self._send_json(status, response)
+            return
+        data = b''.join(json.dumps(part).encode('utf-8') + b'\n' for part in _stream_parts(kind, response))
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/x-ndjson')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+class MockOllamaServer(ThreadingHTTPServer):
+    """ThreadingHTTPServer serving a MockOllama; one thread per connection"""
+    daemon_threads = True
+
+    def __init__(self, mock: MockOllama, host: str = '127.0.0.1', port: int = DEFAULT_PORT,
+                 verbose: bool = False):
+        self.mock = mock
+        self.verbose = verbose
+        super().__init__((host, port), MockOllamaHandler)
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}'
+
+def start_mock_server(mock: Optional[MockOllama] = None, host: str = '127.0.0.1',
+                      port: int = 0) -> MockOllamaServer:
+    """Serve mock in a background thread (port 0 picks a free port); stop with server.shutdown()"""
+    server = MockOllamaServer(mock or MockOllama(), host, port)
+    thread = threading.Thread(target=server.serve_forever, name='mock-ollama', daemon=True)
+    thread.start()
+    return server
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Serve a mock Ollama API for performance testing")
+    parser.add_argument('--host', default='127.0.0.1', help="Address to listen on (default: 127.0.0.1)")
+    parser.add_argument('-p', '--port', type=int, default=DEFAULT_PORT, help=f"Port (default: {DEFAULT_PORT})")
+    parser.add_argument('--model', type=model_profile, action='append', dest='models', default=None,
+                        help="Model to serve as NAME[:TOKENS_PER_SEC[:FIELD_RECALL]]; repeat for several "
+                             f"(default: {DEFAULT_MODEL}:{DEFAULT_TOKENS_PER_SEC:g}:1)")
+    parser.add_argument('--truth', action='append', default=[],
+                        help="Ground truth JSONL from valve_data_sample.py to answer from; repeatable")
+    parser.add_argument('--latency', type=LatencyModel, default=LatencyModel(),
+                        help="Per-request overhead: fixed:S, uniform:LOW,HIGH, normal:MEAN,STD, "
+                             "lognormal:MU,SIGMA or exp:MEAN, in seconds (default: fixed:0)")
+    parser.add_argument('--prompt-tokens-per-sec', type=float, default=DEFAULT_PROMPT_TOKENS_PER_SEC,
+                        help=f"Prompt evaluation speed (default: {DEFAULT_PROMPT_TOKENS_PER_SEC:g})")
+    parser.add_argument('--load-seconds', type=float, default=DEFAULT_LOAD_SECONDS,
+                        help=f"Time to load a model that is not in memory (default: {DEFAULT_LOAD_SECONDS:g})")
+    parser.add_argument('--context-length', type=int, default=DEFAULT_CONTEXT_LENGTH,
+                        help=f"Context length reported by /api/show (default: {DEFAULT_CONTEXT_LENGTH})")
+    parser.add_argument('--parallel', type=int, default=DEFAULT_PARALLEL,
+                        help=f"Requests served at once (default: {DEFAULT_PARALLEL})")
+    parser.add_argument('--max-queue', type=int, default=DEFAULT_MAX_QUEUE,
+                        help=f"Requests waiting for a slot before 503 (default: {DEFAULT_MAX_QUEUE})")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Fraction of requests failing with a 500")
+    parser.add_argument('--malformed-rate', type=float, default=0.0,
+                        help="Fraction of replies cut off mid-JSON")
+    parser.add_argument('--time-scale', type=float, default=1.0,
+                        help="Multiplier for every simulated delay; 0 answers at once (default: 1)")
+    parser.add_argument('--seed', type=int, default=0, help="Random seed (default: 0)")
+    parser.add_argument('-v', '--verbose', action='store_true', help="Log every request")
+    return parser
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    try:
+        truth = GroundTruth(args.truth)
+        mock = MockOllama(args.models or [ModelProfile(DEFAULT_MODEL)], truth, args.latency,
+                          args.prompt_tokens_per_sec, args.load_seconds, args.context_length, args.parallel,
+                          args.max_queue, args.error_rate, args.malformed_rate, args.seed, args.time_scale)
+        server = MockOllamaServer(mock, args.host, args.port, args.verbose)
+    except (OSError, ValueError) as e:
+        print(f"Error: {str(e)}", file=sys.stderr)
+        return 1
+    print(f"Mock Ollama on {server.url} serving {', '.join(mock.models)} "
+          f"({len(truth)} ground truth valves, {mock.parallel} parallel)", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    print(f"Served: {json.dumps(mock.summary())}", file=sys.stderr)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
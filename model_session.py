@@ -0,0 +1,66 @@
+"""Model warm-up and keep_alive management across the endpoints of a pool"""
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional, Union
+from ollama_pool import EndpointPool, OllamaEndpoint
+
+RUN_KEEP_ALIVE = '30m'  # Model stays loaded this long after each request during a run
+IDLE_KEEP_ALIVE = '5m'  # Ollama's default, restored when a run ends
+
+class ModelSession:
+    """Keeps the selected model loaded on every endpoint that serves it.
+
+    preload() sends an empty generate request to each such endpoint, which
+    makes Ollama load the model without evaluating anything, so the first
+    chunk of a run does not pay for the load. The request uses the run's
+    options (num_ctx in particular): a model loaded with a different
+    context size would be reloaded by the first chunk. While a run is
+    active the pool sends keep_alive with every chat; end_run() hands the
+    model back to the idle keep_alive, with the same options so it is
+    not reloaded just to change the timer.
+    """
+    def __init__(self, pool: EndpointPool, keep_alive: Union[float, str] = RUN_KEEP_ALIVE,
+                 idle_keep_alive: Union[float, str] = IDLE_KEEP_ALIVE):
+        self.pool = pool
+        self.keep_alive = keep_alive
+        self.idle_keep_alive = idle_keep_alive
+        self.model = ""
+        self.options: Optional[Dict[str, Any]] = None
+
+    def _endpoints(self, model: str):
+        return [endpoint for endpoint in self.pool.healthy() if model in endpoint.models]
+
+    def _touch(self, endpoint: OllamaEndpoint, model: str, keep_alive: Union[float, str],
+               options: Optional[Dict[str, Any]]) -> Optional[str]:
+        """Empty generate request; returns an error message or None"""
+        try:
+            endpoint.client.generate(model=model, prompt='', keep_alive=keep_alive, options=options)
+        except Exception as e:
+            return str(e)
+        return None
+
+    def preload(self, model: str, options: Optional[Dict[str, Any]] = None) -> str:
+        """Load model on every endpoint that has it, in parallel; returns a one-line report"""
+        self.model = model
+        self.options = options
+        endpoints = self._endpoints(model)
+        if not endpoints:
+            return f"Model {model} is not installed on any reachable endpoint"
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=len(endpoints)) as executor:
+            errors = list(executor.map(lambda e: self._touch(e, model, self.keep_alive, options), endpoints))
+        elapsed = time.perf_counter() - start
+        failures = [f"{endpoint.url}: {error}" for endpoint, error in zip(endpoints, errors) if error is not None]
+        report = f"Loaded {model} on {len(endpoints) - len(failures)}/{len(endpoints)} endpoints in {elapsed:.1f}s"
+        return report + (f" ({'; '.join(failures)})" if failures else "")
+
+    def begin_run(self, model: str, options: Optional[Dict[str, Any]] = None):
+        self.model = model
+        self.options = options
+        self.pool.keep_alive = self.keep_alive
+
+    def end_run(self):
+        """Stop pinning the model; it unloads after the idle keep_alive instead"""
+        self.pool.keep_alive = None
+        for endpoint in self._endpoints(self.model):
+            self._touch(endpoint, self.model, self.idle_keep_alive, self.options)
@@ -0,0 +1,258 @@
+"""Pool of Ollama endpoints with health checks, least-outstanding routing and failover"""
+import os
+import time
+import asyncio
+import threading
+from typing import Any, Dict, List, Optional, Sequence, Union
+import httpx
+import ollama
+import requests
+
+DEFAULT_HOST = 'http://localhost:11434'
+HOSTS_ENV = 'OLLAMA_HOSTS'  # Comma-separated endpoint URLs
+HEALTH_INTERVAL = 30.0  # Seconds before a host's models and health are checked again
+UNHEALTHY_RETRY = 5.0  # Seconds before a failed host is checked again
+HEALTH_TIMEOUT = 5.0
+KEEPALIVE_EXPIRY = 60.0  # Seconds an idle pooled connection is kept open
+# Failures of the host itself rather than of one request; ollama raises ConnectionError when it cannot connect
+TRANSPORT_ERRORS = (httpx.TransportError, ConnectionError, TimeoutError)
+
+def configured_hosts(hosts: Optional[str] = None) -> List[str]:
+    """Endpoint URLs from a comma-separated string or $OLLAMA_HOSTS, defaulting to localhost"""
+    value = hosts if hosts is not None else os.environ.get(HOSTS_ENV, '')
+    urls = [url.strip().rstrip('/') for url in value.split(',') if url.strip()]
+    return [url if '://' in url else f'http://{url}' for url in urls] or [DEFAULT_HOST]
+
+class OllamaEndpoint:
+    """One Ollama server: its client, installed models and routing state"""
+    def __init__(self, url: str):
+        self.url = url
+        self.client = ollama.Client(host=url)
+        self.async_client: Optional[ollama.AsyncClient] = None  # Created on first use inside the event loop
+        self.models: Dict[str, str] = {}  # Installed model name -> digest
+        self.healthy = False
+        self.checked_at = 0.0  # monotonic time of the last health check, 0 if never
+        self.outstanding = 0
+        self.requests = 0
+        self.failures = 0
+        self.last_error = ""
+
+    def check(self):
+        """Health check: list the installed models, marking the host down on failure"""
+        try:
+            response = requests.get(f'{self.url}/api/tags', timeout=HEALTH_TIMEOUT)
+            response.raise_for_status()
+            self.models = {entry['name']: entry.get('digest', '')
+                           for entry in response.json().get('models', [])}
+            self.healthy = True
+            self.last_error = ""
+        except Exception as e:
+            self.healthy = False
+            self.last_error = str(e)
+        self.checked_at = time.monotonic()
+
+    def stale(self) -> bool:
+        interval = HEALTH_INTERVAL if self.healthy else UNHEALTHY_RETRY
+        return time.monotonic() - self.checked_at >= interval
+
+class EndpointPool:
+    """Routes chat requests across Ollama endpoints.
+
+    Only healthy hosts that have the requested model installed are
+    considered, and of those the one with the fewest outstanding requests
+    wins (ties go to the host that has served fewer requests). A request
+    that cannot reach its host (connection error, timeout) is retried on
+    the next best host it has not been tried on yet, and the host is
+    marked down until its next health check. A 5xx response fails only
+    that request: it is retried on another host, but the host stays up.
+    A 404 drops the model from that host only. Other errors are the
+    request's fault and are raised. When every host with the model is
+    down, a request waits for the next health check instead of failing
+    at once. Health checks run lazily from the routing path, so a
+    restarted host rejoins on its own. Exposes chat() like ollama.Client,
+    so it can be passed to process_chunk as the client; safe to share
+    between worker threads. achat() is the asyncio equivalent, sending
+    requests over one pooled keep-alive connection set per host of up to
+    max_connections. While keep_alive is set it is sent with every
+    request, so the model stays loaded between chunks (see ModelSession).
+    """
+    def __init__(self, urls: Optional[Sequence[str]] = None, max_connections: int = 32):
+        self.endpoints = [OllamaEndpoint(url) for url in (urls or configured_hosts())]
+        self.max_connections = max_connections
+        self.keep_alive: Optional[Union[float, str]] = None
+        self._lock = threading.Lock()
+        self._checking = threading.Lock()
+
+    @property
+    def urls(self) -> List[str]:
+        return [endpoint.url for endpoint in self.endpoints]
+
+    def refresh(self):
+        """Health-check every endpoint now"""
+        with self._checking:
+            for endpoint in self.endpoints:
+                endpoint.check()
+
+    def _refresh_stale(self):
+        if not self._checking.acquire(blocking=False):
+            return  # Another thread is already checking
+        try:
+            for endpoint in self.endpoints:
+                if endpoint.stale():
+                    endpoint.check()
+        finally:
+            self._checking.release()
+
+    def _recheck_delay(self, model: str, tried: Sequence[OllamaEndpoint]) -> Optional[float]:
+        """Seconds until a down host that might serve model is checked again, None if there is none"""
+        due = [UNHEALTHY_RETRY - (time.monotonic() - endpoint.checked_at) for endpoint in self.endpoints
+               if not endpoint.healthy and endpoint not in tried and (model in endpoint.models or not endpoint.models)]
+        return max(0.0, min(due)) if due else None
+
+    def _recheck(self):
+        """Health-check the hosts that are due, waiting for a check already running in another thread"""
+        with self._checking:
+            for endpoint in self.endpoints:
+                if endpoint.stale():
+                    endpoint.check()
+
+    def healthy(self) -> List[OllamaEndpoint]:
+        return [endpoint for endpoint in self.endpoints if endpoint.healthy]
+
+    def models(self) -> Dict[str, str]:
+        """Models installed on any healthy host -> digest, in host order"""
+        models: Dict[str, str] = {}
+        for endpoint in self.healthy():
+            for name, digest in endpoint.models.items():
+                models.setdefault(name, digest)
+        return models
+
+    def url_for(self, model: str) -> str:
+        """URL of a healthy host with model installed, for metadata requests"""
+        for endpoint in self.healthy():
+            if model in endpoint.models:
+                return endpoint.url
+        return self.endpoints[0].url
+
+    def _acquire(self, model: str, tried: Sequence[OllamaEndpoint]) -> Optional[OllamaEndpoint]:
+        self._refresh_stale()
+        endpoint = self._pick(model, tried)
+        delay = self._recheck_delay(model, tried) if endpoint is None else None
+        if delay is not None:
+            # Every host that could serve the request is down; one of them may be back at its next check
+            time.sleep(delay)
+            self._recheck()
+            endpoint = self._pick(model, tried)
+        return endpoint
+
+    def _pick(self, model: str, tried: Sequence[OllamaEndpoint]) -> Optional[OllamaEndpoint]:
+        with self._lock:
+            candidates = [endpoint for endpoint in self.endpoints
+                          if endpoint.healthy and model in endpoint.models and endpoint not in tried]
+            if not candidates:
+                return None
+            endpoint = min(candidates, key=lambda e: (e.outstanding, e.requests))
+            endpoint.outstanding += 1
+            endpoint.requests += 1
+            return endpoint
+
+    def _release(self, endpoint: OllamaEndpoint, model: str, error: Optional[Exception] = None) -> bool:
+        """Return a host to the pool; True if the error should be retried elsewhere"""
+        with self._lock:
+            endpoint.outstanding -= 1
+            if error is None:
+                return False
+            endpoint.failures += 1
+            endpoint.last_error = str(error)
+            status = error.status_code if isinstance(error, ollama.ResponseError) else -1
+            if status == 404:
+                endpoint.models.pop(model, None)
+                return True
+            if status >= 500:
+                return True  # The host answered, so it stays up
+            if status >= 0 or not isinstance(error, TRANSPORT_ERRORS):
+                return False
+            endpoint.healthy = False
+            endpoint.checked_at = time.monotonic()
+            return True
+
+    def _request_kwargs(self, kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        if self.keep_alive is not None:
+            kwargs.setdefault('keep_alive', self.keep_alive)
+        return kwargs
+
+    def chat(self, model: str, **kwargs) -> Any:
+        """ollama.Client.chat on the least-loaded host with model, failing over to the others"""
+        kwargs = self._request_kwargs(kwargs)
+        tried: List[OllamaEndpoint] = []
+        last_error: Optional[Exception] = None
+        while True:
+            endpoint = self._acquire(model, tried)
+            if endpoint is None:
+                break
+            tried.append(endpoint)
+            try:
+                response = endpoint.client.chat(model=model, **kwargs)
+            except Exception as e:
+                if not self._release(endpoint, model, e):
+                    raise
+                last_error = e
+                continue
+            self._release(endpoint, model)
+            return response
+        if last_error is not None:
+            raise last_error
+        raise RuntimeError(f"No healthy Ollama endpoint has model '{model}' ({', '.join(self.urls)})")
+
+    async def achat(self, model: str, **kwargs) -> Any:
+        """Awaitable chat() with the same routing and failover, for ollama.AsyncClient users"""
+        kwargs = self._request_kwargs(kwargs)
+        tried: List[OllamaEndpoint] = []
+        last_error: Optional[Exception] = None
+        while True:
+            if any(endpoint.stale() for endpoint in self.endpoints):
+                # Health checks are blocking HTTP calls; keep them off the event loop
+                await asyncio.to_thread(self._refresh_stale)
+            endpoint = self._pick(model, tried)
+            delay = self._recheck_delay(model, tried) if endpoint is None else None
+            if delay is not None:
+                await asyncio.sleep(delay)
+                await asyncio.to_thread(self._recheck)
+                endpoint = self._pick(model, tried)
+            if endpoint is None:
+                break
+            tried.append(endpoint)
+            try:
+                response = await self._async_client(endpoint).chat(model=model, **kwargs)
+            except Exception as e:
+                if not self._release(endpoint, model, e):
+                    raise
+                last_error = e
+                continue
+            self._release(endpoint, model)
+            return response
+        if last_error is not None:
+            raise last_error
+        raise RuntimeError(f"No healthy Ollama endpoint has model '{model}' ({', '.join(self.urls)})")
+
+    def _async_client(self, endpoint: OllamaEndpoint) -> ollama.AsyncClient:
+        if endpoint.async_client is None:
+            limits = httpx.Limits(max_connections=self.max_connections,
+                                  max_keepalive_connections=self.max_connections,
+                                  keepalive_expiry=KEEPALIVE_EXPIRY)
+            endpoint.async_client = ollama.AsyncClient(host=endpoint.url, limits=limits)
+        return endpoint.async_client
+
+    async def aclose(self):
+        """Close the pooled async connections; call from the loop that used them"""
+        for endpoint in self.endpoints:
+            if endpoint.async_client is not None:
+                await endpoint.async_client.close()
+                endpoint.async_client = None
+
+    def summary(self) -> str:
+        parts = []
+        for endpoint in self.endpoints:
+            state = 'up' if endpoint.healthy else 'down'
+            parts.append(f"{endpoint.url} {state}: {endpoint.requests} requests, {endpoint.failures} failed")
+        return "Endpoints: " + "; ".join(parts)
@@ -1,32 +1,391 @@
 import sys
-import json
+
+if __name__ == '__main__' and sys.argv[1:2] == ['batch']:
+    # Headless batch mode must run without importing Qt
+    from valve_batch import main as batch_main
+    sys.exit(batch_main(sys.argv[2:]))
+
+import os
+import time
+import queue
+import tempfile
+import threading
+from collections import deque
 from datetime import datetime
 from PyQt6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, 
                             QHBoxLayout, QPushButton, QTextEdit, QLabel, 
-                            QFileDialog, QComboBox, QMessageBox, QTreeWidget,
-                            QTreeWidgetItem, QStackedWidget, QProgressBar)
-from PyQt6.QtCore import Qt
+                            QFileDialog, QComboBox, QMessageBox, QTableView,
+                            QHeaderView, QStackedWidget, QProgressBar,
+                            QSpinBox, QCheckBox)
+from PyQt6.QtCore import Qt, QObject, QRunnable, QThreadPool, QTimer, pyqtSignal
 import pandas as pd
-import ollama
-import requests
-from pydantic import BaseModel, Field
-from typing import List, Optional, Dict, Any, TypedDict, Literal
-from langchain_text_splitters import RecursiveCharacterTextSplitter
+from typing import List, Optional, Dict, Any, TypedDict, Literal, Iterable, Iterator, Tuple, Union, Callable
+from valve_extraction import (ValveSpecification, ValveList, RowValvesList, ResponseObserver, RowResults,
+                              SYSTEM_PROMPT, BATCH_SYSTEM_PROMPT, CHAT_OPTIONS, UNATTRIBUTED_ROW,
+                              process_chunk, process_row_chunk)
+from valve_merge import ValveMerger, CONFLICT_POLICIES, DEFAULT_POLICY
+from extraction_cache import ExtractionCache, DEFAULT_CACHE_PATH, DEFAULT_MAX_BYTES
+from row_chunker import RowChunk, iter_dataframe_rows
+from valve_prefilter import ValvePrefilter, DEFAULT_MIN_SCORE
+from valve_rules import RuleExtractor
+from dataframe_model import DataFrameTableModel
+from excel_stream import ExcelStream, PREVIEW_ROWS
+from valve_pipeline import make_text_splitter, row_chunks, text_chunks
+from chunk_budget import ChunkBudget, ChunkPlan, DEFAULT_RATIO_PATH
+from ollama_pool import EndpointPool, HOSTS_ENV
+from model_session import ModelSession, RUN_KEEP_ALIVE
+from result_sink import JsonlSink, jsonl_to_excel, jsonl_to_json_document
+from inference_telemetry import InferenceTelemetry, DEFAULT_TELEMETRY_DIR
+from job_journal import JobJournal, RetryPolicy, DEFAULT_JOB_DIR, JOURNAL_SUFFIX
+from stage_profiler import StageProfiler, PROFILE_ENV, options_from_env, profile_dir
+from stage_timer import stage
+
+PREFILTER_MIN_SCORE = DEFAULT_MIN_SCORE  # Valve signal needed to send a row to the model
+OUTPUT_TAIL_RECORDS = 50  # Most recent valves shown in the output area
+MERGE_POLICY = DEFAULT_POLICY  # Default resolution when sightings of a valve disagree
+MAX_PARALLEL_CHUNKS = 4  # Default number of chunks in flight at once
+PREPARED_CHUNKS = 8  # Chunks prepared ahead of the workers; bounds memory for streamed workbooks
+CACHE_PATH = DEFAULT_CACHE_PATH  # On-disk extraction cache
+CACHE_MAX_BYTES = DEFAULT_MAX_BYTES  # LRU eviction threshold for the cache
+KEEP_ALIVE = RUN_KEEP_ALIVE  # How long the model stays loaded between chunks of a run
+TELEMETRY_DIR = DEFAULT_TELEMETRY_DIR  # Inference metrics of the last run (JSON and Prometheus text)
+CHARS_PER_TOKEN_PATH = DEFAULT_RATIO_PATH  # Calibrated chars-per-token ratio of each model
+BUDGET_RETRY = 60.0  # Seconds before a model whose context length could not be looked up is tried again
+JOB_DIR = DEFAULT_JOB_DIR  # Journals of runs that were interrupted or not yet saved, for resuming
+
+class ChunkSignals(QObject):
+    """Signals emitted by a ChunkWorker back to the GUI thread"""
+    finished = pyqtSignal(int, int, object)  # run id, chunk index, valves (per source row when batched)
+    failed = pyqtSignal(int, int, str)  # run id, chunk index, error message
+
+class ChunkWorker(QRunnable):
+    """Runs process_chunk, or process_row_chunk for a tagged RowChunk, for one chunk on a QThreadPool thread"""
+    def __init__(self, run_id: int, index: int, chunk: Union[str, RowChunk], model: str,
+                 cache: Optional[ExtractionCache] = None, model_digest: str = "",
+                 options: Optional[Dict[str, Any]] = None, on_response: Optional[ResponseObserver] = None,
+                 client: Optional[Any] = None, row_ids: bool = False):
+        super().__init__()
+        self.run_id = run_id
+        self.index = index
+        self.chunk = chunk
+        self.model = model
+        self.cache = cache
+        self.model_digest = model_digest
+        self.options = options
+        self.on_response = on_response
+        self.client = client
+        self.row_ids = row_ids
+        self.signals = ChunkSignals()
+    
+    def run(self):
+        extract = process_row_chunk if self.row_ids else process_chunk
+        try:
+            valves = extract(self.chunk, self.model, self.cache, self.model_digest,
+                             self.options, self.on_response, self.client)
+        except Exception as e:
+            self.signals.failed.emit(self.run_id, self.index, str(e))
+        else:
+            self.signals.finished.emit(self.run_id, self.index, valves)
+
+class PreloadSignals(QObject):
+    """Signals emitted by a PreloadWorker back to the GUI thread"""
+    finished = pyqtSignal(str)  # report
+
+class PreloadWorker(QRunnable):
+    """Loads the selected model on its endpoints so the first chunk does not wait for it"""
+    def __init__(self, session: ModelSession, model: str, lookup: Callable[[str], ChunkBudget]):
+        super().__init__()
+        self.session = session
+        self.model = model
+        self.lookup = lookup  # Blocking budget lookup, giving the num_ctx the model is loaded with
+        self.signals = PreloadSignals()
+    
+    def run(self):
+        options = self.lookup(self.model).options()
+        self.signals.finished.emit(self.session.preload(self.model, options))
+
+class BudgetSignals(QObject):
+    """Signals emitted by a BudgetWorker back to the GUI thread"""
+    finished = pyqtSignal(str)  # model
+
+class BudgetWorker(QRunnable):
+    """Looks up a model's chunk budget, a blocking /api/show request, off the GUI thread"""
+    def __init__(self, lookup: Callable[[str], ChunkBudget], model: str):
+        super().__init__()
+        self.lookup = lookup
+        self.model = model
+        self.signals = BudgetSignals()
+    
+    def run(self):
+        try:
+            self.lookup(self.model)
+        finally:
+            self.signals.finished.emit(self.model)
 
-CHUNK_SIZE = 2000  # Characters per chunk
-CHUNK_OVERLAP = 200  # Overlap between chunks
+class ProducerSignals(QObject):
+    """Signals emitted by a ChunkProducer back to the GUI thread"""
+    produced = pyqtSignal(int)  # run id; another item is waiting in the queue
 
-class ValveSpecification(BaseModel):
-    valve_type: str = Field(description="Type of the valve (e.g., ball valve, gate valve, etc.)")
-    serial_id: str = Field(description="Unique identifier for the valve")
-    width: Optional[float] = Field(None, description="Width of the valve in millimeters")
-    height: Optional[float] = Field(None, description="Height of the valve in millimeters")
-    pressure_rating: Optional[str] = Field(None, description="Pressure rating of the valve")
-    material: Optional[str] = Field(None, description="Material of the valve construction")
-    manufacturer: Optional[str] = Field(None, description="Manufacturer of the valve")
+class ChunkProducer(QRunnable):
+    """Pulls a run's chunks into a bounded queue on a worker thread.
+
+    Pulling a chunk can mean reading the workbook, pre-filtering, rule
+    extraction and a journal lookup, all of which would stall the GUI.
+    Each queued item is (chunk, preset length when it was pulled,
+    checkpointed valves or None); the queue ends with None, or with the
+    exception that stopped the input.
+    """
+    def __init__(self, run_id: int, chunks: Iterator[Union[str, RowChunk]], output: queue.Queue,
+                 preset: List[ValveSpecification], journal: Optional[JobJournal] = None):
+        super().__init__()
+        self.run_id = run_id
+        self.chunks = chunks
+        self.output = output
+        self.preset = preset
+        self.journal = journal
+        self.stopped = threading.Event()
+        self.signals = ProducerSignals()
+    
+    def stop(self):
+        self.stopped.set()
+    
+    def _put(self, item: Any) -> bool:
+        # Wait while the queue is full, giving up once the run is cancelled
+        while not self.stopped.is_set():
+            try:
+                self.output.put(item, timeout=0.1)
+            except queue.Full:
+                continue
+            self.signals.produced.emit(self.run_id)
+            return True
+        return False
+    
+    def run(self):
+        end: Optional[Exception] = None
+        try:
+            for chunk in self.chunks:
+                mark = len(self.preset)
+                valves = self.journal.lookup("", chunk) if self.journal is not None else None
+                if not self._put((chunk, mark, valves)):
+                    return
+        except Exception as e:
+            end = e
+        self._put(end)
 
-class ValveList(BaseModel):
-    valves: List[ValveSpecification] = Field(description="List of valve specifications extracted from the text")
+class ExtractionEngine(QObject):
+    """Keeps a bounded number of chunks in flight and streams their results in chunk order"""
+    chunk_done = pyqtSignal(int, int, int)  # chunk index, chunks done, total chunks (0 while unknown)
+    chunk_failed = pyqtSignal(int, str)  # chunk index, error message
+    chunk_retrying = pyqtSignal(int, int, float, str)  # chunk index, attempt, delay in seconds, error message
+    input_failed = pyqtSignal(str)  # error raised while pulling the next chunk
+    valves_ready = pyqtSignal(object, list)  # origin (chunk index, "row N" or "rules"), valves; in input order
+    completed = pyqtSignal()
+    
+    def __init__(self, max_parallel: int = MAX_PARALLEL_CHUNKS,
+                 cache: Optional[ExtractionCache] = None, client: Optional[Any] = None, parent=None):
+        super().__init__(parent)
+        self.cache = cache
+        self.client = client  # e.g. an EndpointPool; None uses the default Ollama host
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(max_parallel)
+        self.producer_pool = QThreadPool(self)  # Separate, so the producer never takes a worker's slot
+        self.producer_pool.setMaxThreadCount(1)
+        self.producer: Optional[ChunkProducer] = None
+        self.prepared: queue.Queue = queue.Queue(PREPARED_CHUNKS)
+        self.pending: Dict[int, Optional[Union[List[ValveSpecification], RowResults]]] = {}  # Finished chunks awaiting predecessors
+        self.preset: List[ValveSpecification] = []
+        self.preset_marks: Dict[int, int] = {}  # Preset length when each chunk was pulled
+        self.preset_emitted = 0
+        self.model = ""
+        self.model_digest = ""
+        self.options: Optional[Dict[str, Any]] = None
+        self.on_response: Optional[ResponseObserver] = None
+        self.row_ids = False
+        self.journal: Optional[JobJournal] = None
+        self.retry = RetryPolicy()
+        self.held: Dict[int, Union[str, RowChunk]] = {}  # Chunks in flight or waiting to be retried
+        self.attempts: Dict[int, int] = {}  # Retries so far of chunks that failed
+        self.resumed = 0
+        self.failed = 0
+        self.pulled = 0
+        self.next_emit = 0
+        self.done = 0
+        self.in_flight = 0
+        self.exhausted = True
+        self.run_id = 0
+        self.running = False
+    
+    def set_max_parallel(self, max_parallel: int):
+        """Change how many chunks may be in flight at once"""
+        self.pool.setMaxThreadCount(max_parallel)
+        if self.running:
+            self._fill()
+    
+    def start(self, chunks: Iterable[Union[str, RowChunk]], model: str, model_digest: str = "",
+              preset: Optional[List[ValveSpecification]] = None,
+              options: Optional[Dict[str, Any]] = None, on_response: Optional[ResponseObserver] = None,
+              row_ids: bool = False, journal: Optional[JobJournal] = None):
+        """Pull chunks lazily, keeping at most max_parallel of them in flight.
+
+        chunks may be any iterable, including a generator streaming rows
+        from disk; it is consumed on a producer thread that stays at most
+        PREPARED_CHUNKS ahead of the workers, so the GUI never waits for
+        input, and a prepared chunk is only sent once a worker is free. Results
+        are held only until every earlier chunk has finished, then emitted
+        through valves_ready, so the output order never depends on which
+        worker finishes first. preset (e.g. the rule fast path's valves) may
+        keep filling while chunks are pulled; valves added to it before a
+        chunk was pulled are emitted ahead of that chunk's results.
+        options and on_response are passed through to process_chunk. With
+        row_ids, chunks are tagged RowChunks and each row's valves are
+        emitted separately, with origin "row N" (the chunk index for valves
+        no row mentions). With a journal, chunks it
+        already holds are not extracted again and every finished chunk is
+        checkpointed to it. A failed chunk is retried with exponential
+        backoff and still counts as in flight while it waits.
+        """
+        self._stop_producer()
+        self.run_id += 1
+        self.pending = {}
+        self.preset = preset if preset is not None else []
+        self.preset_marks = {}
+        self.preset_emitted = 0
+        self.model = model
+        self.model_digest = model_digest
+        self.options = options
+        self.on_response = on_response
+        self.row_ids = row_ids
+        self.journal = journal
+        self.held = {}
+        self.attempts = {}
+        self.resumed = 0
+        self.failed = 0
+        self.pulled = 0
+        self.next_emit = 0
+        self.done = 0
+        self.in_flight = 0
+        self.exhausted = False
+        self.running = True
+        self.prepared = queue.Queue(PREPARED_CHUNKS)
+        self.producer = ChunkProducer(self.run_id, iter(chunks), self.prepared, self.preset, journal)
+        self.producer.signals.produced.connect(self._on_produced)
+        self.producer_pool.start(self.producer)
+    
+    def cancel(self):
+        """Stop pulling chunks; chunks already in flight are ignored when they return"""
+        self._stop_producer()
+        self.pool.clear()
+        self.held = {}
+        self.run_id += 1
+        self.exhausted = True
+        self.running = False
+    
+    def _stop_producer(self):
+        if self.producer is not None:
+            self.producer.stop()
+            self.producer = None
+    
+    def _on_produced(self, run_id: int):
+        if run_id == self.run_id and self.running:
+            self._fill()
+    
+    def _fill(self):
+        while not self.exhausted and self.in_flight < self.pool.maxThreadCount():
+            try:
+                item = self.prepared.get_nowait()
+            except queue.Empty:
+                break  # The producer signals when the next chunk is ready
+            if item is None or isinstance(item, Exception):
+                self.exhausted = True
+                if item is not None:
+                    self.input_failed.emit(str(item))
+                break
+            
+            chunk, mark, valves = item
+            index = self.pulled
+            self.pulled += 1
+            self.preset_marks[index] = mark
+            if valves is not None:
+                # Checkpointed by an interrupted run; emitted in order like a finished chunk
+                self.resumed += 1
+                self.done += 1
+                self.pending[index] = valves
+                self._flush()
+                continue
+            self.held[index] = chunk
+            self.in_flight += 1
+            self._submit(index)
+        
+        if self.running and self.exhausted and self.in_flight == 0:
+            self._finish()
+    
+    def _submit(self, index: int):
+        worker = ChunkWorker(self.run_id, index, self.held[index], self.model, self.cache, self.model_digest,
+                             self.options, self.on_response, self.client, self.row_ids)
+        worker.signals.finished.connect(self._on_finished)
+        worker.signals.failed.connect(self._on_failed)
+        self.pool.start(worker)
+    
+    def _on_finished(self, run_id: int, index: int, valves: object):
+        if run_id != self.run_id:
+            return
+        chunk = self.held.pop(index)
+        if self.journal is not None:
+            self.journal.record("", index, chunk, valves)
+        self.pending[index] = valves
+        self._advance(index)
+    
+    def _on_failed(self, run_id: int, index: int, error: str):
+        if run_id != self.run_id:
+            return
+        attempt = self.attempts.get(index, 0)
+        if attempt < self.retry.retries:
+            # Still in flight while it waits, so a struggling server is not sent more work
+            self.attempts[index] = attempt + 1
+            delay = self.retry.delay(attempt)
+            self.chunk_retrying.emit(index, attempt + 1, delay, error)
+            QTimer.singleShot(int(delay * 1000), lambda: self._retry(run_id, index))
+            return
+        self.held.pop(index)
+        self.failed += 1
+        self.pending[index] = None
+        self.chunk_failed.emit(index, error)
+        self._advance(index)
+    
+    def _retry(self, run_id: int, index: int):
+        if run_id == self.run_id:
+            self._submit(index)
+    
+    def _advance(self, index: int):
+        self.done += 1
+        self.in_flight -= 1
+        self.chunk_done.emit(index, self.done, self.pulled if self.exhausted else 0)
+        self._flush()
+        self._fill()
+    
+    def _flush(self):
+        """Emit finished chunks that have no unfinished predecessor"""
+        while self.next_emit in self.pending:
+            valves = self.pending.pop(self.next_emit)
+            self._emit_preset(self.preset_marks.pop(self.next_emit))
+            if isinstance(valves, dict):
+                for row_index, row_valves in valves.items():
+                    # Valves no row mentions are the chunk's, like results without row IDs
+                    origin = self.next_emit if row_index == UNATTRIBUTED_ROW else f"row {row_index}"
+                    self.valves_ready.emit(origin, row_valves)
+            elif valves:
+                self.valves_ready.emit(self.next_emit, valves)
+            self.next_emit += 1
+    
+    def _emit_preset(self, upto: int):
+        if upto > self.preset_emitted:
+            self.valves_ready.emit("rules", self.preset[self.preset_emitted:upto])
+            self.preset_emitted = upto
+    
+    def _finish(self):
+        self._emit_preset(len(self.preset))
+        self.running = False
+        self.completed.emit()
 
 class MainWindow(QMainWindow):
     def __init__(self):
@@ -34,13 +393,22 @@ class MainWindow(QMainWindow):
         self.setWindowTitle("Valve Specification Extractor")
         self.setMinimumSize(1200, 800)
         self.current_df = None
-        
-        # Initialize text splitter
-        self.text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=CHUNK_SIZE,
-            chunk_overlap=CHUNK_OVERLAP,
-            length_function=len,
-        )
+        self.current_stream: Optional[ExcelStream] = None  # Set when a large workbook is streamed
+        self.current_file: Optional[str] = None  # Workbook shown in the table
+        self.use_prefilter = False
+        self.use_rules = False
+        self.model_digests: Dict[str, str] = {}
+        self.chunk_budgets: Dict[str, Tuple[ChunkBudget, float]] = {}  # Per model for the session, with lookup time
+        self.budget_lock = threading.Lock()  # Serializes budget lookups on worker threads
+        self.prefilter = ValvePrefilter(PREFILTER_MIN_SCORE)
+        self.rule_extractor = RuleExtractor()
+        self.merger = ValveMerger(MERGE_POLICY)
+        self.sink: Optional[JsonlSink] = None  # Merged results of the last run
+        self.telemetry: Optional[InferenceTelemetry] = None  # Model response metadata of the last run
+        self.journal: Optional[JobJournal] = None  # Checkpoints of the current run's chunks
+        self.job_complete = False  # The journal's run finished without failed chunks
+        self.profiler: Optional[StageProfiler] = None  # Open while a profiled load or run is in progress
+        self.output_tail = deque(maxlen=OUTPUT_TAIL_RECORDS)
         
         # Main widget and layout
         main_widget = QWidget()
@@ -59,6 +427,31 @@ class MainWindow(QMainWindow):
         model_layout.addWidget(model_label)
         model_layout.addWidget(self.model_combo)
         model_layout.addWidget(self.refresh_models_btn)
+        parallel_label = QLabel("Parallel:")
+        self.parallel_spin = QSpinBox()
+        self.parallel_spin.setRange(1, 32)
+        self.parallel_spin.setValue(MAX_PARALLEL_CHUNKS)
+        model_layout.addWidget(parallel_label)
+        model_layout.addWidget(self.parallel_spin)
+        self.prefilter_check = QCheckBox("Skip non-valve rows")
+        self.prefilter_check.setChecked(True)
+        model_layout.addWidget(self.prefilter_check)
+        self.rules_check = QCheckBox("Rule fast path")
+        self.rules_check.setChecked(True)
+        model_layout.addWidget(self.rules_check)
+        self.row_ids_check = QCheckBox("Row IDs")
+        self.row_ids_check.setToolTip("Tag Excel rows with their IDs so each valve is attributed to its source row")
+        model_layout.addWidget(self.row_ids_check)
+        self.profile_check = QCheckBox("Profile")
+        self.profile_check.setToolTip(f"Time each stage of file loading and processing and write a CPU/memory "
+                                      f"profile to {profile_dir()} (options from ${PROFILE_ENV})")
+        model_layout.addWidget(self.profile_check)
+        self.policy_combo = QComboBox()
+        self.policy_combo.addItems(CONFLICT_POLICIES)
+        self.policy_combo.setCurrentText(MERGE_POLICY)
+        self.policy_combo.setToolTip("Which value wins when sightings of the same valve disagree")
+        model_layout.addWidget(QLabel("Conflicts:"))
+        model_layout.addWidget(self.policy_combo)
         left_layout.addLayout(model_layout)
         
         # Stacked widget for input types
@@ -68,14 +461,19 @@ class MainWindow(QMainWindow):
         self.input_text = QTextEdit()
         self.input_stack.addWidget(self.input_text)
         
-        # Excel TreeView
-        self.tree_widget = QTreeWidget()
-        self.tree_widget.setAlternatingRowColors(True)
-        self.tree_widget.setRootIsDecorated(False)
-        self.tree_widget.setUniformRowHeights(True)
-        self.tree_widget.setSelectionBehavior(QTreeWidget.SelectionBehavior.SelectRows)
-        self.tree_widget.setSelectionMode(QTreeWidget.SelectionMode.ExtendedSelection)
-        self.input_stack.addWidget(self.tree_widget)
+        # Excel table, backed by a virtualized DataFrame model
+        self.table_model = DataFrameTableModel()
+        self.table_view = QTableView()
+        self.table_view.setModel(self.table_model)
+        self.table_view.setAlternatingRowColors(True)
+        self.table_view.setWordWrap(False)
+        self.table_view.setSelectionBehavior(QTableView.SelectionBehavior.SelectRows)
+        self.table_view.setSelectionMode(QTableView.SelectionMode.ExtendedSelection)
+        self.table_view.verticalHeader().setVisible(False)
+        self.table_view.verticalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
+        self.table_view.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Interactive)
+        self.table_view.setSortingEnabled(True)
+        self.input_stack.addWidget(self.table_view)
         
         left_layout.addWidget(self.input_stack)
         
@@ -132,136 +530,387 @@ class MainWindow(QMainWindow):
         self.save_excel_btn.clicked.connect(self.save_excel)
         self.refresh_models_btn.clicked.connect(self.refresh_models)
         
-        # Initialize
-        self.refresh_models()
-    
-    def process_chunk(self, chunk: str, model: str) -> List[ValveSpecification]:
-        """Process a single chunk of text using Ollama's structured output"""
+        # Profiling starts enabled when $VALVE_PROFILE asks for it
         try:
-            # Create the prompt with clear instructions
-            prompt = f"""Extract valve specifications from the following text. Return the data in a structured format.
-            Focus on identifying valve types, serial numbers, dimensions, pressure ratings, materials, and manufacturers.
-            
-            Text to analyze:
-            {chunk}
-            
-            Return as JSON matching the specified schema."""
-            
-            # Make the API call with structured output format
-            response = ollama.chat(
-                messages=[{
-                    'role': 'user',
-                    'content': prompt,
-                }],
-                model=model,
-                format=ValveList.model_json_schema(),
-                options={'temperature': 0}  # More deterministic output
-            )
-            
-            # Parse and validate the response
-            result = ValveList.model_validate_json(response.message.content)
-            return result.valves
-            
+            self.profile_options = options_from_env()
+        except ValueError as e:
+            self.profile_options = None
+            self.chat_text.append(f"Ignoring ${PROFILE_ENV}: {str(e)}")
+        self.profile_check.setChecked(self.profile_options is not None)
+        
+        # Persistent cache of chunk results; processing still works without it
+        try:
+            self.cache = ExtractionCache(CACHE_PATH, CACHE_MAX_BYTES)
         except Exception as e:
-            self.chat_text.append(f"Error processing chunk: {str(e)}")
-            return []
+            self.cache = None
+            self.chat_text.append(f"Extraction cache disabled: {str(e)}")
+        
+        # Ollama endpoints from $OLLAMA_HOSTS; chunks go to the least busy host with the model
+        self.pool = EndpointPool()
+        self.session = ModelSession(self.pool, KEEP_ALIVE)
+        
+        # Extraction engine runs chunks on a thread pool off the GUI thread
+        self.engine = ExtractionEngine(self.parallel_spin.value(), self.cache, self.pool, self)
+        self.engine.chunk_done.connect(self.on_chunk_done)
+        self.engine.chunk_failed.connect(self.on_chunk_failed)
+        self.engine.chunk_retrying.connect(self.on_chunk_retrying)
+        self.engine.input_failed.connect(self.on_input_failed)
+        self.engine.valves_ready.connect(self.on_valves_ready)
+        self.engine.completed.connect(self.on_processing_complete)
+        self.parallel_spin.valueChanged.connect(self.engine.set_max_parallel)
+        self.model_combo.currentTextChanged.connect(self.preload_model)
+        
+        # Initialize
+        self.refresh_models()
     
     def process_text(self):
         """Process the input text or Excel data with chunking"""
         try:
+            if self.engine.running:
+                QMessageBox.warning(self, "Error", "Processing is already running")
+                return
+            model = self.model_combo.currentText()
+            budget = self.cached_budget(model)
+            if budget is None:
+                # Looking up the context window can block for seconds; start once it is known
+                self.process_btn.setEnabled(False)
+                worker = BudgetWorker(self.chunk_budget, model)
+                worker.signals.finished.connect(self.budget_ready)
+                QThreadPool.globalInstance().start(worker)
+                return
+            
+            self.start_profiler()
+            self.use_prefilter = self.prefilter_check.isChecked()
+            self.use_rules = self.rules_check.isChecked()
+            self.prefilter.reset()
+            self.rule_extractor.reset()
+            prefilter = self.prefilter if self.use_prefilter else None
+            rules = self.rule_extractor if self.use_rules else None
+            # Chunks are sized from a frozen plan, so responses arriving mid-run never move their boundaries
+            plan = budget.plan()
+            row_ids = False
+            
             # Get input based on current view
-            if self.input_stack.currentWidget() == self.tree_widget:
+            if self.input_stack.currentWidget() == self.table_view:
                 if self.current_df is None:
                     raise Exception("No Excel data loaded")
-                input_text = self.current_df.to_string()
+                # Stream rows from disk for large workbooks, otherwise use the loaded frame
+                if self.current_stream is not None:
+                    rows = self.current_stream.iter_serialized_rows()
+                else:
+                    rows = iter_dataframe_rows(self.current_df)
+                # Pre-filter, rule-extract and pack whole rows as the engine asks for chunks
+                row_ids = self.row_ids_check.isChecked()
+                stat = os.stat(self.current_file)
+                journal, settings = self.open_journal(model, budget, plan, row_ids,
+                                                      f"{self.current_file}|{stat.st_size}|{stat.st_mtime_ns}")
+                plan = ChunkPlan(settings['chunk_tokens'], settings.get('chars_per_token', plan.chars_per_token))
+                # With row_ids the engine takes whole chunks, so it can scatter valves back to their rows
+                packed = row_chunks(rows, prefilter, rules, plan.chunk_tokens, plan.count_tokens, row_ids)
+                chunks = (chunk if row_ids else chunk.text for chunk in packed)
             else:
                 input_text = self.input_text.toPlainText()
+                if not input_text.strip():
+                    self.stop_profiler(write=False)
+                    QMessageBox.warning(self, "Error", "No input data")
+                    return
+                # Split text into chunks sized to the model's context window
+                journal, settings = self.open_journal(model, budget, plan, False, input_text)
+                splitter = make_text_splitter(settings['chunk_chars'], settings['chunk_chars'] // 10)
+                chunks = text_chunks(input_text, splitter, prefilter, rules)
             
-            if not input_text:
-                QMessageBox.warning(self, "Error", "No input data")
-                return
-            
-            # Split text into chunks
-            chunks = self.text_splitter.split_text(input_text)
+            # Merge sightings as chunks complete, streaming new and updated valves to a fresh result file
+            self.discard_results()
+            self.journal = journal
+            fd, result_path = tempfile.mkstemp(prefix="valve_specs_", suffix=".jsonl")
+            os.close(fd)
+            self.sink = JsonlSink(result_path)
+            self.merger = ValveMerger(self.policy_combo.currentText(), track_changes=True)
+            self.output_text.clear()
             
             # Update chat area
-            model = self.model_combo.currentText()
             self.chat_text.append(f"\nProcessing with model: {model}")
-            self.chat_text.append(f"Split into {len(chunks)} chunks")
+            self.chat_text.append(f"{self.parallel_spin.value()} chunks in parallel")
+            self.chat_text.append(budget.describe())
             
-            # Show progress bar
+            # Show progress bar; it stays indeterminate until the chunk count is known
             self.progress_bar.setVisible(True)
-            self.progress_bar.setMaximum(len(chunks))
+            self.progress_bar.setMaximum(len(chunks) if isinstance(chunks, list) else 0)
             self.progress_bar.setValue(0)
+            self.process_btn.setEnabled(False)
             
-            # Process chunks
-            all_valves = []
-            seen_serials = set()
-            
-            for i, chunk in enumerate(chunks):
-                self.chat_text.append(f"\nProcessing chunk {i+1}/{len(chunks)}...")
-                
-                # Process chunk
-                chunk_valves = self.process_chunk(chunk, model)
-                
-                # Add unique valves
-                for valve in chunk_valves:
-                    if valve.serial_id not in seen_serials:
-                        all_valves.append(valve)
-                        seen_serials.add(valve.serial_id)
-                
-                # Update progress
-                self.progress_bar.setValue(i + 1)
-                QApplication.processEvents()
-            
-            # Format final output
-            final_result = {"valves": [v.model_dump() for v in all_valves]}
-            formatted_output = json.dumps(final_result, indent=2)
-            self.output_text.setText(formatted_output)
+            # Response metadata feeds both the chunk budget and the run's inference metrics
+            telemetry = self.telemetry = InferenceTelemetry()
+            def observe(prompt: str, response: Any):
+                budget.observe(prompt, response)
+                telemetry.observe(prompt, response)
             
-            # Update chat
-            self.chat_text.append("Processing complete!")
-            self.progress_bar.setVisible(False)
+            # Hand the chunks to the worker pool; results arrive through signals
+            self.session.begin_run(model, budget.options())
+            self.engine.start(chunks, model, self.model_digests.get(model, ""), self.rule_extractor.valves,
+                              budget.options(), observe, row_ids, self.journal)
             
         except Exception as e:
             error_msg = f"Error processing data: {str(e)}"
             self.chat_text.append(f"Error: {error_msg}")
+            self.stop_profiler(write=False)
+            self.close_journal()
             self.progress_bar.setVisible(False)
+            self.process_btn.setEnabled(True)
             QMessageBox.warning(self, "Error", error_msg)
     
+    def open_journal(self, model: str, budget: ChunkBudget, plan: ChunkPlan, row_ids: bool,
+                     source: str) -> Tuple[Optional[JobJournal], Dict[str, Any]]:
+        """Journal for a run over source, offering to resume an interrupted one, and the chunking settings to use"""
+        self.close_journal()
+        # Rows are counted with the stored ratio, so a resumed run packs them exactly as before
+        settings = {'chunk_tokens': plan.chunk_tokens, 'chunk_chars': plan.chunk_chars,
+                    'chars_per_token': plan.chars_per_token}
+        system_prompt, result_model = ((BATCH_SYSTEM_PROMPT, RowValvesList) if row_ids
+                                       else (SYSTEM_PROMPT, ValveList))
+        fingerprint = ExtractionCache.make_key(model, self.model_digests.get(model, ""), system_prompt,
+                                               result_model.model_json_schema(), source,
+                                               {**CHAT_OPTIONS, **budget.options()})
+        path = os.path.join(JOB_DIR, fingerprint[:32] + JOURNAL_SUFFIX)
+        try:
+            journal = JobJournal.open(path, fingerprint)
+            done = journal.checkpointed()
+            if done:
+                answer = QMessageBox.question(
+                    self, "Resume",
+                    f"A run over this input with {model} stopped after {done} chunks. Resume it?"
+                )
+                if answer == QMessageBox.StandardButton.Yes:
+                    self.chat_text.append(f"Resuming: {done} chunks already extracted")
+                else:
+                    journal.remove()
+                    journal = JobJournal.open(path, fingerprint)
+            return journal, journal.settings("", settings)
+        except OSError as e:
+            # Processing still works, it just cannot be resumed
+            self.chat_text.append(f"Job journal disabled: {str(e)}")
+            return None, settings
+    
+    def close_journal(self):
+        """Close the run's journal, deleting it once nothing is left to resume"""
+        if self.journal is None:
+            return
+        if self.job_complete:
+            self.journal.remove()
+        else:
+            self.journal.close()
+        self.journal = None
+        self.job_complete = False
+    
+    def preload_model(self, model: str):
+        """Load a newly selected model in the background"""
+        if not model:
+            return
+        worker = PreloadWorker(self.session, model, self.chunk_budget)
+        worker.signals.finished.connect(self.chat_text.append)
+        QThreadPool.globalInstance().start(worker)
+    
+    def release_model(self):
+        """Let the model unload after the idle keep_alive once a run is over"""
+        QThreadPool.globalInstance().start(self.session.end_run)
+    
+    def cached_budget(self, model: str) -> Optional[ChunkBudget]:
+        """Chunk budget of a model if it was looked up; a failed lookup is kept for BUDGET_RETRY seconds"""
+        entry = self.chunk_budgets.get(model)
+        if entry is None:
+            return None
+        budget, looked_up = entry
+        if budget.context_length is None and time.monotonic() - looked_up >= BUDGET_RETRY:
+            return None
+        return budget
+    
+    def chunk_budget(self, model: str) -> ChunkBudget:
+        """Chunk budget of a model, looked up once; its ratio is calibrated after the first run.
+        
+        Blocks on Ollama's /api/show, so it runs on worker threads (see BudgetWorker).
+        """
+        with self.budget_lock:
+            budget = self.cached_budget(model)
+            if budget is None:
+                budget = ChunkBudget.for_model(model, self.pool.url_for(model))
+                self.chunk_budgets[model] = (budget, time.monotonic())
+            return budget
+    
+    def budget_ready(self, model: str):
+        """Start the run that was waiting for the model's budget"""
+        self.process_btn.setEnabled(True)
+        self.process_text()
+    
+    def on_chunk_done(self, index: int, done: int, total: int):
+        """Update progress as each chunk returns, in completion order"""
+        with stage('ui'):
+            if total:
+                self.progress_bar.setMaximum(total)
+                self.progress_bar.setValue(done)
+                self.chat_text.append(f"Processed chunk {index + 1}/{total} ({done} done)")
+            else:
+                self.chat_text.append(f"Processed chunk {index + 1} ({done} done)")
+    
+    def on_chunk_failed(self, index: int, error: str):
+        """Report a chunk that could not be extracted"""
+        self.chat_text.append(f"Error processing chunk {index + 1}: {error}")
+    
+    def on_chunk_retrying(self, index: int, attempt: int, delay: float, error: str):
+        """Report a failed chunk that will be tried again"""
+        self.chat_text.append(f"Error processing chunk {index + 1}: {error}; "
+                              f"retrying in {delay:.1f}s ({attempt}/{self.engine.retry.retries})")
+    
+    def on_input_failed(self, error: str):
+        """Report an error reading the input; chunks already queued still finish"""
+        self.chat_text.append(f"Error reading input: {error}")
+    
+    def on_valves_ready(self, origin, valves: List[ValveSpecification]):
+        """Merge newly finished valves into the index, append what changed to the result file and refresh the tail"""
+        with stage('ui'):
+            new_keys = self.merger.add(valves, origin)
+            # A valve that gains fields from a later sighting is written again; its last line is its merged state
+            self.sink.write(record.to_valve() for record in self.merger.changed())
+            self.output_tail.extend(new_keys)
+            self.show_output_tail()
+    
+    def show_output_tail(self):
+        """Show a summary and the most recently found valves instead of the full result set"""
+        count = len(self.merger)
+        header = f"{count} valves extracted"
+        if count > len(self.output_tail):
+            header += f" (showing the last {len(self.output_tail)})"
+        lines = [self.merger.get(key).to_valve().model_dump_json() for key in self.output_tail]
+        self.output_text.setPlainText("\n".join([header, *lines]))
+    
+    def on_processing_complete(self):
+        """Finish the result file and report once every chunk has returned"""
+        self.sink.close()
+        if self.sink.count > len(self.merger):
+            # Some valves were written more than once as later sightings filled them in; keep only their final state
+            self.sink = JsonlSink(self.sink.path)
+            self.sink.write(self.merger.valves())
+            self.sink.close()
+        self.show_output_tail()
+        
+        # Update chat
+        self.chat_text.append(f"Processed {self.engine.pulled} chunks, {self.sink.count} unique valves")
+        self.chat_text.append(self.merger.summary())
+        if self.use_prefilter:
+            self.chat_text.append(self.prefilter.summary())
+        if self.use_rules:
+            self.chat_text.append(self.rule_extractor.summary())
+        if len(self.pool.endpoints) > 1:
+            self.chat_text.append(self.pool.summary())
+        if self.cache is not None:
+            stats = self.cache.stats()
+            self.chat_text.append(
+                f"Cache: {stats['hits']} hits, {stats['misses']} misses, "
+                f"{stats['entries']} entries ({stats['bytes'] / 1024 / 1024:.1f} MB)"
+            )
+        if self.journal is not None:
+            self.chat_text.append(self.journal.summary())
+            self.job_complete = self.engine.failed == 0
+            if not self.job_complete:
+                self.chat_text.append(f"Process again to retry the {self.engine.failed} failed chunks; "
+                                      f"finished chunks are reused")
+        self.write_telemetry()
+        self.calibrate_budget()
+        self.stop_profiler()
+        self.chat_text.append("Processing complete!")
+        self.release_model()
+        self.progress_bar.setVisible(False)
+        self.process_btn.setEnabled(True)
+    
+    def calibrate_budget(self):
+        """Adopt the chars-per-token ratio measured over the run for the model's next runs"""
+        budget = self.cached_budget(self.engine.model)
+        try:
+            if budget is not None and budget.calibrate(CHARS_PER_TOKEN_PATH):
+                self.chat_text.append(f"Calibrated {budget.model} at {budget.chars_per_token:.2f} chars/token")
+        except OSError as e:
+            self.chat_text.append(f"Could not save the chars-per-token ratio: {str(e)}")
+    
+    def write_telemetry(self):
+        """Report where the model time went and write the run's metrics to TELEMETRY_DIR"""
+        self.telemetry.finish()
+        self.chat_text.append(self.telemetry.summary())
+        try:
+            self.telemetry.write_json(os.path.join(TELEMETRY_DIR, "last_run.json"))
+            self.telemetry.write_prometheus(os.path.join(TELEMETRY_DIR, "metrics.prom"))
+        except OSError as e:
+            self.chat_text.append(f"Could not write inference metrics: {str(e)}")
+    
+    def start_profiler(self):
+        """Open a profile when profiling is enabled and none is open yet"""
+        if self.profiler is None and self.profile_check.isChecked():
+            self.profiler = StageProfiler(self.profile_options or ()).start()
+    
+    def stop_profiler(self, write: bool = True):
+        """Close the open profile, reporting the per-stage summary and writing it to the profile directory"""
+        profiler, self.profiler = self.profiler, None
+        if profiler is None:
+            return
+        profiler.finish()
+        if not write:
+            return
+        self.chat_text.append(profiler.describe())
+        try:
+            paths = profiler.write()
+            self.chat_text.append(f"Profile written to {', '.join(paths)}")
+        except OSError as e:
+            self.chat_text.append(f"Could not write profile: {str(e)}")
+    
+    def discard_results(self):
+        """Close and delete the result file of the previous run"""
+        self.close_journal()
+        if self.sink is not None:
+            self.sink.close()
+            if os.path.exists(self.sink.path):
+                os.remove(self.sink.path)
+        self.sink = None
+        self.output_tail.clear()
+    
     def clear_all(self):
         """Clear all areas"""
+        if self.engine.running:
+            self.engine.cancel()
+            self.release_model()
+            self.process_btn.setEnabled(True)
+        self.stop_profiler(write=False)
+        self.discard_results()
         self.input_text.clear()
-        self.tree_widget.clear()
+        self.table_model.set_dataframe(None)
         self.output_text.clear()
         self.chat_text.clear()
         self.current_df = None
+        self.current_stream = None
+        self.current_file = None
         self.progress_bar.setVisible(False)
     
-    def update_tree_view(self, df):
-        """Update TreeView with Excel data in table format"""
-        self.tree_widget.clear()
+    def closeEvent(self, event):
+        """Stop processing and remove the temporary result file on exit"""
+        if self.engine.running:
+            self.engine.cancel()
+        self.stop_profiler(write=False)
+        self.discard_results()
+        super().closeEvent(event)
+    
+    def update_table_view(self, df):
+        """Show Excel data in the table; cells are formatted lazily for visible rows only"""
         self.current_df = df
         
-        # Set headers from DataFrame columns
-        self.tree_widget.setHeaderLabels(list(df.columns))
-        
-        # Add data rows
-        for idx, row in df.iterrows():
-            item = QTreeWidgetItem()
-            for col_idx, value in enumerate(row):
-                item.setText(col_idx, str(value))
-            self.tree_widget.addTopLevelItem(item)
-        
-        # Adjust column widths
-        for i in range(len(df.columns)):
-            self.tree_widget.resizeColumnToContents(i)
-        
-        # Switch to TreeView
-        self.input_stack.setCurrentWidget(self.tree_widget)
-        
-        # Enable sorting
-        self.tree_widget.setSortingEnabled(True)
+        with stage('view'):
+            # Reset sorting so the view starts in file order
+            self.table_view.horizontalHeader().setSortIndicator(-1, Qt.SortOrder.AscendingOrder)
+            self.table_model.set_dataframe(df)
+            
+            # Estimate column widths from a sample instead of measuring every cell
+            metrics = self.table_view.fontMetrics()
+            for i, width in enumerate(self.table_model.estimate_column_widths(metrics)):
+                self.table_view.setColumnWidth(i, width)
+            
+            # Switch to table view
+            self.input_stack.setCurrentWidget(self.table_view)
     
     def load_file(self):
         """Load text or Excel file"""
@@ -273,23 +922,60 @@ class MainWindow(QMainWindow):
         )
         
         if file_name:
+            # Loading is profiled on its own, unless it happens during a profiled run
+            profiling_load = self.profiler is None
+            self.start_profiler()
             try:
-                if file_name.endswith(('.xlsx', '.xls')):
-                    df = pd.read_excel(file_name)
-                    self.update_tree_view(df)
+                if file_name.endswith('.xlsx'):
+                    with stage('load'):
+                        stream = ExcelStream(file_name)
+                    if stream.total_rows is not None and stream.total_rows <= PREVIEW_ROWS:
+                        # Small sheet: load it whole so the preview shows every row
+                        self.current_stream = None
+                        with stage('load'):
+                            df = pd.read_excel(file_name)
+                        self.update_table_view(df)
+                        self.current_file = file_name
+                        self.chat_text.append(f"Loaded Excel file: {file_name}")
+                    else:
+                        # Large sheet: preview the first rows and stream the rest when processing
+                        self.current_stream = stream
+                        with stage('load'):
+                            df = stream.preview(PREVIEW_ROWS)
+                        self.update_table_view(df)
+                        self.current_file = file_name
+                        total = stream.total_rows if stream.total_rows is not None else "unknown"
+                        self.chat_text.append(
+                            f"Streaming Excel file: {file_name} (previewing {PREVIEW_ROWS} of {total} rows)"
+                        )
+                elif file_name.endswith('.xls'):
+                    # Legacy .xls files cannot be streamed by openpyxl
+                    self.current_stream = None
+                    with stage('load'):
+                        df = pd.read_excel(file_name)
+                    self.update_table_view(df)
+                    self.current_file = file_name
                     self.chat_text.append(f"Loaded Excel file: {file_name}")
                 else:
-                    with open(file_name, 'r', encoding='utf-8') as file:
-                        self.input_text.setText(file.read())
+                    with open(file_name, 'r', encoding='utf-8') as file, stage('load'):
+                        text = file.read()
+                    with stage('view'):
+                        self.input_text.setText(text)
                         self.input_stack.setCurrentWidget(self.input_text)
-                        self.chat_text.append(f"Loaded text file: {file_name}")
+                    self.chat_text.append(f"Loaded text file: {file_name}")
                 
             except Exception as e:
                 QMessageBox.warning(self, "Error", f"Error loading file: {str(e)}")
+            finally:
+                if profiling_load:
+                    self.stop_profiler()
+    
+    def has_results(self) -> bool:
+        return self.sink is not None and not self.engine.running and self.sink.count > 0
     
     def save_json(self):
         """Save results as JSON"""
-        if not self.output_text.toPlainText():
+        if not self.has_results():
             QMessageBox.warning(self, "Error", "No results to save")
             return
             
@@ -304,24 +990,25 @@ class MainWindow(QMainWindow):
             )
             
             if file_name:
-                save_data = {
+                # Stream the result file into the document instead of parsing it back from the widget
+                header = {
                     'timestamp': timestamp,
                     'model_used': self.model_combo.currentText(),
                     'chat_log': self.chat_text.toPlainText(),
-                    'structured_output': json.loads(self.output_text.toPlainText())
                 }
-                
-                with open(file_name, 'w', encoding='utf-8') as f:
-                    json.dump(save_data, f, indent=2)
+                if self.telemetry is not None:
+                    header['inference'] = self.telemetry.report(include_requests=False)
+                jsonl_to_json_document(self.sink.path, file_name, header)
                     
                 self.chat_text.append(f"\nResults saved to: {file_name}")
+                self.close_journal()
                 
         except Exception as e:
             QMessageBox.warning(self, "Error", f"Error saving results: {str(e)}")
     
     def save_excel(self):
         """Save results as Excel"""
-        if not self.output_text.toPlainText():
+        if not self.has_results():
             QMessageBox.warning(self, "Error", "No results to save")
             return
             
@@ -336,36 +1023,38 @@ class MainWindow(QMainWindow):
             )
             
             if file_name:
-                # Convert JSON output to DataFrame
-                data = json.loads(self.output_text.toPlainText())
-                df = pd.DataFrame(data['valves'])
-                
-                # Save to Excel
-                df.to_excel(file_name, index=False)
+                # Stream the result file into a write-only workbook
+                jsonl_to_excel(self.sink.path, file_name)
                 self.chat_text.append(f"\nResults saved to: {file_name}")
+                self.close_journal()
                 
         except Exception as e:
             QMessageBox.warning(self, "Error", f"Error saving results: {str(e)}")
     
     def refresh_models(self):
-        """Refresh the list of available Ollama models"""
+        """Refresh the list of models available on any healthy Ollama endpoint"""
         try:
-            url = 'http://localhost:11434/api/tags'
-            response = requests.get(url)
-            response.raise_for_status()
+            self.pool.refresh()
+            healthy = self.pool.healthy()
+            if not healthy:
+                errors = "\n".join(f"{endpoint.url}: {endpoint.last_error}" for endpoint in self.pool.endpoints)
+                raise Exception(errors)
             
             self.model_combo.clear()
-            models_data = response.json()
-            if 'models' in models_data:
-                model_names = [model['name'] for model in models_data['models']]
-                self.model_combo.addItems(model_names)
-                
-                if model_names:
-                    self.model_combo.setCurrentIndex(0)
-                    self.chat_text.append(f"Available models: {', '.join(model_names)}")
+            self.chunk_budgets = {}
+            self.model_digests = self.pool.models()
+            model_names = list(self.model_digests)
+            self.model_combo.addItems(model_names)
+            if len(self.pool.endpoints) > 1:
+                self.chat_text.append(f"{len(healthy)}/{len(self.pool.endpoints)} Ollama endpoints available")
+            
+            if model_names:
+                self.model_combo.setCurrentIndex(0)
+                self.chat_text.append(f"Available models: {', '.join(model_names)}")
                 
         except Exception as e:
-            QMessageBox.warning(self, "Error", f"Failed to get models: {str(e)}\nMake sure Ollama is running on http://localhost:11434")
+            hosts = ", ".join(self.pool.urls)
+            QMessageBox.warning(self, "Error", f"Failed to get models: {str(e)}\nMake sure Ollama is running on {hosts} (set ${HOSTS_ENV} to use other endpoints)")
 
 def main():
     app = QApplication(sys.argv)
@@ -4,15 +4,15 @@ from datetime import datetime
 from PyQt6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, 
                             QHBoxLayout, QPushButton, QTextEdit, QLabel, 
                             QFileDialog, QComboBox, QMessageBox, QTreeWidget,
-                            QTreeWidgetItem, QStackedWidget, QProgressBar)
+                            QTreeWidgetItem, QStackedWidget, QProgressBar, QSpinBox)
 from PyQt6.QtCore import Qt
 import pandas as pd
 import ollama
 import requests
 from pydantic import BaseModel, Field
-from typing import List, Optional, Dict, Any, TypedDict
-from langgraph.graph import Graph, StateGraph
-from langgraph.prebuilt import ToolExecutor
+from typing import List, Optional, Dict, Any, TypedDict, Annotated
+from langgraph.graph import StateGraph, START, END
+from langgraph.types import Send
 from langchain_core.messages import HumanMessage, AIMessage, SystemMessage
 from langchain_core.runnables import RunnableConfig
 from langchain_core.messages.base import BaseMessage
@@ -20,13 +20,36 @@ from langchain_text_splitters import RecursiveCharacterTextSplitter
 
 CHUNK_SIZE = 2000  # Characters per chunk
 CHUNK_OVERLAP = 200  # Overlap between chunks
+MEMORY_STRATEGIES = ('stateless', 'window', 'summary')
+MEMORY_STRATEGY = 'summary'  # What each chunk's request carries over from earlier chunks
+MEMORY_WINDOW = 2  # Previous chunk/reply turns resent by the 'window' strategy
+MAX_SUMMARY_SERIALS = 200  # Most recent serial IDs listed by the 'summary' strategy
+MAX_PARALLEL_CHUNKS = 4  # Default number of chunks extracted at once
+SYSTEM_PROMPT = "You are a valve specification analyzer. Extract structured information about valves from the text."
+
+def collect_results(existing: List[Dict[str, Any]], new: Optional[List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """Reducer for branch results: branches append, the merge node resets with None"""
+    return [] if new is None else existing + new
 
 class ProcessingState(TypedDict):
-    messages: List[Dict[str, str]]
-    current_chunk: str
-    chunks_processed: int
-    total_chunks: int
-    extracted_valves: List[Dict[str, Any]]
+    chunks: List[str]
+    model: str
+    memory_strategy: str
+    memory_window: int
+    wave_size: int  # Chunks dispatched per fan-out
+    next_chunk: int  # Index of the first chunk not yet dispatched
+    messages: List[Dict[str, str]]  # Recent turns, kept by the 'window' strategy only
+    seen_serials: List[str]  # Serial IDs found so far, oldest first, for the 'summary' strategy
+    results: Annotated[List[Dict[str, Any]], collect_results]  # Branch results of the current wave
+    valves: List[Dict[str, Any]]  # Deduplicated valves, in chunk order
+    errors: List[str]
+
+class ChunkTask(TypedDict):
+    """Input of one extract_chunk branch"""
+    index: int
+    chunk: str
+    model: str
+    memory: List[Dict[str, str]]
 
 class ValveSpecification(BaseModel):
     valve_type: str
@@ -40,6 +63,88 @@ class ValveSpecification(BaseModel):
 class ValveList(BaseModel):
     valves: List[ValveSpecification]
 
+def memory_messages(state: ProcessingState) -> List[Dict[str, str]]:
+    """Messages carried over from earlier chunks; their size is bounded for every strategy"""
+    strategy = state["memory_strategy"]
+    if strategy == 'window':
+        return list(state["messages"])
+    if strategy == 'summary' and state["seen_serials"]:
+        serials = ", ".join(state["seen_serials"])
+        return [{"role": "system", "content": f"Valves already extracted from earlier text (serial IDs): {serials}. "
+                                              "Repeat one only if this text adds details about it."}]
+    return []
+
+def dispatch_chunks(state: ProcessingState):
+    """Fan out the next wave of chunks as parallel extract_chunk branches"""
+    start = state["next_chunk"]
+    if start >= len(state["chunks"]):
+        return END
+    memory = memory_messages(state)
+    return [
+        Send("extract_chunk", {"index": index, "chunk": state["chunks"][index],
+                               "model": state["model"], "memory": memory})
+        for index in range(start, min(start + state["wave_size"], len(state["chunks"])))
+    ]
+
+def extract_chunk(task: ChunkTask) -> Dict[str, Any]:
+    """Map step: extract the valves of one chunk"""
+    user_message = {"role": "user", "content": f"Extract valve specifications from this text: {task['chunk']}"}
+    result = {"index": task["index"], "user_message": user_message, "reply": "", "valves": [], "error": None}
+    try:
+        response = ollama.chat(
+            messages=[{"role": "system", "content": SYSTEM_PROMPT}, *task["memory"], user_message],
+            model=task["model"],
+            format=ValveList.model_json_schema(),
+        )
+        result["reply"] = response.message.content
+        result["valves"] = [v.model_dump() for v in ValveList.model_validate_json(response.message.content).valves]
+    except Exception as e:
+        result["error"] = f"Error processing chunk {task['index'] + 1}: {str(e)}"
+    return {"results": [result]}
+
+def merge_results(state: ProcessingState) -> Dict[str, Any]:
+    """Reduce step: deduplicate the wave's valves by serial ID and update the memory"""
+    valves = list(state["valves"])
+    seen = {valve["serial_id"] for valve in valves}
+    messages = list(state["messages"])
+    seen_serials = list(state["seen_serials"])
+    errors = list(state["errors"])
+    for result in sorted(state["results"], key=lambda r: r["index"]):
+        if result["error"] is not None:
+            errors.append(result["error"])
+            continue
+        for valve in result["valves"]:
+            if valve["serial_id"] not in seen:
+                valves.append(valve)
+                seen.add(valve["serial_id"])
+                seen_serials.append(valve["serial_id"])
+        messages.extend([result["user_message"], {"role": "assistant", "content": result["reply"]}])
+    return {
+        "valves": valves,
+        "errors": errors,
+        # Keep the memory bounded so per-chunk prompt size stays constant
+        "messages": messages[-2 * state["memory_window"]:] if state["memory_strategy"] == 'window' else [],
+        "seen_serials": seen_serials[-MAX_SUMMARY_SERIALS:],
+        "results": None,
+        "next_chunk": state["next_chunk"] + state["wave_size"],
+    }
+
+def build_processing_graph():
+    """Map-reduce workflow: fan out chunks, extract each in parallel, merge each wave.
+
+    With the stateless memory every chunk goes out in a single wave and
+    the max_concurrency of the run config caps how many run at once. The
+    window and summary strategies need earlier results, so chunks go out
+    in waves of wave_size and the memory is updated between waves.
+    """
+    workflow = StateGraph(ProcessingState)
+    workflow.add_node("extract_chunk", extract_chunk)
+    workflow.add_node("merge_results", merge_results)
+    workflow.add_conditional_edges(START, dispatch_chunks, ["extract_chunk", END])
+    workflow.add_edge("extract_chunk", "merge_results")
+    workflow.add_conditional_edges("merge_results", dispatch_chunks, ["extract_chunk", END])
+    return workflow.compile()
+
 class MainWindow(QMainWindow):
     def __init__(self):
         super().__init__()
@@ -74,6 +179,23 @@ class MainWindow(QMainWindow):
         model_layout.addWidget(model_label)
         model_layout.addWidget(self.model_combo)
         model_layout.addWidget(self.refresh_models_btn)
+        self.memory_combo = QComboBox()
+        self.memory_combo.addItems(MEMORY_STRATEGIES)
+        self.memory_combo.setCurrentText(MEMORY_STRATEGY)
+        self.memory_combo.setToolTip("stateless: each chunk alone; window: resend the last turns; "
+                                     "summary: list serial IDs already found")
+        self.window_spin = QSpinBox()
+        self.window_spin.setRange(1, 20)
+        self.window_spin.setValue(MEMORY_WINDOW)
+        self.window_spin.setToolTip("Turns resent by the window strategy")
+        model_layout.addWidget(QLabel("Memory:"))
+        model_layout.addWidget(self.memory_combo)
+        model_layout.addWidget(self.window_spin)
+        self.parallel_spin = QSpinBox()
+        self.parallel_spin.setRange(1, 32)
+        self.parallel_spin.setValue(MAX_PARALLEL_CHUNKS)
+        model_layout.addWidget(QLabel("Parallel:"))
+        model_layout.addWidget(self.parallel_spin)
         left_layout.addLayout(model_layout)
         
         # Stacked widget for input types
@@ -151,50 +273,8 @@ class MainWindow(QMainWindow):
         self.refresh_models()
     
     def setup_processing_graph(self):
-        """Setup the LangGraph processing workflow"""
-        def process_chunk(state: ProcessingState) -> ProcessingState:
-            try:
-                messages = [
-                    {"role": "system", "content": "You are a valve specification analyzer. Extract structured information about valves from the text."},
-                    *state["messages"],
-                    {"role": "user", "content": f"Extract valve specifications from this text: {state['current_chunk']}"}
-                ]
-                
-                response = ollama.chat(
-                    messages=messages,
-                    model=self.model_combo.currentText(),
-                    format=ValveList.model_json_schema(),
-                )
-                
-                # Add to conversation history
-                state["messages"].append({"role": "user", "content": state["current_chunk"]})
-                state["messages"].append({"role": "assistant", "content": response.message.content})
-                state["chunks_processed"] += 1
-                
-                # Parse and store valves
-                try:
-                    valves = ValveList.model_validate_json(response.message.content)
-                    state["extracted_valves"].extend([v.model_dump() for v in valves.valves])
-                except Exception as e:
-                    self.chat_text.append(f"Error parsing valve data: {str(e)}")
-                
-                return state
-                
-            except Exception as e:
-                self.chat_text.append(f"Error processing chunk: {str(e)}")
-                return state
-        
-        # Create the graph with state schema
-        workflow = StateGraph(ProcessingState)
-        
-        # Add the processing node
-        workflow.add_node("process_chunk", process_chunk)
-        
-        # Set the entry point
-        workflow.set_entry_point("process_chunk")
-        
-        # Compile the graph
-        self.graph = workflow.compile()
+        """Compile the LangGraph processing workflow once"""
+        self.graph = build_processing_graph()
     
     def process_text(self):
         """Process the input text or Excel data with chunking"""
@@ -213,10 +293,14 @@ class MainWindow(QMainWindow):
             
             # Split text into chunks
             chunks = self.text_splitter.split_text(input_text)
+            parallel = self.parallel_spin.value()
+            strategy = self.memory_combo.currentText()
+            wave_size = max(1, len(chunks)) if strategy == 'stateless' else parallel
             
             # Update chat area
             self.chat_text.append(f"\nProcessing with model: {self.model_combo.currentText()}")
-            self.chat_text.append(f"Split into {len(chunks)} chunks")
+            self.chat_text.append(f"Split into {len(chunks)} chunks, {parallel} in parallel")
+            self.chat_text.append(f"Memory: {strategy}")
             
             # Show progress bar
             self.progress_bar.setVisible(True)
@@ -225,40 +309,38 @@ class MainWindow(QMainWindow):
             
             # Initialize state for processing
             initial_state: ProcessingState = {
+                "chunks": chunks,
+                "model": self.model_combo.currentText(),
+                "memory_strategy": strategy,
+                "memory_window": self.window_spin.value(),
+                "wave_size": wave_size,
+                "next_chunk": 0,
                 "messages": [],
-                "current_chunk": "",
-                "chunks_processed": 0,
-                "total_chunks": len(chunks),
-                "extracted_valves": []
+                "seen_serials": [],
+                "results": [],
+                "valves": [],
+                "errors": [],
             }
+            # Each wave takes two supersteps: the fan-out and the merge
+            waves = -(-len(chunks) // wave_size)
+            config = {"max_concurrency": parallel, "recursion_limit": 2 * waves + 5}
             
-            # Process chunks using the graph
-            seen_serials = set()
+            # Run the graph once; branch updates stream back as chunks finish
             state = initial_state
-            
-            for i, chunk in enumerate(chunks):
-                self.chat_text.append(f"\nProcessing chunk {i+1}/{len(chunks)}...")
-                
-                # Update state
-                state["current_chunk"] = chunk
-                
-                # Run the graph
-                result_state = self.graph.invoke(state)
-                state = result_state  # Update state for next iteration
-                
-                # Update progress
-                self.progress_bar.setValue(i + 1)
+            done = 0
+            for mode, update in self.graph.stream(initial_state, config=config, stream_mode=["updates", "values"]):
+                if mode == "values":
+                    state = update
+                elif "extract_chunk" in update:
+                    done += 1
+                    self.progress_bar.setValue(done)
                 QApplication.processEvents()
             
-            # Deduplicate valves based on serial_id
-            unique_valves = []
-            for valve in state["extracted_valves"]:
-                if valve["serial_id"] not in seen_serials:
-                    unique_valves.append(valve)
-                    seen_serials.add(valve["serial_id"])
+            for error in state["errors"]:
+                self.chat_text.append(error)
             
             # Format final output
-            final_result = {"valves": unique_valves}
+            final_result = {"valves": state["valves"]}
             formatted_output = json.dumps(final_result, indent=2)
             self.output_text.setText(formatted_output)
             
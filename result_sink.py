@@ -0,0 +1,85 @@
+"""Append-only sinks that stream extracted valves to disk as chunks complete"""
+import json
+from typing import Any, Dict, Iterable, Iterator, Optional
+from openpyxl import Workbook
+from stage_timer import stage
+from valve_extraction import ValveSpecification
+
+VALVE_FIELDS = list(ValveSpecification.model_fields)
+
+class JsonlSink:
+    """Writes one JSON object per valve, flushed after every batch"""
+    def __init__(self, path: str):
+        self.path = path
+        self.count = 0
+        self._file = open(path, 'w', encoding='utf-8')
+
+    def write(self, valves: Iterable[ValveSpecification]):
+        with stage('write'):
+            for valve in valves:
+                self._file.write(valve.model_dump_json() + '\n')
+                self.count += 1
+            self._file.flush()
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+
+class ExcelSink:
+    """Appends valves to a write-only openpyxl workbook, saved on close.
+
+    Rows are streamed to a temporary file by openpyxl, so memory stays flat
+    regardless of how many valves are written.
+    """
+    def __init__(self, path: str, sheet_name: str = 'Sheet1'):
+        self.path = path
+        self.count = 0
+        self._workbook: Optional[Workbook] = Workbook(write_only=True)
+        self._sheet = self._workbook.create_sheet(sheet_name)
+        self._sheet.append(VALVE_FIELDS)
+
+    def write(self, valves: Iterable[ValveSpecification]):
+        with stage('write'):
+            for valve in valves:
+                self._sheet.append([getattr(valve, field) for field in VALVE_FIELDS])
+                self.count += 1
+
+    def close(self):
+        if self._workbook is not None:
+            self._workbook.save(self.path)
+            self._workbook = None
+
+def iter_jsonl(path: str) -> Iterator[ValveSpecification]:
+    """Read valves back from a JSONL sink one at a time"""
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                yield ValveSpecification.model_validate_json(line)
+
+def jsonl_to_excel(jsonl_path: str, excel_path: str) -> int:
+    """Copy a JSONL result file into an .xlsx workbook without loading it whole"""
+    sink = ExcelSink(excel_path)
+    try:
+        sink.write(iter_jsonl(jsonl_path))
+    finally:
+        sink.close()
+    return sink.count
+
+def jsonl_to_json_document(jsonl_path: str, json_path: str, header: Dict[str, Any],
+                           key: str = 'structured_output') -> int:
+    """Write header fields plus {key: {"valves": [...]}} streamed from a JSONL result file"""
+    count = 0
+    with open(json_path, 'w', encoding='utf-8') as out:
+        out.write('{\n')
+        for name, value in header.items():
+            out.write(f'  {json.dumps(name)}: {json.dumps(value)},\n')
+        out.write(f'  {json.dumps(key)}: {{\n    "valves": [')
+        with open(jsonl_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                out.write(('\n' if count == 0 else ',\n') + '      ' + line)
+                count += 1
+        out.write('\n    ]\n  }\n}\n')
+    return count
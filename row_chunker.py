@@ -0,0 +1,90 @@
+"""Row-aware chunking of tabular input into token-budgeted chunks"""
+import math
+from typing import Any, Callable, Iterable, Iterator, List, NamedTuple, Sequence, Tuple
+import pandas as pd
+
+CHARS_PER_TOKEN = 4  # Rough average for English text with Llama-style tokenizers
+DEFAULT_TOKEN_BUDGET = 500  # Roughly the old 2000-character chunk size
+ROW_SEPARATOR = "\n"
+FIELD_SEPARATOR = "; "
+
+class RowChunk(NamedTuple):
+    text: str
+    row_indices: List[int]
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate used when no tokenizer is available"""
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+def _is_missing(value: Any) -> bool:
+    if value is None:
+        return True
+    if isinstance(value, str):
+        return not value.strip()
+    try:
+        return bool(pd.isna(value))
+    except (TypeError, ValueError):
+        return False
+
+def _format_value(value: Any) -> str:
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value).strip()
+
+def serialize_row(columns: Sequence[str], values: Sequence[Any]) -> str:
+    """Render one row as compact col=value pairs, skipping empty cells"""
+    return FIELD_SEPARATOR.join(
+        f"{column}={_format_value(value)}"
+        for column, value in zip(columns, values)
+        if not _is_missing(value)
+    )
+
+def pack_rows(rows: Iterable[Tuple[int, str]], token_budget: int = DEFAULT_TOKEN_BUDGET,
+              token_counter: Callable[[str], int] = estimate_tokens) -> Iterator[RowChunk]:
+    """Pack serialized rows into chunks of at most token_budget tokens.
+
+    Rows are never split, so no overlap is needed. A single row larger than
+    the budget becomes a chunk of its own. Empty rows are skipped. Works on
+    any iterable, so rows can be streamed without materializing the sheet.
+    """
+    separator_tokens = token_counter(ROW_SEPARATOR)
+    lines: List[str] = []
+    indices: List[int] = []
+    used = 0
+
+    for index, line in rows:
+        if not line:
+            continue
+        cost = token_counter(line)
+        if lines and used + separator_tokens + cost > token_budget:
+            yield RowChunk(ROW_SEPARATOR.join(lines), indices)
+            lines, indices, used = [], [], 0
+        if lines:
+            used += separator_tokens
+        lines.append(line)
+        indices.append(index)
+        used += cost
+
+    if lines:
+        yield RowChunk(ROW_SEPARATOR.join(lines), indices)
+
+def tag_rows(rows: Iterable[Tuple[int, str]]) -> Iterator[Tuple[int, str]]:
+    """Prefix each serialized row with its [index] for batched extraction.
+
+    Line breaks inside a row are flattened so that every line of a packed
+    chunk is exactly one row.
+    """
+    for index, line in rows:
+        if line:
+            yield index, f"[{index}] " + " ".join(line.splitlines())
+
+def iter_dataframe_rows(df: pd.DataFrame) -> Iterator[Tuple[int, str]]:
+    """Yield (row position, serialized row) without building a full-sheet string"""
+    columns = [str(column) for column in df.columns]
+    for position, values in enumerate(df.itertuples(index=False, name=None)):
+        yield position, serialize_row(columns, values)
+
+def chunk_dataframe(df: pd.DataFrame, token_budget: int = DEFAULT_TOKEN_BUDGET,
+                    token_counter: Callable[[str], int] = estimate_tokens) -> List[RowChunk]:
+    """Split a DataFrame into whole-row chunks that fit the token budget"""
+    return list(pack_rows(iter_dataframe_rows(df), token_budget, token_counter))
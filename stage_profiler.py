@@ -0,0 +1,251 @@
+"""Opt-in profiling of extraction runs: stage timers plus optional cProfile, tracemalloc and stack sampling.
+
+Enabled from the environment, e.g.
+
+    VALVE_PROFILE=1 python ollamafunction.py                      # stage timers only
+    VALVE_PROFILE=cprofile,tracemalloc,sample python -m ollamafunction batch data/ -m llama3.1
+
+or from the GUI's Profile checkbox and the batch --profile flag. Each run
+writes a per-stage CPU/memory summary and flame-graph-compatible folded
+stacks to VALVE_PROFILE_DIR (default ~/.valve_extractor/profiles).
+"""
+import os
+import sys
+import json
+import time
+import pstats
+import cProfile
+import threading
+import tracemalloc
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from contextlib import contextmanager
+from stage_timer import StageTimer, activate
+
+PROFILE_ENV = 'VALVE_PROFILE'  # 1/on for stage timers, or a comma-separated list of PROFILE_OPTIONS
+PROFILE_DIR_ENV = 'VALVE_PROFILE_DIR'
+DEFAULT_PROFILE_DIR = os.path.join(os.path.expanduser("~"), ".valve_extractor", "profiles")
+PROFILE_OPTIONS = ('cprofile', 'tracemalloc', 'sample')
+SAMPLE_INTERVAL = 0.005  # Seconds between stack samples
+TOP_ALLOCATIONS = 15  # Allocation sites listed in the summary
+TOP_FUNCTIONS = 25  # cProfile functions listed in the summary
+_TRUE = ('1', 'on', 'yes', 'true', 'stages')
+
+def profile_options(value: Optional[str]) -> Optional[Tuple[str, ...]]:
+    """Options from a VALVE_PROFILE-style value: None when profiling is off, () for stage timers only"""
+    if value is None or not value.strip() or value.strip().lower() in ('0', 'off', 'no', 'false'):
+        return None
+    options = []
+    for option in value.lower().split(','):
+        option = option.strip()
+        if option in _TRUE or not option:
+            continue
+        if option == 'all':
+            options.extend(PROFILE_OPTIONS)
+        elif option in PROFILE_OPTIONS:
+            options.append(option)
+        else:
+            raise ValueError(f"Unknown profile option '{option}' (use 1, all or {', '.join(PROFILE_OPTIONS)})")
+    return tuple(dict.fromkeys(options))
+
+def options_from_env() -> Optional[Tuple[str, ...]]:
+    return profile_options(os.environ.get(PROFILE_ENV))
+
+def profile_dir() -> str:
+    return os.environ.get(PROFILE_DIR_ENV) or DEFAULT_PROFILE_DIR
+
+def _frame_name(frame) -> str:
+    code = frame.f_code
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+class StageProfiler(StageTimer):
+    """StageTimer that also measures memory and, optionally, whole Python stacks.
+
+    With 'tracemalloc', every stage is charged the net bytes allocated while
+    it was innermost, and the summary lists the top allocation sites;
+    allocations of concurrent threads land in whichever stage happens to
+    be running, so per-stage bytes are approximate in parallel runs. With
+    'cprofile', each thread is profiled while it is inside a stage (before
+    Python 3.12 a profiler only sees its own thread) and the merged
+    statistics are written as .pstats. With 'sample', a background thread
+    samples the stacks of threads that are inside a stage every few
+    milliseconds and writes them, under their stage path, as folded
+    stacks. The stage-level folded stacks are always written.
+    """
+    def __init__(self, options: Tuple[str, ...] = (), sample_interval: float = SAMPLE_INTERVAL):
+        self.options = tuple(options)
+        self.memory = 'tracemalloc' in self.options
+        self.METRICS = StageTimer.METRICS + (('allocated_bytes',) if self.memory else ())
+        super().__init__(keep_samples=('llm',))
+        self.sample_interval = sample_interval
+        self.samples_folded: Dict[str, int] = {}
+        self.started_at: Optional[float] = None
+        self.wall_seconds = 0.0
+        self._profiles: List[cProfile.Profile] = []
+        self._global_profile: Optional[cProfile.Profile] = None
+        self._sampler: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._started_tracemalloc = False
+        self._previous = None
+        self.peak_traced = 0
+        self.top_allocations: List[Dict] = []
+
+    def _read(self) -> Tuple[float, ...]:
+        if self.memory:
+            return time.perf_counter(), time.thread_time(), float(tracemalloc.get_traced_memory()[0])
+        return time.perf_counter(), time.thread_time()
+
+    @contextmanager
+    def stage(self, name: str):
+        outermost = 'cprofile' in self.options and self._global_profile is None and not self._stack()
+        profile = self._thread_profile() if outermost else None
+        if profile is not None:
+            try:
+                profile.enable()
+            except ValueError:
+                profile = None  # Another profiler is active on this interpreter
+        try:
+            with super().stage(name):
+                yield
+        finally:
+            if profile is not None:
+                profile.disable()
+
+    def _thread_profile(self) -> cProfile.Profile:
+        profile = getattr(self._local, 'profile', None)
+        if profile is None:
+            profile = self._local.profile = cProfile.Profile()
+            with self._lock:
+                self._profiles.append(profile)
+        return profile
+
+    def start(self) -> "StageProfiler":
+        """Begin profiling and route the pipeline's stage hooks here"""
+        self.started_at = time.perf_counter()
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+        if 'cprofile' in self.options and sys.version_info >= (3, 12):
+            # Since 3.12 a profiler sees every thread, and only one may be active at a time
+            self._global_profile = cProfile.Profile()
+            try:
+                self._global_profile.enable()
+                self._profiles.append(self._global_profile)
+            except ValueError:
+                self._global_profile = None
+        if 'sample' in self.options:
+            self._sampler = threading.Thread(target=self._sample, name='stage-sampler', daemon=True)
+            self._sampler.start()
+        self._previous = activate(self)
+        return self
+
+    def finish(self):
+        """Stop profiling and restore the previous stage hooks"""
+        if self.started_at is None:
+            return
+        activate(self._previous)
+        self.wall_seconds = time.perf_counter() - self.started_at
+        self._stop.set()
+        if self._sampler is not None:
+            self._sampler.join()
+        if self._global_profile is not None:
+            self._global_profile.disable()
+        if self.memory:
+            self.peak_traced = tracemalloc.get_traced_memory()[1]
+            snapshot = tracemalloc.take_snapshot().filter_traces([
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+                tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+            ])
+            self.top_allocations = [{'site': str(stat.traceback), 'bytes': stat.size, 'blocks': stat.count}
+                                    for stat in snapshot.statistics('lineno')[:TOP_ALLOCATIONS]]
+            if self._started_tracemalloc:
+                tracemalloc.stop()
+        self.started_at = None
+
+    def _sample(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.sample_interval):
+            frames = sys._current_frames()
+            for ident, stages in self.open_stages().items():
+                frame = frames.get(ident)
+                if frame is None or ident == own:
+                    continue
+                names = []
+                while frame is not None:
+                    names.append(_frame_name(frame))
+                    frame = frame.f_back
+                key = ';'.join((*stages, *reversed(names)))
+                self.samples_folded[key] = self.samples_folded.get(key, 0) + 1
+
+    def summary(self) -> Dict:
+        """Per-stage wall, CPU and (with tracemalloc) memory totals, largest first"""
+        stages = self.snapshot()
+        ordered = sorted(stages.items(), key=lambda item: -item[1]['seconds'])
+        summary = {
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'options': list(self.options),
+            'wall_seconds': self.wall_seconds,
+            'stages': {name: {**values, 'share': values['seconds'] / self.wall_seconds if self.wall_seconds else None}
+                       for name, values in ordered},
+        }
+        if self.memory:
+            summary['peak_traced_bytes'] = self.peak_traced
+            summary['top_allocations'] = self.top_allocations
+        if self._profiles:
+            stats = self._stats()
+            if stats is not None:
+                rows = sorted(stats.stats.items(), key=lambda item: -item[1][3])[:TOP_FUNCTIONS]
+                summary['top_functions'] = [
+                    {'function': f"{os.path.basename(filename)}:{line}({name})", 'calls': calls,
+                     'own_seconds': own, 'cumulative_seconds': cumulative}
+                    for (filename, line, name), (_, calls, own, cumulative, _) in rows]
+        return summary
+
+    def _stats(self) -> Optional[pstats.Stats]:
+        stats = None
+        for profile in self._profiles:
+            try:
+                stats = pstats.Stats(profile) if stats is None else stats.add(profile)
+            except TypeError:
+                continue  # Never enabled, so it has no data
+        return stats
+
+    def describe(self) -> str:
+        """Per-stage summary as a text table"""
+        summary = self.summary()
+        memory = self.memory
+        lines = [f"Profile over {self.wall_seconds:.2f}s wall "
+                 f"(stage totals add up across threads; concurrent stages can exceed wall time)",
+                 f"{'stage':<12} {'wall s':>9} {'share':>7} {'cpu s':>9} {'calls':>8}"
+                 + (f" {'alloc MB':>9}" if memory else "")]
+        for name, values in summary['stages'].items():
+            share = f"{values['share'] * 100:.1f}%" if values['share'] is not None else '-'
+            line = f"{name:<12} {values['seconds']:>9.3f} {share:>7} {values['cpu_seconds']:>9.3f} {values['calls']:>8}"
+            if memory:
+                line += f" {values['allocated_bytes'] / (1024 * 1024):>9.1f}"
+            lines.append(line)
+        if memory:
+            lines.append(f"Peak traced memory: {self.peak_traced / (1024 * 1024):.1f} MB")
+        return "\n".join(lines)
+
+    def write(self, directory: Optional[str] = None, prefix: Optional[str] = None) -> List[str]:
+        """Write the summary, folded stacks and (with cprofile) .pstats; returns the paths written"""
+        directory = directory or profile_dir()
+        os.makedirs(directory, exist_ok=True)
+        prefix = prefix or f"profile_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        base = os.path.join(directory, prefix)
+        paths = [base + '.summary.json', base + '.stages.folded']
+        with open(paths[0], 'w', encoding='utf-8') as f:
+            json.dump(self.summary(), f, indent=2)
+        with open(paths[1], 'w', encoding='utf-8') as f:
+            f.write(self.folded())
+        if self.samples_folded:
+            paths.append(base + '.folded')
+            with open(paths[-1], 'w', encoding='utf-8') as f:
+                f.writelines(f"{stack} {count}\n" for stack, count in sorted(self.samples_folded.items()))
+        stats = self._stats() if self._profiles else None
+        if stats is not None:
+            paths.append(base + '.pstats')
+            stats.dump_stats(paths[-1])
+        return paths
@@ -0,0 +1,158 @@
+"""Exclusive wall-clock and CPU time per pipeline stage, with no-op hooks when no timer is active"""
+import time
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, TypeVar
+
+T = TypeVar("T")
+
+STAGES = ('load', 'serialize', 'split', 'prepare', 'llm', 'validate', 'dedup', 'write')
+
+class _Entry:
+    """A stage open on some thread's stack"""
+    __slots__ = ('name', 'path', 'resumed', 'entered')
+
+    def __init__(self, name: str, path: Tuple[str, ...], now: Tuple[float, ...]):
+        self.name = name
+        self.path = path
+        self.resumed = now  # Readings when this stage last became the innermost one
+        self.entered = now[0]
+
+class StageTimer:
+    """Accumulates the time spent in named pipeline stages.
+
+    Stages nest per thread and time is exclusive: while an inner stage
+    runs, the enclosing one is paused, so pulling rows through a chain of
+    generators (split pulls serialize, which pulls load) charges each
+    layer only its own work. Wall time is kept per stage and per nesting
+    path (for flame graphs), CPU time is the running thread's. Totals
+    from worker threads add up, so a concurrent stage can exceed the wall
+    time. Durations of the stages named in keep_samples are also kept per
+    call, for percentiles. Subclasses can measure more by extending
+    METRICS and _read(). Safe to share between threads.
+    """
+    METRICS: Tuple[str, ...] = ('seconds', 'cpu_seconds')
+
+    def __init__(self, keep_samples: Sequence[str] = ()):
+        self.totals: Dict[str, List[float]] = {}  # Stage -> exclusive sum of each metric
+        self.paths: Dict[Tuple[str, ...], float] = {}  # Stage nesting -> exclusive wall seconds
+        self.calls: Dict[str, int] = {}
+        self.samples: Dict[str, List[float]] = {name: [] for name in keep_samples}
+        self._stacks: Dict[int, List[_Entry]] = {}  # Thread ident -> open stages, innermost last
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _read(self) -> Tuple[float, ...]:
+        """Current reading of every metric, in METRICS order"""
+        return time.perf_counter(), time.thread_time()
+
+    def _stack(self) -> List[_Entry]:
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+            with self._lock:
+                self._stacks[threading.get_ident()] = stack
+        return stack
+
+    def _charge(self, entry: _Entry, now: Tuple[float, ...], calls: int = 0):
+        with self._lock:
+            totals = self.totals.setdefault(entry.name, [0.0] * len(self.METRICS))
+            for index, (value, since) in enumerate(zip(now, entry.resumed)):
+                totals[index] += value - since
+            self.paths[entry.path] = self.paths.get(entry.path, 0.0) + now[0] - entry.resumed[0]
+            if calls:
+                self.calls[entry.name] = self.calls.get(entry.name, 0) + calls
+
+    @contextmanager
+    def stage(self, name: str):
+        """Time a synchronous block as stage name, pausing the enclosing stage"""
+        stack = self._stack()
+        now = self._read()
+        if stack:
+            self._charge(stack[-1], now)
+        entry = _Entry(name, (stack[-1].path if stack else ()) + (name,), now)
+        stack.append(entry)
+        try:
+            yield
+        finally:
+            now = self._read()
+            stack.pop()
+            self._charge(entry, now, 1)
+            if name in self.samples:
+                with self._lock:
+                    self.samples[name].append(now[0] - entry.entered)
+            if stack:
+                stack[-1].resumed = now
+
+    def record(self, name: str, seconds: float):
+        """Add a span measured elsewhere, e.g. an await that interleaves with other tasks.
+
+        Only wall time is known for such spans; it is not nested under any stage.
+        """
+        with self._lock:
+            totals = self.totals.setdefault(name, [0.0] * len(self.METRICS))
+            totals[0] += seconds
+            self.paths[(name,)] = self.paths.get((name,), 0.0) + seconds
+            self.calls[name] = self.calls.get(name, 0) + 1
+            if name in self.samples:
+                self.samples[name].append(seconds)
+
+    def iterate(self, name: str, iterable: Iterable[T]) -> Iterator[T]:
+        """Yield from iterable, timing each step of it as stage name"""
+        iterator = iter(iterable)
+        while True:
+            with self.stage(name):
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+            yield item
+
+    def open_stages(self) -> Dict[int, Tuple[str, ...]]:
+        """Thread ident -> names of the stages currently open on it, outermost first"""
+        with self._lock:
+            stacks = list(self._stacks.items())
+        return {ident: tuple(entry.name for entry in list(stack)) for ident, stack in stacks if stack}
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        """{stage: {metric: total, ..., 'calls'}} for every stage seen so far"""
+        with self._lock:
+            return {name: {**dict(zip(self.METRICS, totals)), 'calls': self.calls.get(name, 0)}
+                    for name, totals in self.totals.items()}
+
+    def folded(self) -> str:
+        """Stage nesting in the folded-stack format of flamegraph.pl and speedscope, in microseconds"""
+        with self._lock:
+            paths = sorted(self.paths.items())
+        return "".join(f"{';'.join(path)} {round(seconds * 1e6)}\n" for path, seconds in paths if seconds > 0)
+
+_active: Optional[StageTimer] = None
+
+def activate(timer: Optional[StageTimer]) -> Optional[StageTimer]:
+    """Make timer receive the pipeline's stage hooks (None turns them off); returns the previous one"""
+    global _active
+    previous, _active = _active, timer
+    return previous
+
+def active() -> Optional[StageTimer]:
+    return _active
+
+@contextmanager
+def stage(name: str):
+    """StageTimer.stage on the active timer; does nothing when none is active"""
+    timer = _active
+    if timer is None:
+        yield
+        return
+    with timer.stage(name):
+        yield
+
+def timed(name: str, iterable: Iterable[T]) -> Iterable[T]:
+    """StageTimer.iterate on the active timer, or iterable unchanged when none is active"""
+    timer = _active
+    return iterable if timer is None else timer.iterate(name, iterable)
+
+def record(name: str, seconds: float):
+    timer = _active
+    if timer is not None:
+        timer.record(name, seconds)
@@ -0,0 +1,47 @@
+"""Fixtures serving a small ground truth from the mock Ollama server"""
+import os
+import sys
+import json
+from typing import Any, Dict, List
+import ollama
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mock_ollama import GroundTruth, MockOllama, ModelProfile, start_mock_server
+
+MODEL = 'mock-test'
+VALVES = [
+    {'valve_type': 'ball valve', 'serial_id': 'BV-1001', 'width': 50.0, 'height': 80.0,
+     'pressure_rating': 'PN16', 'material': 'stainless steel', 'manufacturer': 'Acme'},
+    {'valve_type': 'gate valve', 'serial_id': 'GV-2002', 'width': 100.0, 'height': 150.0,
+     'pressure_rating': 'PN25', 'material': 'cast iron', 'manufacturer': 'Flowco'},
+    {'valve_type': 'check valve', 'serial_id': 'CV-3003', 'width': 25.0, 'height': 40.0,
+     'pressure_rating': 'PN10', 'material': 'brass', 'manufacturer': 'Acme'},
+]
+
+def describe(valve: Dict[str, Any]) -> str:
+    """A row of text mentioning every field of valve, so the mock reports all of them"""
+    return (f"{valve['valve_type']} {valve['serial_id']}, {valve['width']:.1f} x {valve['height']:.1f} mm, "
+            f"{valve['pressure_rating']}, {valve['material']}, made by {valve['manufacturer']}")
+
+def write_truth(path: str, valves: List[Dict[str, Any]]) -> str:
+    with open(path, 'w', encoding='utf-8') as f:
+        f.writelines(json.dumps(valve) + "\n" for valve in valves)
+    return path
+
+def serve(truth_path: str):
+    """Start an instant mock server answering from truth_path; stop it with shutdown()"""
+    mock = MockOllama([ModelProfile(MODEL)], GroundTruth([truth_path]), load_seconds=0, time_scale=0)
+    return start_mock_server(mock)
+
+@pytest.fixture
+def mock_server(tmp_path):
+    server = serve(write_truth(str(tmp_path / 'truth.jsonl'), VALVES))
+    yield server
+    server.shutdown()
+    server.server_close()
+
+@pytest.fixture
+def client(mock_server) -> ollama.Client:
+    return ollama.Client(host=mock_server.url)
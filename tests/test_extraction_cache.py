@@ -0,0 +1,33 @@
+import itertools
+import pytest
+import extraction_cache
+from extraction_cache import ExtractionCache
+
+@pytest.fixture(autouse=True)
+def ticking_clock(monkeypatch):
+    """Every access gets a later timestamp, so LRU order never hinges on clock resolution"""
+    clock = itertools.count(1)
+    monkeypatch.setattr(extraction_cache.time, 'time', lambda: float(next(clock)))
+
+def key(chunk: str, **options) -> str:
+    return ExtractionCache.make_key('mock-test', 'sha256:0', 'prompt', {'type': 'object'}, chunk, options)
+
+def test_least_recently_used_entry_is_evicted(tmp_path):
+    cache = ExtractionCache(str(tmp_path / 'cache.sqlite3'), max_bytes=250)
+    value = 'x' * 36  # With the 64-character key, 100 bytes per entry
+    cache.put(key('a'), value)
+    cache.put(key('b'), value)
+    assert cache.get(key('a')) == value  # 'b' is now the least recently used
+    cache.put(key('c'), value)
+    assert cache.get(key('b')) is None
+    assert cache.get(key('a')) == value and cache.get(key('c')) == value
+    assert cache.stats() == {'hits': 3, 'misses': 1, 'evictions': 1, 'entries': 2, 'bytes': 200}
+
+def test_entries_survive_a_reopen(tmp_path):
+    path = str(tmp_path / 'cache.sqlite3')
+    cache = ExtractionCache(path)
+    cache.put(key('a'), '{"valves": []}')
+    cache.close()
+    cache = ExtractionCache(path)
+    assert cache.get(key('a')) == '{"valves": []}'
+    assert cache.get(key('a', temperature=0.5)) is None  # Other options, other key
@@ -0,0 +1,63 @@
+from extraction_manifest import RowManifest
+from valve_extraction import ValveSpecification
+
+ROWS = [(0, "ball valve BV-1001 PN16"), (1, "gate valve GV-2002 PN25"), (2, "no valve here")]
+
+def valve(serial_id: str) -> ValveSpecification:
+    return ValveSpecification(valve_type='ball valve', serial_id=serial_id)
+
+def reload(manifest: RowManifest, path: str) -> RowManifest:
+    manifest.save(path)
+    return RowManifest.load(path, manifest.fingerprint)
+
+def test_rows_of_unfinished_chunks_are_not_saved(tmp_path):
+    path = str(tmp_path / 'out.manifest.json')
+    manifest = RowManifest('fp')
+    assert list(manifest.filter_rows('a.xlsx', ROWS)) == ROWS
+    manifest.record_chunk('a.xlsx', [0], [valve('BV-1001')])  # Row 1's chunk was still in flight
+    manifest = reload(manifest, path)
+    assert list(manifest.filter_rows('a.xlsx', ROWS)) == ROWS[1:]
+    assert manifest.reused == 1
+
+def test_finish_settles_rows_that_never_reached_the_model(tmp_path):
+    path = str(tmp_path / 'out.manifest.json')
+    manifest = RowManifest('fp')
+    list(manifest.filter_rows('a.xlsx', ROWS))
+    manifest.record_rows('a.xlsx', [0, 1], {1: [valve('GV-2002')]})
+    manifest.finish('a.xlsx')  # Row 2 was dropped by the pre-filter
+    assert [v.serial_id for v in manifest.valves('a.xlsx')] == ['GV-2002']
+    manifest = reload(manifest, path)
+    assert list(manifest.filter_rows('a.xlsx', ROWS)) == []
+    assert [v.serial_id for v in manifest.valves('a.xlsx')] == ['GV-2002']
+
+def test_discarded_rows_are_extracted_again(tmp_path):
+    path = str(tmp_path / 'out.manifest.json')
+    manifest = RowManifest('fp')
+    list(manifest.filter_rows('a.xlsx', ROWS))
+    manifest.record_chunk('a.xlsx', [0], [valve('BV-1001')])
+    manifest.discard_rows('a.xlsx', [1, 2])
+    manifest.finish('a.xlsx')
+    manifest = reload(manifest, path)
+    assert list(manifest.filter_rows('a.xlsx', ROWS)) == ROWS[1:]
+
+def test_changed_rows_and_settings_are_not_reused(tmp_path):
+    path = str(tmp_path / 'out.manifest.json')
+    manifest = RowManifest('fp')
+    list(manifest.filter_rows('a.xlsx', ROWS))
+    manifest.finish('a.xlsx')
+    manifest = reload(manifest, path)
+    edited = [ROWS[0], (1, "gate valve GV-2002 PN40"), ROWS[2]]
+    assert list(manifest.filter_rows('a.xlsx', edited)) == [edited[1]]
+    assert list(RowManifest.load(path, 'other settings').filter_rows('a.xlsx', ROWS)) == ROWS
+
+def test_sources_not_processed_are_dropped(tmp_path):
+    path = str(tmp_path / 'out.manifest.json')
+    manifest = RowManifest('fp')
+    for source in ('a.xlsx', 'b.xlsx'):
+        list(manifest.filter_rows(source, ROWS))
+        manifest.finish(source)
+    manifest = reload(manifest, path)
+    list(manifest.filter_rows('b.xlsx', ROWS))
+    manifest.finish('b.xlsx')
+    manifest = reload(manifest, path)
+    assert list(manifest.filter_rows('a.xlsx', ROWS)) == ROWS
@@ -0,0 +1,46 @@
+import json
+from conftest import MODEL, VALVES, describe
+from job_journal import JobJournal
+from valve_extraction import process_chunk
+
+def extract_all(journal, chunks, client):
+    """Extract the chunks the journal does not hold yet; returns how many reached the model"""
+    extracted = 0
+    for index, chunk in enumerate(chunks):
+        if journal.lookup("", chunk) is None:
+            journal.record("", index, chunk, process_chunk(chunk, MODEL, client=client))
+            extracted += 1
+    return extracted
+
+def test_resume_skips_a_torn_last_line(tmp_path, client):
+    path = str(tmp_path / 'job.journal.jsonl')
+    chunks = [describe(valve) for valve in VALVES]
+    journal = JobJournal.open(path, 'fingerprint')
+    journal.settings("", {'chunk_tokens': 100})
+    assert extract_all(journal, chunks[:2], client) == 2
+    journal.close()
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write('{"source": "", "chunk": 2, "key": "torn')  # A crash mid-write
+
+    journal = JobJournal.open(path, 'fingerprint')
+    assert journal.resumed
+    assert journal.checkpointed() == 2
+    assert journal.settings("", {'chunk_tokens': 999}) == {'chunk_tokens': 100}
+    assert [valve.model_dump() for valve in journal.lookup("", chunks[0])] == [VALVES[0]]
+    assert extract_all(journal, chunks, client) == 1
+    journal.close()
+
+    with open(path, encoding='utf-8') as f:
+        records = [json.loads(line) for line in f]  # The torn tail was cut, so every line parses
+    assert [record['chunk'] for record in records if 'key' in record] == [0, 1, 2]
+    assert JobJournal.open(path, 'fingerprint').checkpointed() == 3
+
+def test_other_fingerprint_starts_over(tmp_path, client):
+    path = str(tmp_path / 'job.journal.jsonl')
+    journal = JobJournal.open(path, 'fingerprint')
+    extract_all(journal, [describe(VALVES[0])], client)
+    journal.close()
+    journal = JobJournal.open(path, 'other model')
+    assert not journal.resumed
+    assert journal.checkpointed() == 0
+    journal.close()
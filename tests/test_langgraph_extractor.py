@@ -0,0 +1,31 @@
+import pytest
+from conftest import MODEL, VALVES, describe
+import ollamafunction_langchain
+from ollamafunction_langchain import build_processing_graph
+
+@pytest.fixture
+def graph(monkeypatch, client):
+    """The compiled graph, its ollama.chat calls answered by the mock server"""
+    monkeypatch.setattr(ollamafunction_langchain.ollama, 'chat', client.chat)
+    return build_processing_graph()
+
+def run(graph, chunks, strategy, wave_size=2, model=MODEL):
+    state = {"chunks": chunks, "model": model, "memory_strategy": strategy, "memory_window": 1,
+             "wave_size": wave_size, "next_chunk": 0, "messages": [], "seen_serials": [], "results": [],
+             "valves": [], "errors": []}
+    waves = -(-len(chunks) // wave_size)
+    return graph.invoke(state, config={"max_concurrency": wave_size, "recursion_limit": 2 * waves + 5})
+
+@pytest.mark.parametrize('strategy', ['stateless', 'window', 'summary'])
+def test_waves_are_merged_in_chunk_order(graph, strategy):
+    chunks = [describe(VALVES[1]), describe(VALVES[0]), describe(VALVES[1]), describe(VALVES[2])]
+    state = run(graph, chunks, strategy, wave_size=len(chunks) if strategy == 'stateless' else 2)
+    assert state["errors"] == []
+    assert state["valves"] == [VALVES[1], VALVES[0], VALVES[2]]
+    assert state["seen_serials"] == ['GV-2002', 'BV-1001', 'CV-3003']
+    assert len(state["messages"]) == (2 if strategy == 'window' else 0)  # One user/assistant turn is kept
+
+def test_failed_chunks_are_reported_not_fatal(graph):
+    state = run(graph, [describe(VALVES[0]), describe(VALVES[1])], 'window', model='missing')
+    assert state["valves"] == []
+    assert [error.split(':')[0] for error in state["errors"]] == ["Error processing chunk 1", "Error processing chunk 2"]
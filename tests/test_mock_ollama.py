@@ -0,0 +1,31 @@
+import json
+import ollama
+import pytest
+from conftest import MODEL, VALVES, describe
+from mock_ollama import GroundTruth, MockOllama, ModelProfile
+from valve_extraction import ValveList
+
+def test_tags_list_the_served_models(client):
+    assert [model.model for model in client.list().models] == [MODEL]
+
+def test_chat_answers_from_the_ground_truth(client):
+    response = client.chat(model=MODEL, messages=[{'role': 'user', 'content': describe(VALVES[0])}],
+                           format=ValveList.model_json_schema())
+    assert json.loads(response.message.content) == {'valves': [VALVES[0]]}
+    assert response.eval_count > 0 and response.prompt_eval_count > 0
+
+def test_generate_answers_too(client):
+    response = client.generate(model=MODEL, prompt=describe(VALVES[2]), format=ValveList.model_json_schema())
+    assert json.loads(response.response) == {'valves': [VALVES[2]]}
+
+def test_unknown_model_is_a_404(client):
+    with pytest.raises(ollama.ResponseError) as error:
+        client.chat(model='missing', messages=[{'role': 'user', 'content': 'hi'}])
+    assert error.value.status_code == 404
+
+def test_injected_errors_are_500s_and_deterministic():
+    mock = MockOllama([ModelProfile(MODEL)], GroundTruth(), load_seconds=0, error_rate=0.5, time_scale=0)
+    bodies = [{'model': MODEL, 'messages': [{'role': 'user', 'content': f"row {index}"}]} for index in range(40)]
+    statuses = [mock.complete('chat', body)[0] for body in bodies]
+    assert set(statuses) == {200, 500}
+    assert [mock.complete('chat', body)[0] for body in bodies] == statuses
@@ -0,0 +1,33 @@
+from conftest import MODEL, VALVES, describe, serve, write_truth
+from mock_ollama import GroundTruth, MockOllama, ModelProfile, start_mock_server
+from ollama_pool import EndpointPool
+from valve_extraction import process_chunk
+
+def stop(server):
+    server.shutdown()
+    server.server_close()
+
+def test_unreachable_host_fails_over_and_is_marked_down(tmp_path, mock_server):
+    doomed = serve(write_truth(str(tmp_path / 'doomed.jsonl'), VALVES))
+    pool = EndpointPool([doomed.url, mock_server.url])
+    pool.refresh()
+    stop(doomed)  # Goes away after its health check, so the first request is routed to it
+    valves = process_chunk(describe(VALVES[0]), MODEL, client=pool)
+    assert [valve.model_dump() for valve in valves] == [VALVES[0]]
+    dead, live = pool.endpoints
+    assert not dead.healthy and dead.failures == 1
+    assert live.healthy and live.requests == 1
+
+def test_server_error_retries_elsewhere_but_keeps_the_host(tmp_path, mock_server):
+    truth = GroundTruth([write_truth(str(tmp_path / 'failing.jsonl'), VALVES)])
+    failing = start_mock_server(MockOllama([ModelProfile(MODEL)], truth, load_seconds=0, error_rate=1.0,
+                                           time_scale=0))
+    try:
+        pool = EndpointPool([failing.url, mock_server.url])
+        valves = process_chunk(describe(VALVES[1]), MODEL, client=pool)
+        assert [valve.model_dump() for valve in valves] == [VALVES[1]]
+        flaky, other = pool.endpoints
+        assert flaky.healthy and flaky.failures == 1
+        assert other.requests == 1
+    finally:
+        stop(failing)
@@ -0,0 +1,23 @@
+import numpy as np
+import pandas as pd
+from row_chunker import RowChunk, chunk_dataframe, pack_rows, serialize_row
+
+def words(text: str) -> int:
+    return len(text.split())
+
+def test_rows_are_packed_whole_up_to_the_budget():
+    rows = [(0, "a b c"), (1, "d e"), (2, "f g h i"), (3, "j")]
+    chunks = list(pack_rows(rows, token_budget=6, token_counter=words))
+    assert chunks == [RowChunk("a b c\nd e", [0, 1]), RowChunk("f g h i\nj", [2, 3])]
+
+def test_oversized_row_gets_a_chunk_of_its_own_and_empty_rows_are_skipped():
+    rows = [(0, "a b"), (1, ""), (2, "c d e f g h i j"), (3, "k")]
+    chunks = list(pack_rows(rows, token_budget=4, token_counter=words))
+    assert [chunk.row_indices for chunk in chunks] == [[0], [2], [3]]
+
+def test_rows_serialize_as_compact_pairs_without_empty_cells():
+    assert serialize_row(['id', 'notes', 'qty', 'owner'], [7, "ball valve BV-1001 ", 3.0, np.nan]) \
+        == "id=7; notes=ball valve BV-1001; qty=3"
+    df = pd.DataFrame({'notes': ["gate valve", None, "check valve"], 'qty': [1, 2, None]})
+    assert chunk_dataframe(df, token_budget=100) == [RowChunk("notes=gate valve; qty=1\nqty=2\nnotes=check valve",
+                                                              [0, 1, 2])]
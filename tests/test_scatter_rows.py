@@ -0,0 +1,33 @@
+from conftest import MODEL, VALVES, describe
+from row_chunker import RowChunk, ROW_SEPARATOR, tag_rows
+from valve_extraction import (RowValves, RowValvesList, ValveSpecification, UNATTRIBUTED_ROW, process_row_chunk,
+                              scatter_rows)
+
+def row_chunk(rows):
+    tagged = list(tag_rows(rows))
+    return RowChunk(ROW_SEPARATOR.join(line for _, line in tagged), [index for index, _ in tagged])
+
+def test_valves_come_back_on_their_rows(client):
+    chunk = row_chunk([(3, describe(VALVES[0])), (4, "spare parts, no valve here"), (7, describe(VALVES[1]))])
+    rows = process_row_chunk(chunk, MODEL, client=client)
+    assert sorted(rows) == [3, 7]
+    assert [valve.model_dump() for valve in rows[3]] == [VALVES[0]]
+    assert [valve.model_dump() for valve in rows[7]] == [VALVES[1]]
+
+def test_unknown_row_id_goes_to_the_row_naming_the_serial():
+    chunk = row_chunk([(10, describe(VALVES[0])), (11, describe(VALVES[2]))])
+    valve = ValveSpecification.model_validate(VALVES[2])
+    rows = scatter_rows(RowValvesList(rows=[RowValves(row_id=99, valves=[valve])]), chunk)
+    assert rows == {11: [valve]}
+
+def test_valves_no_row_mentions_belong_to_the_chunk():
+    chunk = row_chunk([(10, describe(VALVES[0])), (11, "spare parts, no valve here")])
+    found = ValveSpecification.model_validate(VALVES[0])
+    stray = ValveSpecification.model_validate(VALVES[1])
+    rows = scatter_rows(RowValvesList(rows=[RowValves(row_id=10, valves=[found]),
+                                            RowValves(row_id=42, valves=[stray])]), chunk)
+    assert rows == {10: [found], UNATTRIBUTED_ROW: [stray]}
+
+def test_tagged_rows_are_one_line_each():
+    assert list(tag_rows([(5, "gate valve\nGV-2002"), (6, ""), (8, "CV-3003")])) == [
+        (5, "[5] gate valve GV-2002"), (8, "[8] CV-3003")]
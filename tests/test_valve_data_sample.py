@@ -0,0 +1,21 @@
+from valve_data_sample import CorpusGenerator
+from valve_prefilter import SERIAL_PATTERN
+
+def serials(generator, rows, block_rows):
+    return [record['serial_id'] for _, truth in generator.generate(rows, block_rows) for record in truth]
+
+def test_serials_are_distinct_without_duplicates():
+    found = serials(CorpusGenerator(seed=7, noise=0.0), 20_000, 5_000)
+    assert len(found) == 20_000
+    assert len(set(found)) == len(found)
+    assert all(SERIAL_PATTERN.fullmatch(serial) for serial in found)
+
+def test_shared_serials_are_the_marked_duplicates():
+    generator = CorpusGenerator(seed=7, duplicates=0.3)
+    records = [record for _, truth in generator.generate(5_000, 1_000) for record in truth]
+    originals = [record['serial_id'] for record in records if not record['duplicate']]
+    assert len(set(originals)) == len(originals)
+    assert any(record['duplicate'] for record in records)
+
+def test_same_seed_same_corpus():
+    assert serials(CorpusGenerator(seed=3), 500, 200) == serials(CorpusGenerator(seed=3), 500, 200)
@@ -0,0 +1,46 @@
+import pytest
+from valve_extraction import ValveSpecification
+from valve_merge import ValveMerger
+
+RATINGS = {'a': 'PN16', 'b': 'PN25'}
+
+def sighting(**fields) -> ValveSpecification:
+    return ValveSpecification(**{'valve_type': 'ball valve', 'serial_id': 'BV-1001', **fields})
+
+@pytest.mark.parametrize('policy, sources, expected', [
+    ('first', 'ab', 'PN16'),
+    ('last', 'ab', 'PN25'),
+    ('last', 'aba', 'PN16'),
+    ('most_common', 'abb', 'PN25'),
+    ('most_common', 'aab', 'PN16'),
+    ('most_common', 'ab', 'PN16'),  # A tie keeps the earliest value
+])
+def test_conflict_policies(policy, sources, expected):
+    merger = ValveMerger(policy)
+    for index, source in enumerate(sources):
+        merger.add([sighting(pressure_rating=RATINGS[source])], f'chunk {index}')
+    [valve] = merger.valves()
+    assert valve.pressure_rating == expected
+    assert merger.sightings == len(sources)
+
+def test_sightings_fill_missing_fields():
+    merger = ValveMerger(track_changes=True)
+    merger.add([sighting(serial_id='GV-2002', pressure_rating='PN25')], 'chunk 0')
+    assert [record.serial_id for record in merger.changed()] == ['GV-2002']
+    merger.add([sighting(serial_id='gv2002', material='cast iron', pressure_rating='PN25')], 'chunk 1')
+    assert [record.serial_id for record in merger.changed()] == ['GV-2002']
+    merger.add([sighting(serial_id='GV 2002', pressure_rating='PN25')], 'chunk 2')
+    assert merger.changed() == []  # Nothing new in the last sighting
+    [valve] = merger.valves()
+    assert (valve.serial_id, valve.material, valve.pressure_rating) == ('GV-2002', 'cast iron', 'PN25')
+    assert merger.get('gv-2002').provenance()['fields'] == {'valve_type': 'chunk 0', 'pressure_rating': 'chunk 0',
+                                                             'material': 'chunk 1'}
+
+def test_most_common_reports_where_the_winning_value_was_first_seen():
+    merger = ValveMerger('most_common')
+    for index, source in enumerate('abab'):
+        merger.add([sighting(pressure_rating=RATINGS[source])], f'chunk {index}')
+    merger.add([sighting(pressure_rating=RATINGS['b'])], 'chunk 4')
+    record = merger.get('BV-1001')
+    assert record.values['pressure_rating'] == 'PN25'
+    assert record.provenance()['fields']['pressure_rating'] == 'chunk 1'
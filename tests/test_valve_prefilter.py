@@ -0,0 +1,22 @@
+from valve_prefilter import REASON_EMPTY, REASON_NO_SIGNAL, REASON_WEAK_SIGNAL, ValvePrefilter
+
+ROWS = [
+    (0, "Maintenance report: The gate valve (GV-2022-X123) from FlowMaster needs inspection."),
+    (1, "Meeting scheduled with supplier next week"),
+    (2, "   "),
+    (3, "Order of bronze fittings pending approval"),
+    (4, "Quote for a check valve rated 150 PSI"),
+]
+
+def test_rows_without_valve_signal_are_dropped_with_a_reason():
+    prefilter = ValvePrefilter()
+    assert [index for index, _ in prefilter.filter_rows(ROWS)] == [0, 4]
+    assert (prefilter.kept, prefilter.dropped) == (2, 3)
+    assert prefilter.reasons == {REASON_NO_SIGNAL: 1, REASON_EMPTY: 1, REASON_WEAK_SIGNAL: 1}
+    assert prefilter.summary().startswith("Pre-filter dropped 3 of 5 items")
+
+def test_pluggable_scorer_replaces_the_rules():
+    prefilter = ValvePrefilter(min_score=1.0, scorer=lambda text: float('supplier' in text))
+    assert prefilter.filter_chunks([text for _, text in ROWS]) == [ROWS[1][1]]
+    prefilter.reset()
+    assert prefilter.summary() == "Pre-filter kept all 0 items"
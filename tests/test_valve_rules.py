@@ -0,0 +1,20 @@
+from valve_rules import RuleExtractor, parse_valve
+
+TEMPLATED = ("New shipment arrived: FlowMaster gate valves. Serial GV-2022-X123456 included. "
+             "Made of Carbon Steel, these units measure 6.5\" x 12.0\". Ideal for high-temperature operations.")
+
+def test_templated_row_is_parsed_with_field_confidence():
+    match = parse_valve(TEMPLATED)
+    assert match.valve.model_dump() == {
+        'valve_type': 'gate', 'serial_id': 'GV-2022-X123456', 'width': 165.1, 'height': 304.8,
+        'pressure_rating': None, 'material': 'Carbon Steel', 'manufacturer': 'FlowMaster'}
+    assert match.confidence['valve_type'] == 0.95 and 'pressure_rating' not in match.confidence
+
+def test_several_serials_or_weak_type_fall_back_to_the_model():
+    assert parse_valve("Swapped BV-2021-A100200 for CV-2023-B300400 in line 4") is None
+    extractor = RuleExtractor()
+    rows = [(0, TEMPLATED), (1, "Inspection due for CT-2024-Z777888"), (2, "Meeting scheduled")]
+    assert [index for index, _ in extractor.filter_rows(rows)] == [1, 2]  # CT- implies control, but only weakly
+    assert extractor.matched_rows == [0]
+    assert [valve.serial_id for valve in extractor.valves] == ['GV-2022-X123456']
+    assert extractor.fallbacks == 2
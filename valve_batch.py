@@ -0,0 +1,469 @@
+"""Headless batch extraction of valve specifications from many files.
+
+Runs the same chunk -> extract -> dedup pipeline as the GUI without
+importing Qt, e.g.:
+
+    python -m ollamafunction batch data/ --model llama3.1 --concurrency 8 -o valves.jsonl
+    python valve_batch.py "logs/**/*.xlsx" --format csv -o valves.csv
+"""
+import os
+import sys
+import csv
+import glob
+import json
+import time
+import argparse
+import threading
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import IO, Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Union
+from async_pipeline import AsyncExtractor
+from chunk_budget import ChunkBudget, ChunkPlan, DEFAULT_RATIO_PATH
+from extraction_cache import ExtractionCache, DEFAULT_CACHE_PATH, DEFAULT_MAX_BYTES
+from extraction_manifest import RowManifest
+from inference_telemetry import InferenceTelemetry, start_metrics_server
+from job_journal import JobJournal, RetryPolicy, MAX_RETRIES, RETRY_BASE_DELAY
+from model_session import ModelSession, RUN_KEEP_ALIVE
+from ollama_pool import EndpointPool, HOSTS_ENV, configured_hosts
+from row_chunker import RowChunk
+from stage_profiler import StageProfiler, options_from_env, profile_dir, profile_options
+from stage_timer import stage
+from valve_extraction import (ValveSpecification, ValveList, RowValvesList, ResponseObserver, SYSTEM_PROMPT,
+                              BATCH_SYSTEM_PROMPT, CHAT_OPTIONS, UNATTRIBUTED_ROW)
+from valve_merge import ValveMerger, MergedValve, CONFLICT_POLICIES, DEFAULT_POLICY
+from valve_pipeline import (EXCEL_EXTENSIONS, TEXT_EXTENSIONS, ChunkResult, extract_chunks, file_chunks,
+                            file_rows, make_text_splitter, row_chunks)
+from valve_prefilter import ValvePrefilter
+from valve_rules import RuleExtractor
+
+OUTPUT_FORMATS = ('jsonl', 'csv')
+ENGINES = ('async', 'threads')
+
+# Called as extract(chunks, model, cache=..., model_digest=..., options=..., on_response=...)
+ChunkExtractor = Callable[..., Iterator[ChunkResult]]
+
+def expand_inputs(inputs: Sequence[str], recursive: bool = False) -> List[str]:
+    """Resolve directories and glob patterns to a sorted list of supported files"""
+    extensions = EXCEL_EXTENSIONS + TEXT_EXTENSIONS
+    paths = set()
+    for item in inputs:
+        if os.path.isdir(item):
+            pattern = os.path.join(item, '**', '*') if recursive else os.path.join(item, '*')
+            candidates = glob.glob(pattern, recursive=recursive)
+        else:
+            candidates = glob.glob(item, recursive=True)
+        paths.update(path for path in candidates
+                     if os.path.isfile(path) and path.lower().endswith(extensions))
+    return sorted(paths)
+
+class RecordWriter:
+    """Thread-safe writer that streams one record per valve as files complete"""
+    def __init__(self, stream: IO[str], output_format: str, provenance: bool = False):
+        self.stream = stream
+        self.output_format = output_format
+        self.provenance = provenance
+        self.lock = threading.Lock()
+        self.records = 0
+        self.csv_writer = None
+        if output_format == 'csv':
+            fields = ['source_file', *ValveSpecification.model_fields]
+            if provenance:
+                fields.append('provenance')
+            self.csv_writer = csv.DictWriter(stream, fieldnames=fields)
+            self.csv_writer.writeheader()
+
+    def write(self, source_file: str, merged: Iterable[MergedValve]):
+        with self.lock, stage('write'):
+            for valve in merged:
+                record = {'source_file': source_file, **valve.to_valve().model_dump()}
+                if self.provenance:
+                    record['provenance'] = valve.provenance()
+                if self.csv_writer is not None:
+                    if self.provenance:
+                        record['provenance'] = json.dumps(record['provenance'])
+                    self.csv_writer.writerow(record)
+                else:
+                    self.stream.write(json.dumps(record) + '\n')
+                self.records += 1
+            self.stream.flush()
+
+def keep_alive_value(value: str):
+    """--keep-alive as Ollama expects it: seconds as a number, or a duration like '30m'"""
+    try:
+        return float(value)
+    except ValueError:
+        return value
+
+def profile_value(value: str):
+    """--profile-options value: 'stages', or a comma-separated list like 'cprofile,tracemalloc,sample'"""
+    try:
+        return profile_options(value)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+def process_file(path: str, args: argparse.Namespace, extract: ChunkExtractor,
+                 cache: Optional[ExtractionCache], model_digest: str, budget: ChunkBudget,
+                 manifest: Optional[RowManifest] = None, on_response: Optional[ResponseObserver] = None,
+                 journal: Optional[JobJournal] = None) -> Dict:
+    """Extract and deduplicate the valves of one file; returns per-file stats.
+
+    With a manifest, workbook rows already extracted in a previous run are
+    reused and only new or changed rows are sent through the pipeline.
+    on_response sees every model response after the chunk budget does.
+    With a journal, every finished chunk is checkpointed and chunks it
+    already holds are not extracted again. Failed chunks are retried
+    --retries times with exponential backoff once the rest of the file
+    is done.
+    """
+    prefilter = None if args.no_prefilter else ValvePrefilter()
+    rules = None if args.no_rules else RuleExtractor()
+    incremental = manifest is not None and path.lower().endswith(EXCEL_EXTENSIONS)
+    retry = RetryPolicy(args.retries, args.retry_delay)
+
+    # Row IDs only apply to workbooks; text chunks have no rows to scatter to
+    batched = args.row_ids and path.lower().endswith(EXCEL_EXTENSIONS)
+
+    chunk_rows: List[List[int]] = []
+    sent: List[int] = []  # Chunk index of each chunk handed to the extractor
+    held: Dict[int, Union[str, RowChunk]] = {}  # Chunks in flight or awaiting a retry
+    resumed: Dict[int, Any] = {}  # Results of chunks checkpointed by an interrupted run
+    def tracked_chunks(chunks: Iterable[RowChunk]) -> Iterator[Union[str, RowChunk]]:
+        for chunk in chunks:
+            index = len(chunk_rows)
+            chunk_rows.append(chunk.row_indices)
+            item = chunk if batched else chunk.text
+            valves = journal.lookup(path, item) if journal is not None else None
+            if valves is not None:
+                resumed[index] = valves
+                continue
+            sent.append(index)
+            held[index] = item
+            yield item
+
+    # The file is chunked from a frozen plan, so files processed alongside it never move its boundaries;
+    # a fixed --token-budget overrides the size derived from the context window
+    plan = budget.plan(args.token_budget)
+    if journal is not None:
+        # A resumed file is chunked exactly as before, so its chunks match the checkpoints
+        settings = journal.settings(path, {'token_budget': plan.chunk_tokens, 'chars_per_token': plan.chars_per_token})
+        plan = ChunkPlan(settings['token_budget'], settings['chars_per_token'])
+    if incremental:
+        rows = manifest.filter_rows(path, file_rows(path))
+        chunks = tracked_chunks(row_chunks(rows, prefilter, rules, plan.chunk_tokens, plan.count_tokens, batched))
+    else:
+        splitter = make_text_splitter(plan.chunk_chars, plan.chunk_chars // 10)
+        chunks = tracked_chunks(file_chunks(path, splitter, prefilter, rules, plan.chunk_tokens,
+                                            plan.count_tokens, batched))
+
+    observe: ResponseObserver = budget.observe
+    if on_response is not None:
+        def observe_both(prompt: str, response: Any):
+            budget.observe(prompt, response)
+            on_response(prompt, response)
+        observe = observe_both
+
+    results: Dict[int, Any] = {}
+    retrying: Dict[int, str] = {}  # Chunk index -> last error
+    failed = 0
+    unattributed: Dict[int, List[ValveSpecification]] = {}  # Chunk index -> valves no row of the chunk mentions
+    def record(index: int, valves: Any):
+        if incremental and batched:
+            if UNATTRIBUTED_ROW in valves:
+                unattributed[index] = valves[UNATTRIBUTED_ROW]
+            manifest.record_rows(path, chunk_rows[index], valves)
+        elif incremental:
+            manifest.record_chunk(path, chunk_rows[index], valves)
+        results[index] = valves
+
+    def settle(index: int, valves: Any, error: Optional[str], final: bool):
+        nonlocal failed
+        if error is None:
+            chunk = held.pop(index)
+            if journal is not None:
+                journal.record(path, index, chunk, valves)
+            record(index, valves)
+        elif not final:
+            retrying[index] = error
+        else:
+            failed += 1
+            held.pop(index)
+            print(f"{path}: error processing chunk {index + 1}: {error}", file=sys.stderr)
+            if incremental:
+                manifest.discard_rows(path, chunk_rows[index])
+
+    def run(items: Iterable[Union[str, RowChunk]], indices: List[int], final: bool):
+        for position, valves, error in extract(items, args.model, cache=cache, model_digest=model_digest,
+                                               options=budget.options(), on_response=observe,
+                                               row_ids=batched):
+            settle(indices[position], valves, error, final)
+
+    run(chunks, sent, not retry.retries)
+    for attempt in range(retry.retries):
+        if not retrying:
+            break
+        indices = sorted(retrying)
+        delay = retry.delay(attempt)
+        print(f"{path}: retrying {len(indices)} failed chunks in {delay:.1f}s "
+              f"(attempt {attempt + 1}/{retry.retries}, last error: {retrying[indices[-1]]})", file=sys.stderr)
+        retrying.clear()
+        time.sleep(delay)
+        run([held[index] for index in indices], indices, attempt + 1 == retry.retries)
+    for index, valves in resumed.items():
+        record(index, valves)
+
+    # Rule valves go first, then chunk results in chunk order
+    preset = rules.valves if rules is not None else []
+    matched_rows = rules.matched_rows if rules is not None else []
+    merger = ValveMerger(args.conflict_policy)
+    if incremental:
+        for row_index, valve in zip(matched_rows, preset):
+            manifest.record_row(path, row_index, [valve])
+        # Every chunk finished or was discarded, so the rows left pending never needed the model
+        manifest.finish(path)
+        manifest.merge_into(path, merger)
+        for index in sorted(unattributed):
+            merger.add(unattributed[index], f'chunk {index}')
+            # No row can hold these valves, so the chunk's rows are extracted again next run instead of reused
+            manifest.discard_rows(path, chunk_rows[index])
+    else:
+        for row_index, valve in zip(matched_rows, preset):
+            merger.add([valve], f'row {row_index} (rules)')
+        for index in sorted(results):
+            valves = results[index]
+            if batched:
+                for row_index, row_valves in valves.items():
+                    merger.add(row_valves, f'chunk {index}' if row_index == UNATTRIBUTED_ROW else f'row {row_index}')
+            else:
+                merger.add(valves, f'chunk {index}')
+
+    return {
+        'merger': merger,
+        'chunks': len(chunk_rows),
+        'failed_chunks': failed,
+        'resumed_chunks': len(resumed),
+        'rule_valves': len(preset),
+        'prefilter_dropped': prefilter.dropped if prefilter is not None else 0,
+        'deleted_rows': manifest.deleted(path) if incremental else 0,
+    }
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog='ollamafunction batch',
+        description="Extract valve specifications from Excel and text files without the GUI",
+    )
+    parser.add_argument('inputs', nargs='+', help="Files, directories or glob patterns to process")
+    parser.add_argument('-m', '--model', required=True, help="Ollama model to use")
+    parser.add_argument('-c', '--concurrency', type=int, default=4,
+                        help="Chunks in flight at once across all files (default: 4)")
+    parser.add_argument('--engine', choices=ENGINES, default='async',
+                        help="async: one event loop over pooled keep-alive connections; "
+                             "threads: a blocking request per worker thread (default: async)")
+    parser.add_argument('--files', type=int, default=2,
+                        help="Files processed at the same time (default: 2)")
+    parser.add_argument('-f', '--format', choices=OUTPUT_FORMATS, default='jsonl',
+                        help="Output format (default: jsonl)")
+    parser.add_argument('-o', '--output', default='-', help="Output file, or - for stdout (default)")
+    parser.add_argument('-r', '--recursive', action='store_true', help="Search directories recursively")
+    parser.add_argument('--token-budget', type=int, default=None,
+                        help="Tokens per chunk (default: sized from the model's context window)")
+    parser.add_argument('--row-ids', action='store_true',
+                        help="Tag workbook rows with their IDs and have the model group valves by row, "
+                             "so valves are attributed to their source row")
+    parser.add_argument('--no-prefilter', action='store_true', help="Send rows without valve signal to the model")
+    parser.add_argument('--no-rules', action='store_true', help="Disable the rule-based fast path")
+    parser.add_argument('--no-cache', action='store_true', help="Disable the extraction cache")
+    parser.add_argument('--conflict-policy', choices=CONFLICT_POLICIES, default=DEFAULT_POLICY,
+                        help=f"How to resolve disagreeing fields of the same valve (default: {DEFAULT_POLICY})")
+    parser.add_argument('--provenance', action='store_true',
+                        help="Include sightings, origins and conflicts of each valve in the output")
+    parser.add_argument('--incremental', action='store_true',
+                        help="Keep a per-row manifest next to the output and only extract new or changed rows")
+    parser.add_argument('--journal', action='store_true',
+                        help="Checkpoint every finished chunk to a job journal next to the output, and resume "
+                             "from it if the previous run was interrupted")
+    parser.add_argument('--retries', type=int, default=MAX_RETRIES,
+                        help=f"Times a failed chunk is retried, with exponential backoff (default: {MAX_RETRIES})")
+    parser.add_argument('--retry-delay', type=float, default=RETRY_BASE_DELAY,
+                        help=f"Seconds before the first retry; doubles with each attempt (default: {RETRY_BASE_DELAY:g})")
+    parser.add_argument('--hosts', default=None,
+                        help=f"Comma-separated Ollama endpoints to balance across (default: ${HOSTS_ENV} or localhost)")
+    parser.add_argument('--keep-alive', type=keep_alive_value, default=RUN_KEEP_ALIVE,
+                        help=f"How long the model stays loaded between requests during the run, "
+                             f"as seconds or a duration; -1 keeps it loaded (default: {RUN_KEEP_ALIVE})")
+    parser.add_argument('--cache-path', default=DEFAULT_CACHE_PATH, help="Extraction cache location")
+    parser.add_argument('--telemetry', default=None,
+                        help="Write per-request and run-level inference metrics to this JSON file")
+    parser.add_argument('--metrics-file', default=None,
+                        help="Write the run's inference metrics in Prometheus text format to this file")
+    parser.add_argument('--metrics-port', type=int, default=None,
+                        help="Serve the inference metrics on http://127.0.0.1:PORT/metrics during the run")
+    parser.add_argument('--profile', action='store_true',
+                        help="Time each pipeline stage and write a CPU/memory summary and flame-graph stacks "
+                             "(default: $VALVE_PROFILE)")
+    parser.add_argument('--profile-options', type=profile_value, default=None, metavar='OPTIONS',
+                        help="Also profile with cprofile, tracemalloc and/or sample, comma-separated; "
+                             "implies --profile")
+    parser.add_argument('--profile-dir', default=None,
+                        help="Where profiles are written (default: $VALVE_PROFILE_DIR or ~/.valve_extractor/profiles)")
+    return parser
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    paths = expand_inputs(args.inputs, args.recursive)
+    if not paths:
+        print("Error: no .xlsx, .xls or .txt files matched", file=sys.stderr)
+        return 1
+
+    if args.incremental and args.output == '-':
+        print("Error: --incremental needs an output file to keep the manifest next to", file=sys.stderr)
+        return 1
+    if args.journal and args.output == '-':
+        print("Error: --journal needs an output file to keep the job journal next to", file=sys.stderr)
+        return 1
+
+    cache = None if args.no_cache else ExtractionCache(args.cache_path, DEFAULT_MAX_BYTES)
+    pool = EndpointPool(configured_hosts(args.hosts))
+    pool.refresh()
+    serving = [endpoint.url for endpoint in pool.healthy() if args.model in endpoint.models]
+    if not serving:
+        # Keep going: the rule fast path and reused manifest rows need no model
+        print(f"Warning: no reachable Ollama endpoint has model {args.model} ({', '.join(pool.urls)})",
+              file=sys.stderr)
+    model_digest = pool.models().get(args.model, '')
+    budget = ChunkBudget.for_model(args.model, pool.url_for(args.model))
+    # Results from a different model, prompt, schema or options are not reused, nor are they when
+    # the pre-filter, rule fast path or chunk size change which rows reach the model and in what company
+    system_prompt, result_model = ((BATCH_SYSTEM_PROMPT, RowValvesList) if args.row_ids
+                                   else (SYSTEM_PROMPT, ValveList))
+    run_settings = {'prefilter': None if args.no_prefilter else ValvePrefilter().min_score,
+                    'rules': not args.no_rules, 'token_budget': args.token_budget}
+    fingerprint = ExtractionCache.make_key(args.model, model_digest, system_prompt,
+                                           result_model.model_json_schema(), '',
+                                           {**CHAT_OPTIONS, **budget.options(), **run_settings})
+    manifest = None
+    if args.incremental:
+        manifest = RowManifest.load(RowManifest.path_for(args.output), fingerprint)
+    journal = None
+    if args.journal:
+        journal = JobJournal.open(JobJournal.path_for(args.output), fingerprint)
+        if journal.resumed:
+            print(f"Resuming job: {journal.checkpointed()} chunks checkpointed in {journal.path}", file=sys.stderr)
+    output = sys.stdout if args.output == '-' else open(args.output, 'w', encoding='utf-8', newline='')
+    writer = RecordWriter(output, args.format, args.provenance)
+    print(f"Processing {len(paths)} files with model {args.model}", file=sys.stderr)
+    print(budget.describe(), file=sys.stderr)
+    print(f"{len(serving)}/{len(pool.endpoints)} Ollama endpoints serve {args.model}", file=sys.stderr)
+    try:
+        if args.profile_options is not None:
+            profile = args.profile_options
+        else:
+            profile = () if args.profile else options_from_env()
+    except ValueError as e:
+        print(f"Error: {str(e)}", file=sys.stderr)
+        return 1
+    profiler = StageProfiler(profile).start() if profile is not None else None
+    telemetry = InferenceTelemetry()
+    metrics_server = None
+    if args.metrics_port is not None:
+        try:
+            metrics_server = start_metrics_server(telemetry, args.metrics_port)
+        except OSError as e:
+            print(f"Warning: cannot serve metrics on port {args.metrics_port}: {str(e)}", file=sys.stderr)
+    session = ModelSession(pool, args.keep_alive)
+    if serving:
+        print(session.preload(args.model, budget.options()), file=sys.stderr)
+    session.begin_run(args.model, budget.options())
+
+    # Both engines cap requests in flight at --concurrency across all files
+    chunk_executor = None
+    extractor = None
+    if args.engine == 'async':
+        extractor = AsyncExtractor(pool, args.concurrency)
+        extract = extractor.extract_chunks
+    else:
+        chunk_executor = ThreadPoolExecutor(max_workers=args.concurrency)
+        extract = partial(extract_chunks, executor=chunk_executor, max_in_flight=args.concurrency, client=pool)
+
+    errors = 0
+    failed_chunks = 0
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, args.files)) as file_executor:
+            futures = {
+                file_executor.submit(process_file, path, args, extract, cache, model_digest,
+                                     budget, manifest, telemetry.observe, journal): path
+                for path in paths
+            }
+            for future in as_completed(futures):
+                path = futures[future]
+                try:
+                    stats = future.result()
+                except Exception as e:
+                    errors += 1
+                    print(f"{path}: error: {str(e)}", file=sys.stderr)
+                    continue
+                merger = stats['merger']
+                writer.write(path, merger.records())
+                failed_chunks += stats['failed_chunks']
+                print(
+                    f"{path}: {len(merger)} valves from {stats['chunks']} chunks "
+                    f"({stats['failed_chunks']} failed, "
+                    + (f"{stats['resumed_chunks']} resumed, " if journal is not None else "")
+                    + f"{stats['rule_valves']} by rules, "
+                    f"{stats['prefilter_dropped']} rows skipped, {stats['deleted_rows']} rows deleted)",
+                    file=sys.stderr,
+                )
+    finally:
+        session.end_run()
+        if extractor is not None:
+            extractor.close()
+        if chunk_executor is not None:
+            chunk_executor.shutdown()
+        if output is not sys.stdout:
+            output.close()
+        if manifest is not None:
+            manifest.save(RowManifest.path_for(args.output))
+        if journal is not None:
+            journal.close()
+        telemetry.finish()
+        if profiler is not None:
+            profiler.finish()
+        if metrics_server is not None:
+            metrics_server.shutdown()
+            metrics_server.server_close()
+
+    print(pool.summary(), file=sys.stderr)
+    print(telemetry.summary(), file=sys.stderr)
+    if journal is not None:
+        print(journal.summary(), file=sys.stderr)
+        if errors or failed_chunks:
+            print("Rerun with --journal to retry the failed chunks; finished ones are reused", file=sys.stderr)
+        else:
+            # Every chunk is in the output now, so there is nothing left to resume
+            journal.remove()
+    summary = f"Done: {writer.records} valves from {len(paths) - errors}/{len(paths)} files"
+    if manifest is not None:
+        summary += f", {manifest.reused} rows reused / {manifest.extracted} new or changed"
+    if cache is not None:
+        stats = cache.stats()
+        summary += f", cache {stats['hits']} hits / {stats['misses']} misses"
+    print(summary, file=sys.stderr)
+    try:
+        # The ratio measured over this run sizes the chunks of the next one; it stays fixed once adopted
+        if budget.calibrate(DEFAULT_RATIO_PATH):
+            print(f"Calibrated {args.model} at {budget.chars_per_token:.2f} chars/token", file=sys.stderr)
+        if profiler is not None:
+            print(profiler.describe(), file=sys.stderr)
+            paths = profiler.write(args.profile_dir or profile_dir())
+            print(f"Profile written to {', '.join(paths)}", file=sys.stderr)
+        if args.telemetry:
+            telemetry.write_json(args.telemetry)
+        if args.metrics_file:
+            telemetry.write_prometheus(args.metrics_file)
+    except OSError as e:
+        print(f"Error writing metrics: {str(e)}", file=sys.stderr)
+        return 1
+    # A failed chunk leaves valves missing from the output, even if its file was written
+    return 1 if errors or failed_chunks else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
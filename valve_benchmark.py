@@ -0,0 +1,327 @@
+"""End-to-end throughput benchmark of the headless extractor, with regression gates.
+
+Generates seeded corpora of several sizes, runs them through the batch
+pipeline against the mock Ollama server (or real endpoints with --hosts)
+and reports throughput, per-chunk latency percentiles, peak RSS and the
+time spent in each pipeline stage as JSON, e.g.:
+
+    python valve_benchmark.py --sizes 1000,10000,100000 -o bench.json
+    python valve_benchmark.py --sizes 1000,10000 --baseline bench.json --threshold 0.25
+"""
+import os
+import sys
+import gc
+import json
+import time
+import argparse
+import platform
+import tempfile
+import threading
+from datetime import datetime
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence
+from async_pipeline import AsyncExtractor
+from chunk_budget import ChunkBudget
+from inference_telemetry import InferenceTelemetry
+from mock_ollama import MockOllama, ModelProfile, LatencyModel, GroundTruth, start_mock_server
+from model_session import ModelSession
+from ollama_pool import EndpointPool, configured_hosts
+from stage_timer import StageTimer, STAGES, activate
+from valve_batch import RecordWriter, process_file, build_parser as build_batch_parser
+from valve_data_sample import CorpusGenerator, CorpusWriter, TRUTH_SUFFIX
+from valve_pipeline import extract_chunks
+
+DEFAULT_SIZES = (1_000, 10_000, 100_000)
+DEFAULT_MODEL = 'bench'
+DEFAULT_LATENCY = 'fixed:0.02'  # Mock per-request overhead
+DEFAULT_TOKENS_PER_SEC = 5000.0  # Mock generation speed
+DEFAULT_PROMPT_TOKENS_PER_SEC = 20000.0  # Mock prompt evaluation speed
+DEFAULT_THRESHOLD = 0.25  # Allowed relative slowdown before a metric counts as regressed
+DEFAULT_MIN_SECONDS = 0.05  # Stage slowdowns smaller than this are noise
+RSS_INTERVAL = 0.05  # Seconds between RSS samples
+PERCENTILES = (50, 95, 99)
+
+class PeakRss:
+    """Samples the process's resident set size in a background thread and keeps the peak.
+
+    Reads /proc/self/statm where it exists, so each run gets its own peak;
+    elsewhere it falls back to ru_maxrss, which is the peak of the whole
+    process so far.
+    """
+    def __init__(self, interval: float = RSS_INTERVAL):
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='rss-sampler', daemon=True)
+
+    @staticmethod
+    def current() -> int:
+        try:
+            with open('/proc/self/statm') as f:
+                return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+        except (OSError, ValueError, AttributeError):
+            pass
+        try:
+            import resource
+        except ImportError:
+            return 0
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == 'darwin' else peak * 1024  # bytes on macOS, KiB on Linux
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak = max(self.peak, self.current())
+            self._stop.wait(self.interval)
+
+    def __enter__(self) -> "PeakRss":
+        self.peak = self.current()
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, self.current())
+
+def percentile(values: Sequence[float], percent: float) -> Optional[float]:
+    """Nearest-rank percentile, None for no values"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * percent // 100))  # ceil
+    return ordered[int(rank) - 1]
+
+def corpus_path(directory: str, rows: int, seed: int) -> str:
+    return os.path.join(directory, f'bench_{rows}_{seed}.xlsx')
+
+def ensure_corpus(directory: str, rows: int, seed: int) -> str:
+    """Workbook of rows generated rows (and its ground truth), reused if already generated"""
+    path = corpus_path(directory, rows, seed)
+    if os.path.exists(path) and os.path.exists(path + TRUTH_SUFFIX):
+        return path
+    generator = CorpusGenerator(seed)
+    writer = CorpusWriter(path, 'xlsx', generator.columns)
+    with open(path + TRUTH_SUFFIX, 'w', encoding='utf-8') as truth_file:
+        try:
+            for frame, truth in generator.generate(rows):
+                writer.write(frame)
+                truth_file.writelines(json.dumps(record) + '\n' for record in truth)
+        finally:
+            writer.close()
+    return path
+
+def run_once(path: str, rows: int, batch_args: argparse.Namespace, pool: EndpointPool,
+             output_path: str) -> Dict[str, Any]:
+    """Extract one corpus the way valve_batch does, timing every stage"""
+    model = batch_args.model
+    pool.refresh()
+    budget = ChunkBudget.for_model(model, pool.url_for(model), ratio_path=None)
+    session = ModelSession(pool, batch_args.keep_alive)
+    session.preload(model, budget.options())
+    session.begin_run(model, budget.options())
+    extractor = None
+    executor = None
+    if batch_args.engine == 'async':
+        extractor = AsyncExtractor(pool, batch_args.concurrency)
+        extract = extractor.extract_chunks
+    else:
+        executor = ThreadPoolExecutor(max_workers=batch_args.concurrency)
+        extract = partial(extract_chunks, executor=executor, max_in_flight=batch_args.concurrency, client=pool)
+
+    timer = StageTimer(keep_samples=('llm',))
+    telemetry = InferenceTelemetry(keep_requests=False)
+    gc.collect()
+    previous = activate(timer)
+    try:
+        with PeakRss() as rss, open(output_path, 'w', encoding='utf-8', newline='') as output:
+            start = time.perf_counter()
+            stats = process_file(path, batch_args, extract, None, pool.models().get(model, ''), budget,
+                                 on_response=telemetry.observe)
+            writer = RecordWriter(output, batch_args.format)
+            writer.write(path, stats['merger'].records())
+            elapsed = time.perf_counter() - start
+            telemetry.finish()
+    finally:
+        activate(previous)
+        session.end_run()
+        if extractor is not None:
+            extractor.close()
+        if executor is not None:
+            executor.shutdown()
+
+    stages = timer.snapshot()
+    latencies = timer.samples['llm']
+    return {
+        'rows': rows,
+        'chunks': stats['chunks'],
+        'failed_chunks': stats['failed_chunks'],
+        'records': writer.records,
+        'seconds': elapsed,
+        'records_per_sec': writer.records / elapsed if elapsed else None,
+        'chunks_per_sec': stats['chunks'] / elapsed if elapsed else None,
+        'rows_per_sec': rows / elapsed if elapsed else None,
+        'chunk_latency': {f'p{p}': percentile(latencies, p) for p in PERCENTILES},
+        'peak_rss_mb': rss.peak / (1024 * 1024),
+        'stages': {name: {**stages.get(name, {'seconds': 0.0, 'calls': 0}),
+                          'share': stages.get(name, {}).get('seconds', 0.0) / elapsed if elapsed else None}
+                   for name in STAGES},
+        'inference': telemetry.report(include_requests=False),
+    }
+
+def compare(results: List[Dict[str, Any]], baseline: Dict[str, Any], threshold: float,
+            min_seconds: float) -> List[str]:
+    """Regressions of results against a baseline report, one message each"""
+    previous = {result['rows']: result for result in baseline.get('results', [])}
+    regressions = []
+    for result in results:
+        base = previous.get(result['rows'])
+        if base is None:
+            continue
+        size = f"{result['rows']} rows"
+        if base.get('records_per_sec') and result['records_per_sec'] is not None:
+            if result['records_per_sec'] < base['records_per_sec'] * (1 - threshold):
+                regressions.append(f"{size}: {result['records_per_sec']:.1f} records/sec, "
+                                   f"baseline {base['records_per_sec']:.1f}")
+        for name, stage in result['stages'].items():
+            before = base.get('stages', {}).get(name, {}).get('seconds')
+            if before is None:
+                continue
+            now = stage['seconds']
+            if now > before * (1 + threshold) and now - before > min_seconds:
+                regressions.append(f"{size}: stage {name} took {now:.3f}s, baseline {before:.3f}s "
+                                   f"(+{(now / before - 1) * 100 if before else float('inf'):.0f}%)")
+    return regressions
+
+def sizes_value(value: str) -> List[int]:
+    """argparse type for comma-separated row counts"""
+    try:
+        sizes = [int(size) for size in value.split(',') if size.strip()]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected comma-separated row counts, got {value!r}")
+    if not sizes or min(sizes) < 1:
+        raise argparse.ArgumentTypeError(f"expected positive row counts, got {value!r}")
+    return sizes
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Benchmark headless valve extraction on generated corpora")
+    parser.add_argument('--sizes', type=sizes_value, default=list(DEFAULT_SIZES),
+                        help=f"Comma-separated corpus sizes in rows (default: {','.join(map(str, DEFAULT_SIZES))})")
+    parser.add_argument('-o', '--output', default='-', help="JSON report file, or - for stdout (default)")
+    parser.add_argument('--baseline', default=None, help="Earlier JSON report to check for regressions against")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help=f"Relative slowdown that fails the run (default: {DEFAULT_THRESHOLD})")
+    parser.add_argument('--min-seconds', type=float, default=DEFAULT_MIN_SECONDS,
+                        help=f"Ignore stage slowdowns below this many seconds (default: {DEFAULT_MIN_SECONDS})")
+    parser.add_argument('--corpus-dir', default=None,
+                        help="Where generated corpora are kept and reused (default: a temporary directory)")
+    parser.add_argument('--seed', type=int, default=0, help="Corpus seed (default: 0)")
+    parser.add_argument('-m', '--model', default=DEFAULT_MODEL, help=f"Model to extract with (default: {DEFAULT_MODEL})")
+    parser.add_argument('-c', '--concurrency', type=int, default=4, help="Chunks in flight at once (default: 4)")
+    parser.add_argument('--engine', choices=('async', 'threads'), default='async', help="Extraction engine")
+    parser.add_argument('--row-ids', action='store_true', help="Benchmark batched extraction with row IDs")
+    parser.add_argument('--no-prefilter', action='store_true', help="Send rows without valve signal to the model")
+    parser.add_argument('--rules', action='store_true',
+                        help="Enable the rule-based fast path; it parses every generated template, "
+                             "so with it on the model is barely exercised")
+    parser.add_argument('--hosts', default=None,
+                        help="Benchmark these Ollama endpoints instead of the mock server")
+    parser.add_argument('--latency', type=LatencyModel, default=LatencyModel(DEFAULT_LATENCY),
+                        help=f"Mock per-request latency distribution (default: {DEFAULT_LATENCY})")
+    parser.add_argument('--tokens-per-sec', type=float, default=DEFAULT_TOKENS_PER_SEC,
+                        help=f"Mock generation speed (default: {DEFAULT_TOKENS_PER_SEC:g})")
+    parser.add_argument('--prompt-tokens-per-sec', type=float, default=DEFAULT_PROMPT_TOKENS_PER_SEC,
+                        help=f"Mock prompt evaluation speed (default: {DEFAULT_PROMPT_TOKENS_PER_SEC:g})")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Fraction of mock requests failing")
+    return parser
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    baseline = None
+    if args.baseline:
+        try:
+            with open(args.baseline, encoding='utf-8') as f:
+                baseline = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Error: cannot read baseline {args.baseline}: {str(e)}", file=sys.stderr)
+            return 1
+
+    temp_dir = None
+    corpus_dir = args.corpus_dir
+    if corpus_dir is None:
+        temp_dir = tempfile.TemporaryDirectory(prefix='valve_bench_')
+        corpus_dir = temp_dir.name
+    os.makedirs(corpus_dir, exist_ok=True)
+
+    server = None
+    results = []
+    try:
+        paths = {}
+        for rows in args.sizes:
+            print(f"Preparing {rows}-row corpus", file=sys.stderr)
+            paths[rows] = ensure_corpus(corpus_dir, rows, args.seed)
+        if args.hosts:
+            hosts = configured_hosts(args.hosts)
+        else:
+            truth = GroundTruth(path + TRUTH_SUFFIX for path in paths.values())
+            mock = MockOllama([ModelProfile(args.model, args.tokens_per_sec)], truth, args.latency,
+                              args.prompt_tokens_per_sec, load_seconds=0.0, parallel=args.concurrency, error_rate=args.error_rate,
+                              seed=args.seed)
+            server = start_mock_server(mock)
+            hosts = [server.url]
+        pool = EndpointPool(hosts, max_connections=args.concurrency)
+
+        for rows in args.sizes:
+            # Failed chunks are counted, not retried, so backoff sleeps never skew the timings
+            batch_argv = [paths[rows], '--model', args.model, '--concurrency', str(args.concurrency),
+                          '--engine', args.engine, '--no-cache', '--retries', '0']
+            batch_argv += [flag for flag, on in (('--row-ids', args.row_ids), ('--no-prefilter', args.no_prefilter),
+                                                 ('--no-rules', not args.rules)) if on]
+            batch_args = build_batch_parser().parse_args(batch_argv)
+            print(f"Running {rows} rows", file=sys.stderr)
+            result = run_once(paths[rows], rows, batch_args, pool, os.path.join(corpus_dir, 'bench_output.jsonl'))
+            results.append(result)
+            print(f"{rows} rows: {result['records']} records in {result['seconds']:.2f}s "
+                  f"({result['records_per_sec']:.1f} records/sec, {result['chunks_per_sec']:.1f} chunks/sec, "
+                  f"peak RSS {result['peak_rss_mb']:.0f} MB)", file=sys.stderr)
+    finally:
+        if server is not None:
+            server.shutdown()
+            server.server_close()
+        if temp_dir is not None:
+            temp_dir.cleanup()
+
+    report = {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'config': {
+            'model': args.model,
+            'engine': args.engine,
+            'concurrency': args.concurrency,
+            'row_ids': args.row_ids,
+            'prefilter': not args.no_prefilter,
+            'rules': args.rules,
+            'hosts': args.hosts,
+            'mock': None if args.hosts else {'latency': args.latency.spec, 'tokens_per_sec': args.tokens_per_sec,
+                                              'prompt_tokens_per_sec': args.prompt_tokens_per_sec,
+                                              'error_rate': args.error_rate},
+            'seed': args.seed,
+        },
+        'results': results,
+    }
+    regressions = compare(results, baseline, args.threshold, args.min_seconds) if baseline else []
+    report['regressions'] = regressions
+    text = json.dumps(report, indent=2)
+    if args.output == '-':
+        print(text)
+    else:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+
+    for message in regressions:
+        print(f"Regression: {message}", file=sys.stderr)
+    return 1 if regressions else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,9 +1,26 @@
+"""Seeded synthetic corpus of messy valve log rows, with the embedded valves as ground truth.
+
+Rows are generated in vectorized blocks and streamed to .xlsx, .csv or
+.parquet, so memory stays flat however many rows are requested, e.g.:
+
+    python valve_data_sample.py                                   # 100 rows -> messy_valve_data.xlsx
+    python valve_data_sample.py -n 2000000 -o corpus.csv --noise 0.5 --duplicates 0.2
+"""
+import sys
+import csv
+import json
+import math
+import string
+import argparse
+from typing import IO, Dict, Iterator, List, Optional, Sequence, Tuple
+import numpy as np
 import pandas as pd
-import random
-from datetime import datetime, timedelta
+from openpyxl import Workbook
+from valve_extraction import ValveSpecification
+from valve_rules import SERIAL_PREFIX_TYPES
 
 # Templates for natural text descriptions
-templates = [
+TEMPLATES = [
     "Just received a {valve_type} valve from {manufacturer}. The model number is {serial_id}. {material} construction makes it perfect for high-pressure applications up to {pressure_rating}. {extra}",
     "Checking inventory: Found a {material} {valve_type} valve (ID: {serial_id}) in warehouse B. Dimensions are roughly {width} inches wide by {height} inches tall. {extra}",
     "Customer inquiry about {manufacturer}'s {valve_type} valve, {serial_id}. They're particularly interested in its {pressure_rating} rating. {extra}",
@@ -11,7 +28,7 @@ templates = [
     "New shipment arrived: {manufacturer} {valve_type} valves. Serial {serial_id} included. Made of {material}, these units measure {width}\" x {height}\". {extra}",
 ]
 
-extra_details = [
+EXTRA_DETAILS = [
     "Recommended for chemical processing applications.",
     "Perfect for water treatment facilities.",
     "Commonly used in oil and gas industry.",
@@ -20,7 +37,7 @@ extra_details = [
 ]
 
 # Random notes and comments for noise
-random_notes = [
+RANDOM_NOTES = [
     "Meeting scheduled with supplier next week",
     "Need to follow up with customer about delivery",
     "Warehouse inventory check completed",
@@ -30,86 +47,307 @@ random_notes = [
     "Shipping delayed due to weather",
     "Customer feedback received",
     "Training session scheduled",
-    "Documentation needs update"
+    "Documentation needs update",
 ]
 
-# Generate messy data
-num_samples = 100
-raw_data = []
-start_date = datetime(2023, 1, 1)
-
-for i in range(num_samples):
-    row = {}
-    
-    # Add random date
-    row['entry_date'] = (start_date + timedelta(days=random.randint(0, 365))).strftime('%Y-%m-%d')
-    
-    # Add random ID
-    row['entry_id'] = f"LOG_{random.randint(1000, 9999)}"
-    
-    # Add random department
-    row['department'] = random.choice(['Inventory', 'Maintenance', 'Sales', 'Quality Control', 'Shipping'])
-    
-    # Add random priority
-    row['priority'] = random.choice(['Low', 'Medium', 'High', 'Urgent'])
-    
-    # Add random status
-    row['status'] = random.choice(['Pending', 'In Progress', 'Completed', 'On Hold'])
-    
-    # Decide if this row contains valve information (70% chance)
-    if random.random() < 0.7:
-        # Generate valve data
-        valve_type = random.choice(['butterfly', 'gate', 'check', 'ball', 'globe', 'control'])
-        manufacturer = random.choice(['ValveTech', 'ValveTech Industries', 'FlowControl Inc', 'FlowMaster', 'ValveWorks', 'PrecisionFlow Systems'])
-        material = random.choice(['Stainless Steel 316', 'Carbon Steel', 'Bronze', 'Stainless Steel 304', 'Cast Iron', 'Titanium'])
-        
-        prefix = {'butterfly': 'BF', 'gate': 'GV', 'check': 'CV', 'ball': 'BV', 'globe': 'GB', 'control': 'CT'}
-        serial_id = f"{prefix[valve_type]}-{random.randint(2020,2024)}-{random.choice(['A','B','C','X','Y','Z'])}{random.randint(100,999)}"
-        
-        width = round(random.uniform(4.0, 15.0), 1)
-        height = round(random.uniform(3.0, 16.0), 1)
-        pressure = random.choice([75, 150, 250, 300, 500, 750, 1000])
-        pressure_rating = f"{pressure} PSI"
-        
-        # Create description
-        template = random.choice(templates)
-        extra = random.choice(extra_details)
-        description = template.format(
-            valve_type=valve_type,
-            manufacturer=manufacturer,
-            serial_id=serial_id,
-            material=material,
-            width=width,
-            height=height,
-            pressure_rating=pressure_rating,
-            extra=extra
-        )
-    else:
-        # Add random note instead of valve information
-        description = random.choice(random_notes)
-    
-    # Add notes/description to random column name
-    note_column = random.choice(['notes', 'description', 'comments', 'details', 'log_entry'])
-    row[note_column] = description
-    
-    # Add random additional columns
-    row['last_modified_by'] = f"USER_{random.randint(100, 999)}"
-    row['location'] = random.choice(['Warehouse A', 'Warehouse B', 'Main Office', 'Production Floor', 'Quality Lab'])
-    row['follow_up'] = random.choice(['Yes', 'No', 'N/A'])
-    
-    raw_data.append(row)
-
-# Create DataFrame with randomly ordered columns
-df = pd.DataFrame(raw_data)
-columns = list(df.columns)
-random.shuffle(columns)
-df = df[columns]
-
-# Save to Excel
-df.to_excel('messy_valve_data.xlsx', index=False)
-
-print("Generated 'messy_valve_data.xlsx' with unstructured data")
-print("- Contains mix of valve descriptions and random notes")
-print("- Random column ordering")
-print("- Multiple possible column names for descriptions")
-print("- Added noise and irrelevant information") 
\ No newline at end of file
+VALVE_TYPES = ['butterfly', 'gate', 'check', 'ball', 'globe', 'control']
+TYPE_PREFIXES = {valve_type: prefix for prefix, valve_type in SERIAL_PREFIX_TYPES.items()}
+MANUFACTURERS = ['ValveTech', 'ValveTech Industries', 'FlowControl Inc', 'FlowMaster', 'ValveWorks', 'PrecisionFlow Systems']
+MATERIALS = ['Stainless Steel 316', 'Carbon Steel', 'Bronze', 'Stainless Steel 304', 'Cast Iron', 'Titanium']
+SERIAL_LETTERS = ['A', 'B', 'C', 'X', 'Y', 'Z']
+SERIAL_YEARS = np.arange(2020, 2025)
+SERIAL_NUMBERS = (100_000, 1_000_000)  # Numeric part, widened so serials can be unique in large corpora
+SERIAL_SPACE = len(SERIAL_YEARS) * len(SERIAL_LETTERS) * (SERIAL_NUMBERS[1] - SERIAL_NUMBERS[0])
+PRESSURES = [75, 150, 250, 300, 500, 750, 1000]  # PSI
+
+DEPARTMENTS = ['Inventory', 'Maintenance', 'Sales', 'Quality Control', 'Shipping']
+PRIORITIES = ['Low', 'Medium', 'High', 'Urgent']
+STATUSES = ['Pending', 'In Progress', 'Completed', 'On Hold']
+LOCATIONS = ['Warehouse A', 'Warehouse B', 'Main Office', 'Production Floor', 'Quality Lab']
+FOLLOW_UPS = ['Yes', 'No', 'N/A']
+NOTE_COLUMNS = ['notes', 'description', 'comments', 'details', 'log_entry']  # One per row holds the text
+COLUMNS = ['entry_date', 'entry_id', 'department', 'priority', 'status',
+           *NOTE_COLUMNS, 'last_modified_by', 'location', 'follow_up']
+
+START_DATE = np.datetime64('2023-01-01')
+DEFAULT_ROWS = 100
+DEFAULT_NOISE = 0.3  # Fraction of rows with a random note instead of a valve
+DEFAULT_DUPLICATES = 0.0  # Fraction of valve rows that mention an earlier valve again
+BLOCK_ROWS = 50_000  # Rows generated and written at a time
+EXCEL_MAX_ROWS = 1_048_575  # Data rows that fit in a worksheet under the header
+OUTPUT_FORMATS = ('xlsx', 'csv', 'parquet')
+TRUTH_SUFFIX = '.truth.jsonl'
+VALVE_FIELDS = list(ValveSpecification.model_fields)
+
+def template_fields(template: str) -> List[str]:
+    """Names of the placeholders in a template"""
+    return [field for _, field, _, _ in string.Formatter().parse(template) if field]
+
+def fill_template(template: str, values: Dict[str, np.ndarray], size: int) -> np.ndarray:
+    """template.format() over whole columns, concatenating object arrays element-wise"""
+    text = np.full(size, '', dtype=object)
+    for literal, field, _, _ in string.Formatter().parse(template):
+        if literal:
+            text = text + literal
+        if field:
+            text = text + values[field]
+    return text
+
+class CorpusGenerator:
+    """Generates blocks of messy log rows and the valves they mention.
+
+    Each row is a valve description (filled in from one of the templates,
+    picked with template_weights) or, with probability noise, a random
+    note. With probability duplicates a valve row mentions a valve that an
+    earlier row of the same block already described, through a freshly
+    drawn template, so dedup and merging have something to do. Serials
+    never repeat within a corpus otherwise, so every shared serial is a
+    deliberate duplicate. The same seed always yields the same corpus.
+    """
+    def __init__(self, seed: Optional[int] = None, noise: float = DEFAULT_NOISE,
+                 duplicates: float = DEFAULT_DUPLICATES, template_weights: Optional[Sequence[float]] = None):
+        if not 0 <= noise <= 1 or not 0 <= duplicates <= 1:
+            raise ValueError("noise and duplicates must be between 0 and 1")
+        weights = np.asarray(template_weights if template_weights is not None else [1.0] * len(TEMPLATES), float)
+        if len(weights) != len(TEMPLATES) or (weights < 0).any() or weights.sum() <= 0:
+            raise ValueError(f"template_weights needs {len(TEMPLATES)} non-negative weights with a positive sum")
+        self.rng = np.random.default_rng(seed)
+        self.noise = noise
+        self.duplicates = duplicates
+        self.template_weights = weights / weights.sum()
+        # Serials walk an affine permutation of the serial space: random-looking, never repeating
+        self.serial_step = int(self.rng.integers(1, SERIAL_SPACE))
+        while math.gcd(self.serial_step, SERIAL_SPACE) != 1:
+            self.serial_step = int(self.rng.integers(1, SERIAL_SPACE))
+        self.serial_offset = int(self.rng.integers(0, SERIAL_SPACE))
+        self.serials_issued = 0
+        # Columns are shuffled once per corpus, like a sheet exported from some other tool
+        self.columns = [COLUMNS[i] for i in self.rng.permutation(len(COLUMNS))]
+
+    def _choice(self, options: Sequence, size: int) -> np.ndarray:
+        return np.asarray(options, dtype=object)[self.rng.integers(0, len(options), size)]
+
+    def _serials(self, size: int) -> np.ndarray:
+        """The next size distinct 'YYYY-L######' serial bodies of the corpus"""
+        if self.serials_issued + size > SERIAL_SPACE:
+            raise ValueError(f"a corpus can hold at most {SERIAL_SPACE} distinct valves")
+        issued = np.arange(self.serials_issued, self.serials_issued + size, dtype=np.int64)
+        self.serials_issued += size
+        code = (issued * self.serial_step + self.serial_offset) % SERIAL_SPACE
+        code, number = np.divmod(code, SERIAL_NUMBERS[1] - SERIAL_NUMBERS[0])
+        year, letter = np.divmod(code, len(SERIAL_LETTERS))
+        return (SERIAL_YEARS[year].astype(str).astype(object) + '-'
+                + np.asarray(SERIAL_LETTERS, dtype=object)[letter]
+                + (number + SERIAL_NUMBERS[0]).astype(str).astype(object))
+
+    def _valves(self, size: int) -> Dict[str, np.ndarray]:
+        """Columns of size random valves; width and height are floats, the rest strings"""
+        rng = self.rng
+        type_index = rng.integers(0, len(VALVE_TYPES), size)
+        prefix = np.asarray([TYPE_PREFIXES[valve_type] for valve_type in VALVE_TYPES], dtype=object)[type_index]
+        return {
+            'valve_type': np.asarray(VALVE_TYPES, dtype=object)[type_index],
+            'serial_id': prefix + '-' + self._serials(size),
+            'manufacturer': self._choice(MANUFACTURERS, size),
+            'material': self._choice(MATERIALS, size),
+            'width': np.round(rng.uniform(4.0, 15.0, size), 1),
+            'height': np.round(rng.uniform(3.0, 16.0, size), 1),
+            'pressure_rating': self._choice([f"{pressure} PSI" for pressure in PRESSURES], size),
+        }
+
+    def _duplicate_sources(self, size: int) -> np.ndarray:
+        """For each valve row, the valve row whose valve it mentions (itself unless a duplicate)"""
+        source = np.arange(size)
+        duplicate = self.rng.random(size) < self.duplicates
+        originals = np.flatnonzero(~duplicate)
+        # A duplicate points at a random original before it; one with none before it stays original
+        earlier = np.searchsorted(originals, source)
+        duplicate &= earlier > 0
+        picks = np.floor(self.rng.random(size) * earlier).astype(int)
+        source[duplicate] = originals[picks[duplicate]]
+        return source
+
+    def block(self, size: int, first_row: int = 0) -> Tuple[pd.DataFrame, List[Dict]]:
+        """size rows numbered from first_row, and one ground truth record per valve mention"""
+        rng = self.rng
+        is_valve = rng.random(size) >= self.noise
+        valve_rows = np.flatnonzero(is_valve)
+        count = len(valve_rows)
+        source = self._duplicate_sources(count)
+        valves = {field: column[source] for field, column in self._valves(count).items()}
+        template_index = rng.choice(len(TEMPLATES), count, p=self.template_weights)
+
+        # Descriptions are built template by template over the rows that use it
+        text = self._choice(RANDOM_NOTES, size)
+        values = {
+            **valves,
+            'width': np.char.mod('%.1f', valves['width']).astype(object),
+            'height': np.char.mod('%.1f', valves['height']).astype(object),
+            'extra': self._choice(EXTRA_DETAILS, count),
+        }
+        for index, template in enumerate(TEMPLATES):
+            mask = template_index == index
+            if mask.any():
+                text[valve_rows[mask]] = fill_template(
+                    template, {field: column[mask] for field, column in values.items()}, int(mask.sum()))
+
+        data = {
+            'entry_date': (START_DATE + rng.integers(0, 366, size)).astype(str).astype(object),
+            'entry_id': 'LOG_' + rng.integers(1000, 10000, size).astype(str).astype(object),
+            'department': self._choice(DEPARTMENTS, size),
+            'priority': self._choice(PRIORITIES, size),
+            'status': self._choice(STATUSES, size),
+            'last_modified_by': 'USER_' + rng.integers(100, 1000, size).astype(str).astype(object),
+            'location': self._choice(LOCATIONS, size),
+            'follow_up': self._choice(FOLLOW_UPS, size),
+        }
+        # The text lands in one of several columns; the others stay empty
+        note_column = rng.integers(0, len(NOTE_COLUMNS), size)
+        for index, column in enumerate(NOTE_COLUMNS):
+            data[column] = np.where(note_column == index, text, None)
+        frame = pd.DataFrame({column: data[column] for column in self.columns},
+                             index=pd.RangeIndex(first_row, first_row + size))
+
+        # Ground truth holds only the fields the row's template actually mentions
+        mentioned = [set(template_fields(template)) for template in TEMPLATES]
+        truth = []
+        for position in range(count):
+            fields = mentioned[template_index[position]]
+            truth.append({
+                'row': first_row + int(valve_rows[position]),
+                'duplicate': bool(source[position] != position),
+                **{field: (valves[field][position].item() if isinstance(valves[field][position], np.generic)
+                           else valves[field][position]) if field in fields else None
+                   for field in VALVE_FIELDS},
+            })
+        return frame, truth
+
+    def generate(self, rows: int, block_rows: int = BLOCK_ROWS) -> Iterator[Tuple[pd.DataFrame, List[Dict]]]:
+        """Blocks of at most block_rows rows, rows numbered from 0 as in pd.read_excel"""
+        for first_row in range(0, rows, block_rows):
+            yield self.block(min(block_rows, rows - first_row), first_row)
+
+class CorpusWriter:
+    """Streams row blocks to .xlsx (write-only openpyxl), .csv or .parquet"""
+    def __init__(self, path: str, format: str, columns: Sequence[str]):
+        self.path = path
+        self.format = format
+        self.columns = list(columns)
+        self._workbook: Optional[Workbook] = None
+        self._file: Optional[IO[str]] = None
+        self._parquet = None
+        if format == 'xlsx':
+            self._workbook = Workbook(write_only=True)
+            self._sheet = self._workbook.create_sheet('Sheet1')
+            self._sheet.append(self.columns)
+        elif format == 'csv':
+            self._file = open(path, 'w', encoding='utf-8', newline='')
+            self._writer = csv.writer(self._file)
+            self._writer.writerow(self.columns)
+        elif format == 'parquet':
+            try:
+                import pyarrow as pa
+                import pyarrow.parquet as pq
+            except ImportError:
+                raise RuntimeError("Parquet output needs pyarrow (pip install pyarrow)")
+            self._schema = pa.schema([(column, pa.string()) for column in self.columns])
+            self._parquet = pq.ParquetWriter(path, self._schema)
+        else:
+            raise ValueError(f"Unknown format: {format}")
+
+    def write(self, frame: pd.DataFrame):
+        if self._workbook is not None:
+            for values in frame.itertuples(index=False, name=None):
+                self._sheet.append(values)
+        elif self._file is not None:
+            self._writer.writerows(frame.itertuples(index=False, name=None))
+        else:
+            import pyarrow as pa
+            self._parquet.write_table(pa.Table.from_pandas(frame, self._schema, preserve_index=False))
+
+    def close(self):
+        if self._workbook is not None:
+            self._workbook.save(self.path)
+            self._workbook = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self._parquet is not None:
+            self._parquet.close()
+            self._parquet = None
+
+def output_format(path: str, format: Optional[str]) -> str:
+    """Explicit format, or the one implied by the output file's extension"""
+    if format:
+        return format
+    extension = path.rsplit('.', 1)[-1].lower()
+    if extension not in OUTPUT_FORMATS:
+        raise ValueError(f"Cannot tell the format of {path}; pass --format ({', '.join(OUTPUT_FORMATS)})")
+    return extension
+
+def template_weights(value: str) -> List[float]:
+    """argparse type for comma-separated template weights"""
+    try:
+        return [float(weight) for weight in value.split(',')]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected {len(TEMPLATES)} comma-separated numbers, got {value!r}")
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Generate a synthetic messy valve log with ground truth")
+    parser.add_argument('-n', '--rows', type=int, default=DEFAULT_ROWS, help=f"Rows to generate (default: {DEFAULT_ROWS})")
+    parser.add_argument('-o', '--output', default='messy_valve_data.xlsx',
+                        help="Output file (default: messy_valve_data.xlsx)")
+    parser.add_argument('-f', '--format', choices=OUTPUT_FORMATS, default=None,
+                        help="Output format (default: from the output file's extension)")
+    parser.add_argument('--truth', default=None,
+                        help=f"Ground truth JSONL, one record per valve mention (default: output + {TRUTH_SUFFIX})")
+    parser.add_argument('--seed', type=int, default=0, help="Random seed; the same seed gives the same corpus (default: 0)")
+    parser.add_argument('--noise', type=float, default=DEFAULT_NOISE,
+                        help=f"Fraction of rows that are random notes instead of valves (default: {DEFAULT_NOISE})")
+    parser.add_argument('--duplicates', type=float, default=DEFAULT_DUPLICATES,
+                        help=f"Fraction of valve rows that mention an earlier valve again (default: {DEFAULT_DUPLICATES})")
+    parser.add_argument('--template-weights', type=template_weights, default=None,
+                        help=f"Relative frequency of each of the {len(TEMPLATES)} description templates, "
+                             f"comma-separated (default: equal)")
+    parser.add_argument('--block-rows', type=int, default=BLOCK_ROWS,
+                        help=f"Rows generated and written at a time (default: {BLOCK_ROWS})")
+    return parser
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    try:
+        format = output_format(args.output, args.format)
+        generator = CorpusGenerator(args.seed, args.noise, args.duplicates, args.template_weights)
+    except ValueError as e:
+        print(f"Error: {str(e)}", file=sys.stderr)
+        return 1
+    if format == 'xlsx' and args.rows > EXCEL_MAX_ROWS:
+        print(f"Error: a worksheet holds at most {EXCEL_MAX_ROWS} rows; use --format csv or parquet",
+              file=sys.stderr)
+        return 1
+
+    truth_path = args.truth or args.output + TRUTH_SUFFIX
+    try:
+        writer = CorpusWriter(args.output, format, generator.columns)
+    except RuntimeError as e:
+        print(f"Error: {str(e)}", file=sys.stderr)
+        return 1
+    valves = duplicates = 0
+    with open(truth_path, 'w', encoding='utf-8') as truth_file:
+        try:
+            for frame, truth in generator.generate(args.rows, max(1, args.block_rows)):
+                writer.write(frame)
+                truth_file.writelines(json.dumps(record) + '\n' for record in truth)
+                valves += len(truth)
+                duplicates += sum(record['duplicate'] for record in truth)
+        finally:
+            writer.close()
+
+    print(f"Generated '{args.output}' with {args.rows} rows of unstructured data")
+    print(f"- {valves} valve mentions ({duplicates} repeat an earlier valve), {args.rows - valves} random notes")
+    print(f"- Ground truth in '{truth_path}'")
+    print("- Random column ordering, multiple possible column names for descriptions")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,189 @@
+"""Qt-free valve extraction core shared by the GUI and its worker threads"""
+import time
+import asyncio
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple, Type
+import ollama
+from pydantic import BaseModel, Field
+from extraction_cache import ExtractionCache
+from row_chunker import RowChunk, ROW_SEPARATOR
+from stage_timer import stage, record
+
+class ValveSpecification(BaseModel):
+    valve_type: str = Field(description="Type of the valve (e.g., ball valve, gate valve, etc.)")
+    serial_id: str = Field(description="Unique identifier for the valve")
+    width: Optional[float] = Field(None, description="Width of the valve in millimeters")
+    height: Optional[float] = Field(None, description="Height of the valve in millimeters")
+    pressure_rating: Optional[str] = Field(None, description="Pressure rating of the valve")
+    material: Optional[str] = Field(None, description="Material of the valve construction")
+    manufacturer: Optional[str] = Field(None, description="Manufacturer of the valve")
+
+class ValveList(BaseModel):
+    valves: List[ValveSpecification] = Field(description="List of valve specifications extracted from the text")
+
+# Fixed instructions go first, as a system message, and the chunk follows as the user
+# message: every request then shares the same prefix, which Ollama's prompt cache can
+# reuse instead of evaluating it again for each chunk.
+SYSTEM_PROMPT = """Extract valve specifications from the text the user sends. Return the data in a structured format.
+Focus on identifying valve types, serial numbers, dimensions, pressure ratings, materials, and manufacturers.
+Return as JSON matching the specified schema."""
+
+# Batched mode: each line of the chunk is one source row tagged with its ID (see
+# row_chunker.tag_rows), and the reply groups the valves by the row they came from.
+BATCH_SYSTEM_PROMPT = """Extract valve specifications from the rows the user sends. Each line is one row and starts with its row ID in square brackets.
+Focus on identifying valve types, serial numbers, dimensions, pressure ratings, materials, and manufacturers.
+Return as JSON matching the specified schema, with one entry per row that mentions a valve: its row ID and the valves found in that row."""
+
+class RowValves(BaseModel):
+    row_id: int = Field(description="ID of the row, from the square brackets at the start of its line")
+    valves: List[ValveSpecification] = Field(description="Valve specifications extracted from this row")
+
+class RowValvesList(BaseModel):
+    rows: List[RowValves] = Field(description="Valves grouped by the row they were extracted from")
+
+CHAT_OPTIONS = {'temperature': 0}  # More deterministic output
+
+ResponseObserver = Callable[[str, Any], None]
+RowResults = Dict[int, List[ValveSpecification]]  # Source row index -> valves, in row order
+UNATTRIBUTED_ROW = -1  # RowResults key of valves that no row of their chunk could be found for
+
+class ChunkRequest(NamedTuple):
+    """Chat request for one chunk and the cache key its result is stored under"""
+    prompt: str
+    chat_kwargs: Dict[str, Any]
+    key: Optional[str]
+    result_model: Type[BaseModel]
+
+def prepare_chunk(chunk: str, model: str, cache: Optional[ExtractionCache] = None, model_digest: str = "",
+                  options: Optional[Dict[str, Any]] = None, result_model: Type[BaseModel] = ValveList,
+                  system_prompt: str = SYSTEM_PROMPT) -> Tuple[ChunkRequest, Optional[BaseModel]]:
+    """Build the chat request for a chunk; the result is returned too when the cache has it"""
+    with stage('prepare'):
+        prompt = system_prompt + "\n" + chunk
+        schema = result_model.model_json_schema()
+        chat_options = {**CHAT_OPTIONS, **(options or {})}
+        chat_kwargs = {
+            'messages': [
+                {'role': 'system', 'content': system_prompt},
+                {'role': 'user', 'content': chunk},
+            ],
+            'model': model,
+            'format': schema,
+            'options': chat_options,
+        }
+        request = ChunkRequest(prompt, chat_kwargs, None, result_model)
+        cached = None
+        if cache is not None:
+            request = request._replace(key=cache.make_key(model, model_digest, system_prompt, schema, chunk,
+                                                          chat_options))
+            cached = cache.get(request.key)
+    if cached is not None:
+        with stage('validate'):
+            return request, result_model.model_validate_json(cached)
+    return request, None
+
+def complete_chunk(request: ChunkRequest, response: Any, cache: Optional[ExtractionCache] = None,
+                   on_response: Optional[ResponseObserver] = None) -> BaseModel:
+    """Validate a chat response and store it in the cache"""
+    if on_response is not None:
+        on_response(request.prompt, response)
+    with stage('validate'):
+        result = request.result_model.model_validate_json(response.message.content)
+    if request.key is not None:
+        cache.put(request.key, result.model_dump_json())
+    return result
+
+async def _timed_chat(client: Any, request: ChunkRequest) -> Any:
+    # Awaits interleave on the event loop thread, so the span is recorded rather than nested
+    start = time.perf_counter()
+    try:
+        return await client.chat(**request.chat_kwargs)
+    finally:
+        record('llm', time.perf_counter() - start)
+
+async def _off_loop(cache: Optional[ExtractionCache], func: Callable, *args) -> Any:
+    # Cache lookups and writes are blocking SQLite calls, so with a cache they run in a worker thread
+    if cache is None:
+        return func(*args)
+    return await asyncio.to_thread(func, *args)
+
+def process_chunk(chunk: str, model: str, cache: Optional[ExtractionCache] = None,
+                  model_digest: str = "", options: Optional[Dict[str, Any]] = None,
+                  on_response: Optional[ResponseObserver] = None,
+                  client: Optional[Any] = None) -> List[ValveSpecification]:
+    """Process a single chunk of text using Ollama's structured output.
+
+    Safe to call from worker threads: errors are raised to the caller
+    instead of being written to any widget. When a cache is given, results
+    are looked up by content hash first and stored after validation.
+    options are merged over CHAT_OPTIONS; on_response is called with the
+    prompt and the raw response of every request that reaches the model.
+    client is anything with ollama.Client's chat(), such as an
+    EndpointPool; the ollama module's default client is used without one.
+    """
+    request, result = prepare_chunk(chunk, model, cache, model_digest, options)
+    if result is None:
+        # Make the API call with structured output format
+        with stage('llm'):
+            response = (client or ollama).chat(**request.chat_kwargs)
+        result = complete_chunk(request, response, cache, on_response)
+    return result.valves
+
+async def process_chunk_async(chunk: str, model: str, client: Any, cache: Optional[ExtractionCache] = None,
+                              model_digest: str = "", options: Optional[Dict[str, Any]] = None,
+                              on_response: Optional[ResponseObserver] = None) -> List[ValveSpecification]:
+    """process_chunk for asyncio; client needs an awaitable chat(), like ollama.AsyncClient"""
+    request, result = await _off_loop(cache, prepare_chunk, chunk, model, cache, model_digest, options)
+    if result is None:
+        response = await _timed_chat(client, request)
+        result = await _off_loop(cache, complete_chunk, request, response, cache, on_response)
+    return result.valves
+
+def scatter_rows(result: RowValvesList, chunk: RowChunk) -> RowResults:
+    """Map grouped valves back to the chunk's source rows.
+
+    Groups whose row ID is not in the chunk are attributed to the row whose
+    text contains the valve's serial ID. Valves no row mentions belong to
+    the chunk as a whole and come last, under UNATTRIBUTED_ROW.
+    """
+    rows: RowResults = {index: [] for index in chunk.row_indices}
+    lines = None
+    for group in result.rows:
+        if group.row_id in rows:
+            rows[group.row_id].extend(group.valves)
+            continue
+        if lines is None:
+            lines = dict(zip(chunk.row_indices, chunk.text.split(ROW_SEPARATOR)))
+        for valve in group.valves:
+            owner = next((index for index, line in lines.items() if valve.serial_id and valve.serial_id in line),
+                         UNATTRIBUTED_ROW)
+            rows.setdefault(owner, []).append(valve)
+    return {index: valves for index, valves in rows.items() if valves}
+
+def process_row_chunk(chunk: RowChunk, model: str, cache: Optional[ExtractionCache] = None,
+                      model_digest: str = "", options: Optional[Dict[str, Any]] = None,
+                      on_response: Optional[ResponseObserver] = None,
+                      client: Optional[Any] = None) -> RowResults:
+    """Batched process_chunk: one request for a chunk of ID-tagged rows, valves returned per row.
+
+    The chunk must come from row_chunker.tag_rows, so each line is one row
+    prefixed with its ID. The instructions and schema are sent once for
+    all rows of the chunk instead of once per row.
+    """
+    request, result = prepare_chunk(chunk.text, model, cache, model_digest, options,
+                                    RowValvesList, BATCH_SYSTEM_PROMPT)
+    if result is None:
+        with stage('llm'):
+            response = (client or ollama).chat(**request.chat_kwargs)
+        result = complete_chunk(request, response, cache, on_response)
+    return scatter_rows(result, chunk)
+
+async def process_row_chunk_async(chunk: RowChunk, model: str, client: Any, cache: Optional[ExtractionCache] = None,
+                                  model_digest: str = "", options: Optional[Dict[str, Any]] = None,
+                                  on_response: Optional[ResponseObserver] = None) -> RowResults:
+    """process_row_chunk for asyncio"""
+    request, result = await _off_loop(cache, prepare_chunk, chunk.text, model, cache, model_digest, options,
+                                      RowValvesList, BATCH_SYSTEM_PROMPT)
+    if result is None:
+        response = await _timed_chat(client, request)
+        result = await _off_loop(cache, complete_chunk, request, response, cache, on_response)
+    return scatter_rows(result, chunk)
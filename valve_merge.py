@@ -0,0 +1,148 @@
+"""Field-level merge engine for deduplicating valves across chunks and sightings"""
+import re
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+from stage_timer import stage
+from valve_extraction import ValveSpecification
+
+CONFLICT_POLICIES = ('first', 'last', 'most_common')
+DEFAULT_POLICY = 'first'
+MAX_ORIGINS = 20  # Sighting origins kept per valve for provenance; the count is always exact
+
+MERGE_FIELDS = [field for field in ValveSpecification.model_fields if field != 'serial_id']
+
+def normalize_serial(serial_id: str) -> str:
+    """Key used to match sightings of the same valve: case and separators are ignored"""
+    return re.sub(r'[^0-9A-Z]', '', serial_id.upper())
+
+class MergedValve:
+    """Accumulated state of one valve across all of its sightings"""
+    __slots__ = ('serial_id', 'values', 'field_origins', 'origins', 'sightings', 'conflicts', 'counts')
+
+    def __init__(self, serial_id: str):
+        self.serial_id = serial_id
+        self.values: Dict[str, Any] = {}
+        self.field_origins: Dict[str, Any] = {}
+        self.origins: List[Any] = []
+        self.sightings = 0
+        self.conflicts: Dict[str, int] = {}
+        self.counts: Optional[Dict[str, Dict[Any, List]]] = None  # Field -> value -> [count, first origin]
+
+    def to_valve(self) -> ValveSpecification:
+        return ValveSpecification(serial_id=self.serial_id, **self.values)
+
+    def provenance(self) -> Dict[str, Any]:
+        return {
+            'sightings': self.sightings,
+            'origins': list(self.origins),
+            'fields': dict(self.field_origins),
+            'conflicts': dict(self.conflicts),
+        }
+
+class ValveMerger:
+    """Merges valve sightings keyed by a hash index on normalized serial IDs.
+
+    Each sighting fills fields that are still null; when two sightings
+    disagree on a non-null value the conflict policy decides:
+    'first' keeps the earliest value, 'last' takes the latest, and
+    'most_common' keeps the value seen most often (earliest on ties).
+    The displayed serial ID is the first sighting's, as written. Each
+    sighting is O(fields), so merging scales linearly with the input.
+    With track_changes, changed() lists the valves that are new or took a
+    new value since it was last called, so results can be streamed out
+    while the merge is still running.
+    """
+    def __init__(self, policy: str = DEFAULT_POLICY, track_changes: bool = False):
+        if policy not in CONFLICT_POLICIES:
+            raise ValueError(f"Unknown conflict policy '{policy}', expected one of {', '.join(CONFLICT_POLICIES)}")
+        self.policy = policy
+        self.track_changes = track_changes
+        self._index: Dict[str, MergedValve] = {}
+        self._changed: Dict[str, MergedValve] = {}  # Insertion-ordered set of records changed since changed()
+        self.sightings = 0
+        self.conflicts = 0
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def add(self, valves: Optional[Iterable[ValveSpecification]], origin: Any = None) -> List[str]:
+        """Merge a batch of sightings; returns the keys of valves seen for the first time"""
+        new_keys = []
+        with stage('dedup'):
+            for valve in valves or []:
+                key = normalize_serial(valve.serial_id)
+                if not key:
+                    continue
+                record = self._index.get(key)
+                if record is None:
+                    # The normalized key only matches sightings; the serial is kept as first written
+                    record = MergedValve(valve.serial_id.strip())
+                    if self.policy == 'most_common':
+                        record.counts = {}
+                    self._index[key] = record
+                    new_keys.append(key)
+                    if self.track_changes:
+                        self._changed[key] = record
+                if self._merge(record, valve, origin) and self.track_changes:
+                    self._changed[key] = record
+        return new_keys
+
+    def _merge(self, record: MergedValve, valve: ValveSpecification, origin: Any) -> bool:
+        """Fold one sighting into record; True if any field value changed"""
+        changed = False
+        self.sightings += 1
+        record.sightings += 1
+        if len(record.origins) < MAX_ORIGINS:
+            record.origins.append(origin)
+
+        for field in MERGE_FIELDS:
+            value = getattr(valve, field)
+            if value is None:
+                continue
+            if record.counts is not None:
+                record.counts.setdefault(field, {}).setdefault(value, [0, origin])[0] += 1
+
+            current = record.values.get(field)
+            if current is None:
+                record.values[field] = value
+                record.field_origins[field] = origin
+                changed = True
+                continue
+            if current == value:
+                continue
+
+            self.conflicts += 1
+            record.conflicts[field] = record.conflicts.get(field, 0) + 1
+            if self.policy == 'last':
+                record.values[field] = value
+                record.field_origins[field] = origin
+                changed = True
+            elif self.policy == 'most_common':
+                # Dicts preserve insertion order, so ties resolve to the earliest value
+                best, (_, best_origin) = max(record.counts[field].items(), key=lambda item: item[1][0])
+                if best != current:
+                    record.values[field] = best
+                    record.field_origins[field] = best_origin
+                    changed = True
+        return changed
+
+    def get(self, serial_id: str) -> Optional[MergedValve]:
+        return self._index.get(normalize_serial(serial_id))
+
+    def changed(self) -> List[MergedValve]:
+        """Records that are new or changed since the last call, in the order they first changed"""
+        records = list(self._changed.values())
+        self._changed = {}
+        return records
+
+    def records(self) -> Iterator[MergedValve]:
+        """Merged records in the order their valves were first seen"""
+        return iter(self._index.values())
+
+    def valves(self) -> Iterator[ValveSpecification]:
+        """Merged valves in the order they were first seen"""
+        for record in self._index.values():
+            yield record.to_valve()
+
+    def summary(self) -> str:
+        return (f"Merged {self.sightings} sightings into {len(self._index)} valves "
+                f"({self.conflicts} field conflicts resolved by '{self.policy}')")
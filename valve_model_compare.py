@@ -0,0 +1,304 @@
+"""Compare models on one labelled corpus: throughput against per-field extraction accuracy.
+
+Runs the same workbook through each model with the batch pipeline,
+scores the merged valves against the ground truth written by
+valve_data_sample.py and reports the cost/quality frontier, e.g.:
+
+    python valve_data_sample.py -n 5000 -o labelled.xlsx
+    python valve_model_compare.py labelled.xlsx --models llama3.1,qwen2.5:7b,phi3 --min-f1 0.9 -o frontier.json
+    python valve_model_compare.py labelled.xlsx --mock-model fast:800:0.7 --mock-model slow:100:1.0
+"""
+import os
+import re
+import sys
+import json
+import time
+import argparse
+import threading
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence
+from async_pipeline import AsyncExtractor
+from chunk_budget import ChunkBudget
+from mock_ollama import GroundTruth, MockOllama, model_profile, start_mock_server
+from model_session import ModelSession
+from ollama_pool import EndpointPool, HOSTS_ENV, configured_hosts
+from valve_batch import process_file, build_parser as build_batch_parser
+from valve_data_sample import TRUTH_SUFFIX
+from valve_extraction import ValveSpecification
+from valve_merge import normalize_serial
+from valve_pipeline import EXCEL_EXTENSIONS, extract_chunks
+
+DEFAULT_MIN_F1 = 0.9  # Accuracy bar a model must meet to be recommended
+FIELDS = list(ValveSpecification.model_fields)
+VALUE_FIELDS = [field for field in FIELDS if field != 'serial_id']  # Scored per valve found
+RELATIVE_TOLERANCE = 0.01  # Dimensions within 1% count as equal
+MM_PER_INCH = 25.4  # The corpus states inches; the schema asks for millimeters, so accept either
+
+def _normalize_text(field: str, value: Any) -> str:
+    text = re.sub(r'\s+', ' ', str(value)).strip().casefold()
+    if field == 'valve_type':
+        text = re.sub(r'\s*valves?$', '', text)
+    elif field == 'pressure_rating':
+        text = text.replace(' ', '')
+    return text
+
+def values_match(field: str, predicted: Any, truth: Any) -> bool:
+    """Whether a predicted field value counts as the true one"""
+    if field in ('width', 'height'):
+        try:
+            predicted, truth = float(predicted), float(truth)
+        except (TypeError, ValueError):
+            return False
+        return any(abs(predicted - candidate) <= RELATIVE_TOLERANCE * abs(candidate)
+                   for candidate in (truth, truth * MM_PER_INCH))
+    if field == 'serial_id':
+        return normalize_serial(str(predicted)) == normalize_serial(str(truth))
+    return _normalize_text(field, predicted) == _normalize_text(field, truth)
+
+def score(predicted: Sequence[ValveSpecification], truth: Dict[str, Dict[str, Any]]) -> Dict[str, Dict[str, float]]:
+    """Per-field precision, recall and F1 of merged valves against ground truth valves by serial.
+
+    A field is a true positive when the valve exists in the truth and the
+    value matches, a false positive when a value is reported that the truth
+    lacks or disagrees with, and a false negative when a true value is
+    missing or wrong. For serial_id the unit is the valve itself.
+    """
+    truth_by_key = {normalize_serial(serial): valve for serial, valve in truth.items()}
+    counts = {field: {'tp': 0, 'fp': 0, 'fn': 0} for field in FIELDS}
+    seen = set()
+    for valve in predicted:
+        key = normalize_serial(valve.serial_id)
+        if key in seen:
+            continue
+        seen.add(key)
+        expected = truth_by_key.get(key)
+        counts['serial_id']['tp' if expected is not None else 'fp'] += 1
+        for field in VALUE_FIELDS:
+            value = getattr(valve, field)
+            true_value = expected.get(field) if expected is not None else None
+            if value is not None and true_value is not None and values_match(field, value, true_value):
+                counts[field]['tp'] += 1
+                continue
+            if value is not None:
+                counts[field]['fp'] += 1
+            if true_value is not None:
+                counts[field]['fn'] += 1
+    for key, expected in truth_by_key.items():
+        if key in seen:
+            continue
+        counts['serial_id']['fn'] += 1
+        for field in VALUE_FIELDS:
+            if expected.get(field) is not None:
+                counts[field]['fn'] += 1
+
+    scores = {}
+    for field, count in counts.items():
+        precision = count['tp'] / (count['tp'] + count['fp']) if count['tp'] + count['fp'] else 0.0
+        recall = count['tp'] / (count['tp'] + count['fn']) if count['tp'] + count['fn'] else 0.0
+        f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+        scores[field] = {**count, 'precision': precision, 'recall': recall, 'f1': f1}
+    return scores
+
+class TokenMeter:
+    """Sums Ollama's eval_count/eval_duration (and the prompt equivalents) over responses"""
+    FIELDS = ('prompt_eval_count', 'prompt_eval_duration', 'eval_count', 'eval_duration')
+
+    def __init__(self):
+        self.totals = {name: 0 for name in self.FIELDS}
+        self.responses = 0
+        self._lock = threading.Lock()
+
+    def observe(self, prompt: str, response: Any):
+        values = {}
+        for name in self.FIELDS:
+            value = getattr(response, name, None)
+            if value is None and isinstance(response, dict):
+                value = response.get(name)
+            values[name] = value or 0
+        with self._lock:
+            self.responses += 1
+            for name, value in values.items():
+                self.totals[name] += value
+
+    def rate(self, count: str, duration: str) -> Optional[float]:
+        """Tokens per second from a count and a nanosecond duration total"""
+        seconds = self.totals[duration] / 1e9
+        return self.totals[count] / seconds if seconds else None
+
+def run_model(path: str, model: str, pool: EndpointPool, batch_args: argparse.Namespace,
+              truth: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    """Extract path with model and score the result"""
+    budget = ChunkBudget.for_model(model, pool.url_for(model), ratio_path=None)
+    session = ModelSession(pool, batch_args.keep_alive)
+    # Load before timing, so a model's load time does not count as its throughput
+    session.preload(model, budget.options())
+    session.begin_run(model, budget.options())
+    meter = TokenMeter()
+    extractor = None
+    executor = None
+    if batch_args.engine == 'async':
+        extractor = AsyncExtractor(pool, batch_args.concurrency)
+        extract = extractor.extract_chunks
+    else:
+        executor = ThreadPoolExecutor(max_workers=batch_args.concurrency)
+        extract = partial(extract_chunks, executor=executor, max_in_flight=batch_args.concurrency, client=pool)
+    try:
+        start = time.perf_counter()
+        stats = process_file(path, batch_args, extract, None, pool.models().get(model, ''), budget,
+                             on_response=meter.observe)
+        elapsed = time.perf_counter() - start
+    finally:
+        session.end_run()
+        if extractor is not None:
+            extractor.close()
+        if executor is not None:
+            executor.shutdown()
+
+    valves = list(stats['merger'].valves())
+    fields = score(valves, truth)
+    return {
+        'model': model,
+        'records': len(valves),
+        'chunks': stats['chunks'],
+        'failed_chunks': stats['failed_chunks'],
+        'seconds': elapsed,
+        'records_per_sec': len(valves) / elapsed if elapsed else None,
+        'tokens_per_sec': meter.rate('eval_count', 'eval_duration'),
+        'prompt_tokens_per_sec': meter.rate('prompt_eval_count', 'prompt_eval_duration'),
+        'tokens': dict(meter.totals),
+        'fields': fields,
+        'macro_precision': sum(field['precision'] for field in fields.values()) / len(fields),
+        'macro_recall': sum(field['recall'] for field in fields.values()) / len(fields),
+        'macro_f1': sum(field['f1'] for field in fields.values()) / len(fields),
+    }
+
+def frontier(results: Sequence[Dict[str, Any]]) -> List[str]:
+    """Models no other model beats on both records/sec and macro F1, fastest first"""
+    ranked = [result for result in results if result['records_per_sec'] is not None]
+    pareto = [result for result in ranked
+              if not any(other is not result
+                         and other['records_per_sec'] >= result['records_per_sec']
+                         and other['macro_f1'] >= result['macro_f1']
+                         and (other['records_per_sec'] > result['records_per_sec']
+                              or other['macro_f1'] > result['macro_f1'])
+                         for other in ranked)]
+    return [result['model'] for result in sorted(pareto, key=lambda r: -r['records_per_sec'])]
+
+def recommend(results: Sequence[Dict[str, Any]], min_f1: float) -> Optional[str]:
+    """The fastest model whose macro F1 meets min_f1"""
+    passing = [result for result in results if result['macro_f1'] >= min_f1 and result['records_per_sec']]
+    return max(passing, key=lambda r: r['records_per_sec'])['model'] if passing else None
+
+def format_table(results: Sequence[Dict[str, Any]]) -> str:
+    header = f"{'model':<24} {'rec/s':>8} {'tok/s':>8} {'P':>6} {'R':>6} {'F1':>6}  " + \
+             " ".join(f"{field[:8]:>8}" for field in FIELDS)
+    lines = [header]
+    for result in results:
+        records = f"{result['records_per_sec']:.1f}" if result['records_per_sec'] is not None else '-'
+        tokens = f"{result['tokens_per_sec']:.0f}" if result['tokens_per_sec'] else '-'
+        lines.append(f"{result['model']:<24} {records:>8} {tokens:>8} "
+                     f"{result['macro_precision']:>6.3f} {result['macro_recall']:>6.3f} {result['macro_f1']:>6.3f}  "
+                     + " ".join(f"{result['fields'][field]['f1']:>8.3f}" for field in FIELDS))
+    return "\n".join(lines)
+
+def models_value(value: str) -> List[str]:
+    return [name.strip() for name in value.split(',') if name.strip()]
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Compare Ollama models on throughput and extraction accuracy")
+    parser.add_argument('corpus', help="Labelled workbook from valve_data_sample.py")
+    parser.add_argument('--truth', default=None, help=f"Ground truth JSONL (default: corpus + {TRUTH_SUFFIX})")
+    parser.add_argument('--models', type=models_value, default=None,
+                        help="Comma-separated models to compare (default: every model the endpoints serve)")
+    parser.add_argument('--min-f1', type=float, default=DEFAULT_MIN_F1,
+                        help=f"Macro F1 a model needs to be recommended (default: {DEFAULT_MIN_F1})")
+    parser.add_argument('-o', '--output', default=None, help="Write the full comparison as JSON")
+    parser.add_argument('-c', '--concurrency', type=int, default=4, help="Chunks in flight at once (default: 4)")
+    parser.add_argument('--engine', choices=('async', 'threads'), default='async', help="Extraction engine")
+    parser.add_argument('--row-ids', action='store_true', help="Use batched extraction with row IDs")
+    parser.add_argument('--rules', action='store_true',
+                        help="Enable the rule-based fast path; rule-parsed rows never reach the models")
+    parser.add_argument('--hosts', default=None,
+                        help=f"Comma-separated Ollama endpoints (default: ${HOSTS_ENV} or localhost)")
+    parser.add_argument('--mock-model', type=model_profile, action='append', default=None,
+                        help="Compare against an in-process mock server serving NAME[:TOKENS_PER_SEC[:FIELD_RECALL]] "
+                             "instead of real endpoints; repeatable")
+    return parser
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    if not args.corpus.lower().endswith(EXCEL_EXTENSIONS):
+        print("Error: the corpus must be an .xlsx or .xls workbook", file=sys.stderr)
+        return 1
+    truth_path = args.truth or args.corpus + TRUTH_SUFFIX
+    if not os.path.exists(args.corpus) or not os.path.exists(truth_path):
+        print(f"Error: need both {args.corpus} and its ground truth {truth_path}", file=sys.stderr)
+        return 1
+    truth = GroundTruth([truth_path])
+
+    server = None
+    if args.mock_model:
+        server = start_mock_server(MockOllama(args.mock_model, truth, parallel=args.concurrency, load_seconds=0.0))
+        hosts = [server.url]
+    else:
+        hosts = configured_hosts(args.hosts)
+    results = []
+    try:
+        pool = EndpointPool(hosts, max_connections=args.concurrency)
+        pool.refresh()
+        available = pool.models()
+        models = args.models or list(available)
+        missing = [model for model in models if model not in available]
+        if missing:
+            print(f"Warning: not served by any reachable endpoint, skipped: {', '.join(missing)}", file=sys.stderr)
+        models = [model for model in models if model in available]
+        if not models:
+            print(f"Error: no models to compare ({', '.join(pool.urls)})", file=sys.stderr)
+            return 1
+
+        for model in models:
+            batch_argv = [args.corpus, '--model', model, '--concurrency', str(args.concurrency),
+                          '--engine', args.engine, '--no-cache']
+            if args.row_ids:
+                batch_argv.append('--row-ids')
+            if not args.rules:
+                batch_argv.append('--no-rules')
+            print(f"Running {model}", file=sys.stderr)
+            try:
+                result = run_model(args.corpus, model, pool, build_batch_parser().parse_args(batch_argv), truth.valves)
+            except Exception as e:
+                print(f"{model}: error: {str(e)}", file=sys.stderr)
+                continue
+            results.append(result)
+            rate = f"{result['records_per_sec']:.1f}" if result['records_per_sec'] is not None else '-'
+            print(f"{model}: {rate} records/sec, macro F1 {result['macro_f1']:.3f}"
+                  + (f", {result['failed_chunks']}/{result['chunks']} chunks failed" if result['failed_chunks'] else ""),
+                  file=sys.stderr)
+    finally:
+        if server is not None:
+            server.shutdown()
+            server.server_close()
+
+    if not results:
+        print("Error: every model failed", file=sys.stderr)
+        return 1
+    # A run too fast to time has no rate; it sorts last
+    results.sort(key=lambda r: -(r['records_per_sec'] or 0))
+    pareto = frontier(results)
+    choice = recommend(results, args.min_f1)
+    print(format_table(results))
+    print(f"Frontier (fastest first): {', '.join(pareto)}")
+    if choice is not None:
+        print(f"Fastest model with macro F1 >= {args.min_f1}: {choice}")
+    else:
+        print(f"No model reaches macro F1 {args.min_f1}")
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'corpus': args.corpus, 'truth': truth_path, 'min_f1': args.min_f1,
+                       'truth_valves': len(truth), 'results': results, 'frontier': pareto,
+                       'recommended': choice}, f, indent=2)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,123 @@
+"""Qt-free chunk -> extract pipeline stages shared by the GUI and batch mode"""
+from collections import deque
+from concurrent.futures import Executor, Future
+from typing import Any, Callable, Deque, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+import pandas as pd
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+from excel_stream import ExcelStream
+from extraction_cache import ExtractionCache
+from row_chunker import RowChunk, estimate_tokens, iter_dataframe_rows, pack_rows, tag_rows, DEFAULT_TOKEN_BUDGET
+from stage_timer import stage, timed
+from valve_extraction import ResponseObserver, RowResults, ValveSpecification, process_chunk, process_row_chunk
+from valve_prefilter import ValvePrefilter
+from valve_rules import RuleExtractor
+
+CHUNK_SIZE = 2000  # Characters per text chunk
+CHUNK_OVERLAP = 200  # Overlap between text chunks
+EXCEL_EXTENSIONS = ('.xlsx', '.xls')
+TEXT_EXTENSIONS = ('.txt',)
+
+def make_text_splitter(chunk_size: int = CHUNK_SIZE, chunk_overlap: int = CHUNK_OVERLAP) -> RecursiveCharacterTextSplitter:
+    return RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+        length_function=len,
+    )
+
+def row_chunks(rows: Iterable[Tuple[int, str]], prefilter: Optional[ValvePrefilter] = None,
+               rules: Optional[RuleExtractor] = None,
+               token_budget: int = DEFAULT_TOKEN_BUDGET,
+               token_counter: Callable[[str], int] = estimate_tokens,
+               row_ids: bool = False) -> Iterator[RowChunk]:
+    """Lazily pre-filter, rule-extract and pack serialized rows into chunks for the model.
+
+    With row_ids, rows are tagged with their index for process_row_chunk.
+    """
+    # Drop rows without valve signal
+    if prefilter is not None:
+        rows = prefilter.filter_rows(rows)
+    # Rows the rules can parse never reach the model
+    if rules is not None:
+        rows = rules.filter_rows(rows)
+    if row_ids:
+        rows = tag_rows(rows)
+    # Filtering, rule matching and packing are all charged to split
+    return timed('split', pack_rows(rows, token_budget, token_counter))
+
+def text_chunks(text: str, splitter: RecursiveCharacterTextSplitter,
+                prefilter: Optional[ValvePrefilter] = None,
+                rules: Optional[RuleExtractor] = None) -> List[str]:
+    """Split free text into chunks for the model after the rule and pre-filter stages"""
+    with stage('split'):
+        if rules is not None:
+            # Let the rules take whole paragraphs before the text is split
+            paragraphs = [p for p in text.split("\n\n") if p.strip()]
+            text = "\n\n".join(rules.filter_texts(paragraphs))
+        chunks = splitter.split_text(text)
+        # Drop chunks without valve signal
+        if prefilter is not None:
+            chunks = prefilter.filter_chunks(chunks)
+    return chunks
+
+def file_rows(path: str) -> Iterator[Tuple[int, str]]:
+    """Serialized rows of a workbook; .xlsx is streamed, .xls is read whole"""
+    if path.lower().endswith('.xlsx'):
+        return ExcelStream(path).iter_serialized_rows()
+    with stage('load'):
+        df = pd.read_excel(path)
+    return timed('serialize', iter_dataframe_rows(df))
+
+def file_chunks(path: str, splitter: RecursiveCharacterTextSplitter,
+                prefilter: Optional[ValvePrefilter] = None,
+                rules: Optional[RuleExtractor] = None,
+                token_budget: int = DEFAULT_TOKEN_BUDGET,
+                token_counter: Callable[[str], int] = estimate_tokens,
+                row_ids: bool = False) -> Iterator[RowChunk]:
+    """Chunks of an Excel or text file; text chunks carry no row indices (and no row_ids tags)"""
+    if path.lower().endswith(EXCEL_EXTENSIONS):
+        yield from row_chunks(file_rows(path), prefilter, rules, token_budget, token_counter, row_ids)
+        return
+    with stage('load'), open(path, 'r', encoding='utf-8') as file:
+        text = file.read()
+    for chunk in text_chunks(text, splitter, prefilter, rules):
+        yield RowChunk(chunk, [])
+
+# (index, valves or, for batched row chunks, valves per source row, error)
+ChunkResult = Tuple[int, Optional[Union[List[ValveSpecification], RowResults]], Optional[str]]
+
+def extract_chunks(chunks: Iterable[Union[str, RowChunk]], model: str, executor: Executor, max_in_flight: int,
+                   cache: Optional[ExtractionCache] = None, model_digest: str = "",
+                   options: Optional[Dict[str, Any]] = None,
+                   on_response: Optional[ResponseObserver] = None,
+                   client: Optional[Any] = None, row_ids: bool = False) -> Iterator[ChunkResult]:
+    """Run process_chunk over chunks on an executor, yielding (index, valves, error) in chunk order.
+
+    Chunks are pulled lazily and at most max_in_flight are submitted at a
+    time, so a streamed input never has to fit in memory. A failed chunk
+    yields valves=None and the error message. With row_ids, chunks are
+    tagged RowChunks run through process_row_chunk, and valves are per row.
+    """
+    task = process_row_chunk if row_ids else process_chunk
+    pending: Deque[Tuple[int, Future]] = deque()
+    chunk_iter = iter(chunks)
+    index = 0
+
+    def submit_next() -> bool:
+        nonlocal index
+        chunk = next(chunk_iter, None)
+        if chunk is None:
+            return False
+        pending.append((index, executor.submit(task, chunk, model, cache, model_digest,
+                                                options, on_response, client)))
+        index += 1
+        return True
+
+    while len(pending) < max_in_flight and submit_next():
+        pass
+    while pending:
+        chunk_index, future = pending.popleft()
+        try:
+            yield chunk_index, future.result(), None
+        except Exception as e:
+            yield chunk_index, None, str(e)
+        submit_next()
@@ -0,0 +1,89 @@
+"""Cheap pre-filter that drops rows and chunks with no valve content before extraction"""
+import re
+from collections import Counter
+from typing import Callable, Iterable, Iterator, List, Optional, Sequence, Tuple, TypeVar
+
+T = TypeVar("T")
+
+# Serial IDs such as BV-2024-A871, GV456789, CV-789 or BV-2024-SS-100
+SERIAL_PATTERN = re.compile(r"\b[A-Z]{2}-?\d{3,}(?:-[A-Z0-9]+)*\b")
+
+# (rule name, pattern, weight); a row is kept once its weights reach min_score
+DEFAULT_RULES: List[Tuple[str, "re.Pattern[str]", float]] = [
+    ("serial_id", SERIAL_PATTERN, 2.0),
+    ("valve_keyword", re.compile(r"\bvalves?\b", re.IGNORECASE), 1.0),
+    ("manufacturer", re.compile(
+        r"\b(?:ValveTech|FlowControl|FlowMaster|ValveWorks|PrecisionFlow)\b", re.IGNORECASE), 1.0),
+    ("pressure", re.compile(r"\b\d+(?:\.\d+)?\s*(?:PSI|bar)\b", re.IGNORECASE), 1.0),
+    ("material", re.compile(
+        r"\b(?:stainless steel|carbon steel|cast iron|duplex steel|alloy 20|bronze|titanium)\b",
+        re.IGNORECASE), 0.5),
+]
+DEFAULT_MIN_SCORE = 1.0
+
+REASON_EMPTY = "empty"
+REASON_NO_SIGNAL = "no valve signal"
+REASON_WEAK_SIGNAL = "weak valve signal"
+
+class ValvePrefilter:
+    """Scores text for valve signal and drops rows or chunks below a threshold.
+
+    The default scorer sums the weights of matching rules; pass scorer to
+    plug in any callable returning a float instead. Counts of kept and
+    dropped items, and why they were dropped, accumulate in kept, dropped
+    and reasons until reset() is called.
+    """
+    def __init__(self, min_score: float = DEFAULT_MIN_SCORE,
+                 rules: Sequence[Tuple[str, "re.Pattern[str]", float]] = DEFAULT_RULES,
+                 scorer: Optional[Callable[[str], float]] = None):
+        self.min_score = min_score
+        self.rules = list(rules)
+        self.scorer = scorer
+        self.reset()
+
+    def reset(self):
+        self.kept = 0
+        self.dropped = 0
+        self.reasons: Counter = Counter()
+
+    def score(self, text: str) -> float:
+        """Valve signal score of a piece of text"""
+        if self.scorer is not None:
+            return self.scorer(text)
+        return sum(weight for _, pattern, weight in self.rules if pattern.search(text))
+
+    def check(self, text: str) -> Optional[str]:
+        """Return None if the text should be extracted, otherwise the reason to drop it"""
+        if not text or not text.strip():
+            return REASON_EMPTY
+        score = self.score(text)
+        if score >= self.min_score:
+            return None
+        return REASON_NO_SIGNAL if score <= 0 else REASON_WEAK_SIGNAL
+
+    def _record(self, text: str) -> bool:
+        reason = self.check(text)
+        if reason is None:
+            self.kept += 1
+            return True
+        self.dropped += 1
+        self.reasons[reason] += 1
+        return False
+
+    def filter_rows(self, rows: Iterable[Tuple[T, str]]) -> Iterator[Tuple[T, str]]:
+        """Lazily pass through (index, text) rows that carry valve signal"""
+        for row in rows:
+            if self._record(row[1]):
+                yield row
+
+    def filter_chunks(self, chunks: Iterable[str]) -> List[str]:
+        """Keep only the text chunks that carry valve signal"""
+        return [chunk for chunk in chunks if self._record(chunk)]
+
+    def summary(self) -> str:
+        """Human readable account of what was dropped and why"""
+        total = self.kept + self.dropped
+        if not self.dropped:
+            return f"Pre-filter kept all {total} items"
+        reasons = ", ".join(f"{reason}: {count}" for reason, count in self.reasons.most_common())
+        return f"Pre-filter dropped {self.dropped} of {total} items ({reasons})"
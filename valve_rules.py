@@ -0,0 +1,174 @@
+"""Deterministic rule-based fast path for templated valve descriptions"""
+import re
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple, TypeVar
+from valve_extraction import ValveSpecification
+from valve_prefilter import SERIAL_PATTERN
+
+T = TypeVar("T")
+
+MM_PER_UNIT = {'"': 25.4, "in": 25.4, "inch": 25.4, "inches": 25.4, "mm": 1.0, "cm": 10.0}
+
+SERIAL_PREFIX_TYPES = {"BF": "butterfly", "GV": "gate", "CV": "check", "BV": "ball", "GB": "globe", "CT": "control"}
+
+VALVE_TYPE_PATTERN = re.compile(
+    r"\b(butterfly|gate|check|ball|globe|control|needle|plug|diaphragm|relief|safety)\s+valves?\b",
+    re.IGNORECASE)
+MANUFACTURERS = [
+    "ValveTech Industries", "PrecisionFlow Systems", "FlowControl Inc",
+    "ValveTech", "FlowMaster", "ValveWorks", "PrecisionFlow",
+]
+MANUFACTURER_PATTERN = re.compile(r"\b(" + "|".join(re.escape(name) for name in MANUFACTURERS) + r")\b")
+MANUFACTURER_LABEL_PATTERN = re.compile(
+    r"\b(?:manufactured by|manufacturer:?|made by)\s+([A-Z][\w&]*(?:\s+[A-Z][\w&.]*){0,2})")
+MATERIAL_PATTERN = re.compile(
+    r"\b(stainless steel(?:\s+\d{3})?|\d{3}\s+stainless steel|carbon steel|cast iron|duplex steel"
+    r"|alloy \d+|bronze|brass|titanium)\b",
+    re.IGNORECASE)
+PRESSURE_PATTERN = re.compile(r"\b(\d+(?:\.\d+)?)\s*(PSI|bar)\b", re.IGNORECASE)
+
+_NUMBER = r"(\d+(?:\.\d+)?)"
+_UNIT = r"(\"|inches|inch|in\b|mm|cm)?"
+DIMENSION_PAIR_PATTERN = re.compile(
+    _NUMBER + r"\s*" + _UNIT + r"\s*(?:wide|width)?\s*(?:x|by|×)\s*" + _NUMBER + r"\s*" + _UNIT,
+    re.IGNORECASE)
+
+def _dimension_patterns(label: str, adjective: str) -> List["re.Pattern[str]"]:
+    return [
+        re.compile(r"\b" + label + r"\b(?:\s+of)?\s*:?\s*" + _NUMBER + r"\s*" + _UNIT, re.IGNORECASE),
+        re.compile(_NUMBER + r"\s*" + _UNIT + r"\s*(?:in\s+)?(?:" + label + r"|" + adjective + r")\b",
+                   re.IGNORECASE),
+    ]
+
+WIDTH_PATTERNS = _dimension_patterns("width", "wide")
+HEIGHT_PATTERNS = _dimension_patterns("height", "tall")
+
+REQUIRED_FIELDS = ("serial_id", "valve_type")
+DEFAULT_MIN_CONFIDENCE = 0.8
+
+class RuleMatch(NamedTuple):
+    valve: ValveSpecification
+    confidence: Dict[str, float]  # Per-field confidence in [0, 1]; absent fields are missing
+
+def _to_mm(value: str, unit: Optional[str]) -> Tuple[float, float]:
+    """Convert a dimension to millimeters, returning (value, confidence)"""
+    if not unit:
+        return round(float(value) * MM_PER_UNIT["in"], 1), 0.6  # Templates default to inches
+    return round(float(value) * MM_PER_UNIT[unit.lower()], 1), 0.9
+
+def _find_dimension(text: str, patterns: Sequence["re.Pattern[str]"]) -> Optional[Tuple[float, float]]:
+    for pattern in patterns:
+        match = pattern.search(text)
+        if match:
+            return _to_mm(match.group(1), match.group(2))
+    return None
+
+def parse_valve(text: str) -> Optional[RuleMatch]:
+    """Parse a single-valve description with compiled patterns.
+
+    Returns None unless the text mentions exactly one serial ID, since the
+    rules cannot tell which attributes belong to which of several valves.
+    Dimensions are normalized to millimeters as the schema describes.
+    """
+    serials = set(SERIAL_PATTERN.findall(text))
+    if len(serials) != 1:
+        return None
+    serial_id = serials.pop()
+    fields: Dict[str, object] = {"serial_id": serial_id}
+    confidence: Dict[str, float] = {"serial_id": 0.95}
+
+    match = VALVE_TYPE_PATTERN.search(text)
+    if match:
+        fields["valve_type"] = match.group(1).lower()
+        confidence["valve_type"] = 0.95
+    elif serial_id[:2] in SERIAL_PREFIX_TYPES:
+        fields["valve_type"] = SERIAL_PREFIX_TYPES[serial_id[:2]]
+        confidence["valve_type"] = 0.6
+
+    match = MANUFACTURER_PATTERN.search(text)
+    if match:
+        fields["manufacturer"] = match.group(1)
+        confidence["manufacturer"] = 0.95
+    else:
+        match = MANUFACTURER_LABEL_PATTERN.search(text)
+        if match:
+            fields["manufacturer"] = match.group(1).rstrip(".")
+            confidence["manufacturer"] = 0.7
+
+    match = MATERIAL_PATTERN.search(text)
+    if match:
+        fields["material"] = match.group(1)
+        confidence["material"] = 0.9
+
+    match = PRESSURE_PATTERN.search(text)
+    if match:
+        unit = "PSI" if match.group(2).lower() == "psi" else "bar"
+        fields["pressure_rating"] = f"{match.group(1)} {unit}"
+        confidence["pressure_rating"] = 0.9
+
+    pair = DIMENSION_PAIR_PATTERN.search(text)
+    if pair:
+        unit = pair.group(2) or pair.group(4)
+        fields["width"], confidence["width"] = _to_mm(pair.group(1), unit)
+        fields["height"], confidence["height"] = _to_mm(pair.group(3), unit)
+    else:
+        for field, patterns in (("width", WIDTH_PATTERNS), ("height", HEIGHT_PATTERNS)):
+            found = _find_dimension(text, patterns)
+            if found:
+                fields[field], confidence[field] = found
+
+    if "valve_type" not in fields:
+        return None
+    return RuleMatch(ValveSpecification(**fields), confidence)
+
+class RuleExtractor:
+    """Fast path that extracts templated rows itself and passes the rest through.
+
+    A row is handled by the rules when every field in required_fields is
+    filled with at least min_confidence; everything else falls back to the
+    LLM. Extracted valves and their confidences accumulate in matches until
+    reset() is called.
+    """
+    def __init__(self, required_fields: Sequence[str] = REQUIRED_FIELDS,
+                 min_confidence: float = DEFAULT_MIN_CONFIDENCE):
+        self.required_fields = tuple(required_fields)
+        self.min_confidence = min_confidence
+        self.reset()
+
+    def reset(self):
+        self.matches: List[RuleMatch] = []
+        self.valves: List[ValveSpecification] = []
+        self.matched_rows: List = []  # Row indices of the valves taken by filter_rows
+        self.fallbacks = 0
+
+    def extract(self, text: str) -> Optional[RuleMatch]:
+        """Return a confident rule match for the text, or None to fall back to the LLM"""
+        match = parse_valve(text)
+        if match is None:
+            return None
+        if all(match.confidence.get(field, 0.0) >= self.min_confidence for field in self.required_fields):
+            return match
+        return None
+
+    def _record(self, text: str) -> bool:
+        match = self.extract(text)
+        if match is None:
+            self.fallbacks += 1
+            return False
+        self.matches.append(match)
+        self.valves.append(match.valve)
+        return True
+
+    def filter_rows(self, rows: Iterable[Tuple[T, str]]) -> Iterator[Tuple[T, str]]:
+        """Lazily extract (index, text) rows the rules can handle and yield the rest"""
+        for row in rows:
+            if self._record(row[1]):
+                self.matched_rows.append(row[0])
+            else:
+                yield row
+
+    def filter_texts(self, texts: Iterable[str]) -> List[str]:
+        """Extract the texts the rules can handle and return the rest"""
+        return [text for text in texts if not self._record(text)]
+
+    def summary(self) -> str:
+        return f"Rule fast path extracted {len(self.matches)} valves, {self.fallbacks} items left for the model"